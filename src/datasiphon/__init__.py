@@ -1,6 +1,59 @@
-from .sql_filter import SqlQueryBuilder
+import sys
+import types
+import typing as t
+
 from .core import _exc
-from .core._filter_core import ColumnFilterRestriction, AnyValue
+from .core._filter_core import ColumnFilterRestriction, RestrictionPolicy, AnyValue, FilterBudget, FilterCost
+from .core._cache import PlanCache
+from .core._fingerprint import FilterFingerprint
+from .core._validation import FilterSchema, FilterValidator, Violation
+
+if t.TYPE_CHECKING:
+    from .sql_filter import (
+        SqlQueryBuilder,
+        InListOptions,
+        InListStrategy,
+        CountMode,
+        is_always_false,
+        ExpressionPath,
+        ExpressionTransformer,
+        CompiledQuery,
+    )
 
 VERSION = (0, 3, 11)
 __version__ = ".".join(map(str, VERSION))
+
+# backend names loaded on first access - importing the package (and using core) does not import SQLAlchemy
+_LAZY_ATTRIBUTES = {
+    "SqlQueryBuilder": "sql_filter",
+    "InListOptions": "sql_filter",
+    "InListStrategy": "sql_filter",
+    "CountMode": "sql_filter",
+    "is_always_false": "sql_filter",
+    "ExpressionPath": "sql_filter",
+    "ExpressionTransformer": "sql_filter",
+    "CompiledQuery": "sql_filter",
+}
+_LAZY_MODULES = {"sql_filter"}
+
+
+def _import_backend(module_name: str) -> types.ModuleType:
+    # same as `from . import <module_name>` - import statement machinery also reports the module in `-X importtime`
+    __import__(module_name, globals(), None, (), 1)
+    return sys.modules[f"{__name__}.{module_name}"]
+
+
+def __getattr__(name: str) -> t.Any:
+    if name in _LAZY_MODULES:
+        return _import_backend(name)
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(_import_backend(module_name), name)
+    # cached in module namespace - next access does not go through `__getattr__`
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | _LAZY_MODULES)
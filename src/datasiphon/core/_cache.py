@@ -0,0 +1,177 @@
+import typing as t
+import heapq
+import itertools
+import threading
+import weakref
+
+
+class CacheInfo(t.NamedTuple):
+    """
+    Snapshot of cache statistics.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class _ThreadCounters:
+    """
+    Hit/miss counters of a single thread - updated only by the owning thread.
+    """
+
+    __slots__ = ("counts", "__weakref__")
+
+    def __init__(self) -> None:
+        # [hits, misses]
+        self.counts = [0, 0]
+
+
+class LRUCache:
+    """
+    Bounded LRU cache, safe to share between threads (including free-threaded builds of CPython).
+    Lookups are lock-free - a lookup only reads the entry and records the time of its use, writes and evictions
+    are serialized by a lock. Entries are kept in a heap ordered by the time of use recorded when they were pushed,
+    entry used since then is pushed again instead of being evicted - eviction is logarithmic in the size of the cache
+    (amortized). Time of use is approximate on free-threaded builds (concurrent lookups may record the same time).
+    Keeps hit/miss/eviction counters so the cache can be sized for the actual workload - hits and misses are counted
+    per thread, so counters are exact without locking lookups. Counters of finished threads are folded into totals.
+    """
+
+    maxsize: int
+    evictions: int
+
+    def __init__(self, maxsize: int = 512) -> None:
+        if maxsize < 1:
+            raise ValueError("Cache size must be a positive integer.")
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> [item, time of last use]
+        self._entries: dict[t.Hashable, list] = {}
+        self._clock = itertools.count()
+        # (time of use when pushed, sequence number, key) - single record per key, modified only under the lock
+        self._heap: list[tuple[int, int, t.Hashable]] = []
+        self._sequence = itertools.count()
+        self._local = threading.local()
+        # (reference to counters of a thread, counts of the thread) - counts outlive counters of finished thread
+        self._thread_counts: list[tuple[weakref.ref, list[int]]] = []
+        # [hits, misses] of finished threads
+        self._retired_counts = [0, 0]
+
+    @property
+    def hits(self) -> int:
+        return self._totals()[0]
+
+    @property
+    def misses(self) -> int:
+        return self._totals()[1]
+
+    def _totals(self) -> tuple[int, int]:
+        with self._lock:
+            hits, misses = self._retired_counts
+            for _, counts in self._thread_counts:
+                hits += counts[0]
+                misses += counts[1]
+            return hits, misses
+
+    def _counts(self) -> list[int]:
+        """
+        Returns counts of the current thread, registering them on first use.
+        """
+        local = self._local
+        try:
+            return local.counters.counts
+        except AttributeError:
+            pass
+        counters = _ThreadCounters()
+        with self._lock:
+            # counts of finished threads are folded into totals, so registered counts are bounded by live threads
+            alive = []
+            for ref, counts in self._thread_counts:
+                if ref() is None:
+                    self._retired_counts[0] += counts[0]
+                    self._retired_counts[1] += counts[1]
+                else:
+                    alive.append((ref, counts))
+            alive.append((weakref.ref(counters), counters.counts))
+            self._thread_counts = alive
+            local.counters = counters
+        return counters.counts
+
+    def get(self, key: t.Hashable) -> t.Any | None:
+        """
+        Returns cached item for the key (marking it as recently used) or `None` if not cached.
+        """
+        entry = self._entries.get(key)
+        counts = self._counts()
+        if entry is None:
+            counts[1] += 1
+            return None
+        entry[1] = next(self._clock)
+        counts[0] += 1
+        return entry[0]
+
+    def put(self, key: t.Hashable, item: t.Any) -> None:
+        """
+        Stores the item, evicting least recently used items over the size limit.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # key already has its record in the heap - it is pushed again at eviction
+                entry[0] = item
+                entry[1] = next(self._clock)
+                return
+            used = next(self._clock)
+            self._entries[key] = [item, used]
+            heapq.heappush(self._heap, (used, next(self._sequence), key))
+            while len(self._entries) > self.maxsize:
+                used, _, oldest = heapq.heappop(self._heap)
+                entry = self._entries[oldest]
+                if entry[1] != used:
+                    # used since pushed
+                    heapq.heappush(self._heap, (entry[1], next(self._sequence), oldest))
+                    continue
+                del self._entries[oldest]
+                self.evictions += 1
+
+    def info(self) -> CacheInfo:
+        hits, misses = self._totals()
+        return CacheInfo(hits, misses, self.evictions, self.maxsize, len(self._entries))
+
+    def clear(self) -> None:
+        """
+        Drops all cached items and resets the counters.
+        """
+        with self._lock:
+            self._entries = {}
+            self._heap = []
+            self.evictions = 0
+            self._local = threading.local()
+            self._thread_counts = []
+            self._retired_counts = [0, 0]
+
+    def items(self) -> list[tuple[t.Hashable, t.Any]]:
+        """
+        Returns snapshot of cached items from least to most recently used.
+        """
+        with self._lock:
+            entries = sorted(self._entries.copy().items(), key=lambda pair: pair[1][1])
+        return [(key, entry[0]) for key, entry in entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: t.Hashable) -> bool:
+        return key in self._entries
+
+
+class PlanCache(LRUCache):
+    """
+    Bounded LRU cache for prebuilt filter plans.
+    """
+
+    pass
@@ -60,3 +60,19 @@ class CannotAdjustExpression(SiphonError):
     """
 
     pass
+
+
+class BudgetExceededError(SiphonError):
+    """
+    Exception raised when a filtering exceeds its complexity budget.
+    """
+
+    pass
+
+
+class StaleSnapshotError(SiphonError):
+    """
+    Exception raised when a snapshot of builder state does not match current table metadata or builder configuration.
+    """
+
+    pass
@@ -1,12 +1,35 @@
 import typing as t
+import base64
+import datetime
+import decimal
+import enum
+import functools
+import json
+import uuid
+from urllib.parse import quote
 from qstion._struct_core import QsRoot, QsNode
-from ._exc import InvalidValueTypeError, NoSuchOperationError, InvalidFilteringStructureError, BadFormatError
+from ._exc import (
+    InvalidValueTypeError,
+    NoSuchOperationError,
+    InvalidFilteringStructureError,
+    BadFormatError,
+    FiltrationNotAllowed,
+    BudgetExceededError,
+)
 import re
 
+# patterns of order by string - "asc|desc(<column_name>)", "+|-<column_name>", "<column_name>.asc|desc"
+ORDER_BY_PRE_PATTERN = re.compile(r"^(asc|desc)\(([^\(\)]+)\)$")
+ORDER_BY_SIGN_PATTERN = re.compile(r"^([+-])(.+)$")
+ORDER_BY_POST_PATTERN = re.compile(r"^(.+)\.(asc|desc)$")
 
+ORDER_BY_DIRECTIONS = {"asc": 1, "desc": 0, "+": 1, "-": 0}
+
+
+@functools.lru_cache(maxsize=1024)
 def parse_order_by(order_by: str) -> tuple[int, str | list[str]]:
     """
-    Parses the order by string.
+    Parses the order by string (results are cached - order by strings repeat across requests).
     allowed formats:
     - "asc|desc(<column_name>)"
     - "+|-<column_name>"
@@ -17,33 +40,277 @@ def parse_order_by(order_by: str) -> tuple[int, str | list[str]]:
 
     Returns:
         Tuple of direction and column name.
-    """
-    # regex pattern for parsing the order by string
-    pre_pattern = r"^(asc|desc)\(([^\(\)]+)\)$"
-    sign_pattern = r"^([+-])(.+)$"
-    post_pattern = r"^(.+)\.(asc|desc)$"
 
-    direction_mapping = {"asc": 1, "desc": 0, "+": 1, "-": 0}
-
-    direction, column_name = None, None
+    Raises:
+        InvalidValueTypeError: If the value is not a string.
+        BadFormatError: If the string has none of allowed formats.
+    """
+    if not isinstance(order_by, str):
+        raise InvalidValueTypeError(f"Order by value should be a string, not {type(order_by).__name__}.")
     # check for pre-pattern
-    pre_match = re.match(pre_pattern, order_by)
+    pre_match = ORDER_BY_PRE_PATTERN.match(order_by)
     if pre_match is not None:
         direction, column_name = pre_match.groups()
-        return direction_mapping[direction], column_name
+        return ORDER_BY_DIRECTIONS[direction], column_name
     # check for sign pattern
-    sign_match = re.match(sign_pattern, order_by)
+    sign_match = ORDER_BY_SIGN_PATTERN.match(order_by)
     if sign_match is not None:
         direction, column_name = sign_match.groups()
-        return direction_mapping[direction], column_name
+        return ORDER_BY_DIRECTIONS[direction], column_name
     # check for post-pattern
-    post_match = re.match(post_pattern, order_by)
+    post_match = ORDER_BY_POST_PATTERN.match(order_by)
     if post_match is not None:
         column_name, direction = post_match.groups()
-        return direction_mapping[direction], column_name
+        return ORDER_BY_DIRECTIONS[direction], column_name
     raise BadFormatError(f"Invalid order by string: {order_by}")
 
 
+def parse_integer_keyword(keyword: str, value: t.Any) -> int:
+    """
+    Parses value of integer-like keyword (`limit`, `offset`).
+
+    Raises:
+        InvalidValueTypeError: If the value is not integer-like.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidValueTypeError(f"{keyword.capitalize()} value should be an integer-like value.")
+
+
+# tags of cursor values (type, parser of encoded value) that are not JSON native
+CURSOR_TYPES = {
+    "dt": (datetime.datetime, datetime.datetime.fromisoformat),
+    "d": (datetime.date, datetime.date.fromisoformat),
+    "t": (datetime.time, datetime.time.fromisoformat),
+    "dec": (decimal.Decimal, decimal.Decimal),
+    "uuid": (uuid.UUID, uuid.UUID),
+}
+
+
+def _encode_cursor_value(value: t.Any) -> t.Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, enum.Enum):
+        return value.name
+    for tag, (value_type, _) in CURSOR_TYPES.items():
+        if isinstance(value, value_type):
+            return {tag: str(value) if tag in ("dec", "uuid") else value.isoformat()}
+    raise InvalidValueTypeError(f"Value of type {type(value).__name__} cannot be used in cursor.")
+
+
+def encode_cursor(values: t.Sequence[t.Any]) -> str:
+    """
+    Encodes values of keyset columns into an opaque (url-safe) cursor token.
+
+    Raises:
+        InvalidValueTypeError: If any of the values cannot be encoded.
+    """
+    payload = json.dumps([_encode_cursor_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> list[t.Any]:
+    """
+    Decodes cursor token created by `encode_cursor`.
+
+    Raises:
+        BadFormatError: If the token is not a valid cursor.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(payload)
+        if not isinstance(values, list):
+            raise ValueError("Cursor must encode a list of values.")
+        decoded = []
+        for value in values:
+            if isinstance(value, dict):
+                ((tag, raw),) = value.items()
+                value = CURSOR_TYPES[tag][1](raw)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, KeyError, decimal.InvalidOperation) as e:
+        raise BadFormatError(f"Invalid cursor: {token}") from e
+
+
+# types of values coerced by column type - name of python type of column: (accepted types, parser of strings)
+COERCED_TYPES = {
+    "int": (int, int),
+    "float": ((int, float), float),
+    "Decimal": ((decimal.Decimal, int), decimal.Decimal),
+    "datetime": CURSOR_TYPES["dt"],
+    "date": CURSOR_TYPES["d"],
+    "time": CURSOR_TYPES["t"],
+    "UUID": CURSOR_TYPES["uuid"],
+}
+BOOLEAN_STRINGS = {
+    "true": True,
+    "1": True,
+    "yes": True,
+    "on": True,
+    "false": False,
+    "0": False,
+    "no": False,
+    "off": False,
+}
+
+
+def _coerce_parsed(
+    type_name: str, value_type: type | tuple[type, ...], parse: t.Callable[[str], t.Any], value: t.Any
+) -> t.Any:
+    if isinstance(value, value_type) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return parse(value.strip())
+        except (ValueError, decimal.InvalidOperation):
+            pass
+    raise InvalidValueTypeError(f"Value {value!r} is not a valid {type_name} value.")
+
+
+def _coerce_boolean(value: t.Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (str, int)):
+        coerced = BOOLEAN_STRINGS.get(str(value).strip().lower())
+        if coerced is not None:
+            return coerced
+    raise InvalidValueTypeError(f"Value {value!r} is not a valid bool value.")
+
+
+def _coerce_enum(values: frozenset[str], value: t.Any) -> t.Any:
+    name = value.name if isinstance(value, enum.Enum) else value
+    if isinstance(name, str) and name in values:
+        return value
+    raise InvalidValueTypeError(f"Value {value!r} is not one of allowed values: {', '.join(sorted(values))}.")
+
+
+def compile_coercer(type_name: str | None, values: t.Iterable[str] | None = None) -> t.Callable[[t.Any], t.Any] | None:
+    """
+    Compiles coercer of filtered values for column type - values arriving as strings are converted into values
+    of column type (so database compares them with the column as they are, without casting the column).
+    Coercers are plain partial functions - they can be pickled along with prebuilt plans.
+
+    Args:
+        type_name: Name of python type of column values.
+        values: Names of allowed values of enum column.
+
+    Returns:
+        Coercer raising `InvalidValueTypeError` for invalid values, None if values of the type are not coerced.
+    """
+    if values is not None:
+        return functools.partial(_coerce_enum, frozenset(values))
+    if type_name == "bool":
+        return _coerce_boolean
+    if type_name in COERCED_TYPES:
+        return functools.partial(_coerce_parsed, type_name, *COERCED_TYPES[type_name])
+    return None
+
+
+def coerce_value(coercer: t.Callable[[t.Any], t.Any], value: t.Any) -> t.Any:
+    """
+    Coerces value of an operation - lists (`in_`/`nin`) are coerced item by item, nulls are kept.
+
+    Raises:
+        InvalidValueTypeError: If any of the values cannot be coerced.
+    """
+    if isinstance(value, list):
+        return [item if item is None else coercer(item) for item in value]
+    return value if value is None else coercer(value)
+
+
+def encode_query_string(filtering: dict[str, t.Any]) -> str:
+    """
+    Encodes (nested) filtering dictionary into query string in a single traversal - same format as `qstion.stringify`
+    (bracket notation, indexed arrays, empty dictionaries and lists are left out).
+    """
+    pairs = []
+    stack = [(quote(str(key)), value) for key, value in reversed(filtering.items())]
+    while stack:
+        prefix, value = stack.pop()
+        if isinstance(value, dict):
+            items = list(value.items())
+        elif isinstance(value, list):
+            items = list(enumerate(value))
+        else:
+            pairs.append(f"{prefix}={quote(str(value))}")
+            continue
+        stack.extend((f"{prefix}{quote(f'[{key}]')}", item) for key, item in reversed(items))
+    return "&".join(pairs)
+
+
+# markers used in filter shapes in place of extracted values
+SHAPE_VALUE = "?"
+SHAPE_LIST = "[?]"
+
+
+def filter_shape(filtering: dict[str, t.Any]) -> tuple[tuple, list[tuple[str | int, t.Any]]]:
+    """
+    Splits the filtering dictionary into its shape and its values.
+    Shape keeps keys (columns, junctions, operators, keywords) in original order together with `order_by` values,
+    other values are replaced with placeholders - filters which differ only in values share the same shape.
+    Placeholders keep type of the value (of the first item of lists), since type of bound value depends on it.
+    `None` and `bool` values are kept in shape as they change the produced expression.
+
+    Args:
+        filtering: Filtering dictionary.
+
+    Returns:
+        Tuple of hashable shape and list of extracted slots - (key, value) pairs in traversal order.
+    """
+    slots = []
+    shape = tuple((key, _value_shape(key, value, slots)) for key, value in filtering.items())
+    return shape, slots
+
+
+def _value_shape(key: str | int, value: t.Any, slots: list[tuple[str | int, t.Any]]) -> t.Hashable:
+    if key == "order_by":
+        # order by values are column references - part of the shape
+        if isinstance(value, dict):
+            return tuple(value.items())
+        return tuple(value) if isinstance(value, list) else value
+    if isinstance(value, dict):
+        if is_simple_array_dict(value):
+            slots.append((key, list(value.values())))
+            return SHAPE_LIST, _item_type(value.values())
+        return tuple((child_key, _value_shape(child_key, child, slots)) for child_key, child in value.items())
+    if isinstance(value, list):
+        if is_simple_array(value):
+            slots.append((key, list(value)))
+            return SHAPE_LIST, _item_type(value)
+        return tuple((idx, _value_shape(idx, item, slots)) for idx, item in enumerate(value))
+    if value is None or isinstance(value, bool):
+        return (SHAPE_VALUE, value)
+    slots.append((key, value))
+    if key in ("limit", "offset"):
+        # parsed into integer regardless of the type
+        return SHAPE_VALUE
+    return SHAPE_VALUE, type(value)
+
+
+def _item_type(values: t.Iterable[t.Any]) -> type | None:
+    # type of bound list is inferred from its first item
+    return next((type(item) for item in values), None)
+
+
+def is_simple_array_dict(value: dict) -> bool:
+    """
+    Checks whether dictionary is an array-like dictionary of plain values - `{0: x, 1: y}`.
+    """
+    if not value or not all(isinstance(key, int) for key in value):
+        return False
+    if sorted(value) != list(range(len(value))):
+        return False
+    return is_simple_array(value.values())
+
+
+def is_simple_array(values: t.Iterable[t.Any]) -> bool:
+    """
+    Checks whether none of the values is nested (dictionary or list).
+    """
+    return all(not isinstance(item, (dict, list)) for item in values)
+
+
 class AnyValue:
     """
     Placeholder for any value.
@@ -57,6 +324,8 @@ class FilterOperation:
     Base class for all filter operations.
     """
 
+    __slots__ = ("assigned_value",)
+
     filter_name: str
     assigned_value: t.Any | AnyValue
 
@@ -102,6 +371,8 @@ class Equals(FilterOperation):
     Filter operation for equals.
     """
 
+    __slots__ = ()
+
     filter_name = "eq"
 
 
@@ -110,6 +381,8 @@ class NotEquals(FilterOperation):
     Filter operation for not equals.
     """
 
+    __slots__ = ()
+
     filter_name = "ne"
 
 
@@ -118,6 +391,8 @@ class GreaterThan(FilterOperation):
     Filter operation for greater than.
     """
 
+    __slots__ = ()
+
     filter_name = "gt"
 
 
@@ -126,6 +401,8 @@ class GreaterThanOrEqual(FilterOperation):
     Filter operation for greater than or equal to.
     """
 
+    __slots__ = ()
+
     filter_name = "ge"
 
 
@@ -134,6 +411,8 @@ class LessThan(FilterOperation):
     Filter operation for less than.
     """
 
+    __slots__ = ()
+
     filter_name = "lt"
 
 
@@ -142,6 +421,8 @@ class LessThanOrEqual(FilterOperation):
     Filter operation for less than or equal to.
     """
 
+    __slots__ = ()
+
     filter_name = "le"
 
 
@@ -150,6 +431,8 @@ class In(FilterOperation):
     Filter operation for in.
     """
 
+    __slots__ = ()
+
     filter_name = "in_"
     assigned_value: list | AnyValue
 
@@ -177,6 +460,8 @@ class NotIn(FilterOperation):
     Filter operation for not in.
     """
 
+    __slots__ = ()
+
     filter_name = "nin"
 
     def __init__(self, value: t.Any) -> None:
@@ -252,9 +537,267 @@ class ColumnFilterRestriction:
         return True
 
 
+def _freeze_value(value: t.Any) -> t.Any:
+    """
+    Converts (nested) lists into tuples so they can be looked up in hashed sets.
+    """
+    if isinstance(value, list):
+        return tuple(_freeze_value(item) for item in value)
+    return value
+
+
+class ForbiddenValues:
+    """
+    Immutable collection of forbidden values of a single operation.
+    Hashable values are kept in a set, unhashable ones are compared one by one.
+    """
+
+    __slots__ = ("hashable", "unhashable")
+
+    hashable: frozenset
+    unhashable: tuple
+
+    def __init__(self, values: t.Iterable[t.Any]) -> None:
+        hashable, unhashable = set(), []
+        for value in values:
+            value = _freeze_value(value)
+            try:
+                hashable.add(value)
+            except TypeError:
+                unhashable.append(value)
+        self.hashable = frozenset(hashable)
+        self.unhashable = tuple(unhashable)
+
+    def __contains__(self, value: t.Any) -> bool:
+        value = _freeze_value(value)
+        try:
+            if value in self.hashable:
+                return True
+        except TypeError:
+            pass
+        return any(value == forbidden for forbidden in self.unhashable)
+
+    def __iter__(self) -> t.Iterator[t.Any]:
+        yield from self.hashable
+        yield from self.unhashable
+
+
+class RestrictionPolicy:
+    """
+    Compiled, immutable set of column filter restrictions.
+    Restrictions are indexed by column name and operation name and forbidden values are kept in hashed sets,
+    so checking an operation does not depend on number of restrictions.
+    Policy holds no mutable state - it can be shared between threads and requests.
+    NOTE: restrictions of the same column (and the same operation) are merged together.
+    """
+
+    __slots__ = ("_index", "key")
+
+    _index: dict[str, dict[str, ForbiddenValues | type[AnyValue]]]
+    key: tuple
+
+    def __init__(self, *restrictions: ColumnFilterRestriction) -> None:
+        collected: dict[str, dict[str, list | type[AnyValue]]] = {}
+        for restriction in restrictions:
+            operations = collected.setdefault(restriction.name, {})
+            for operation in restriction.allowed_operations:
+                forbidden = operations.setdefault(operation.filter_name, [])
+                if forbidden is AnyValue or operation.assigned_value is AnyValue:
+                    operations[operation.filter_name] = AnyValue
+                else:
+                    forbidden.append(operation.assigned_value)
+        self._index = {
+            column_name: {
+                operation_name: forbidden if forbidden is AnyValue else ForbiddenValues(forbidden)
+                for operation_name, forbidden in operations.items()
+            }
+            for column_name, operations in collected.items()
+        }
+        self.key = tuple(
+            sorted(
+                (
+                    column_name,
+                    tuple(
+                        sorted(
+                            (operation_name, "*" if forbidden is AnyValue else tuple(sorted(map(repr, forbidden))))
+                            for operation_name, forbidden in operations.items()
+                        )
+                    ),
+                )
+                for column_name, operations in self._index.items()
+            )
+        )
+
+    @classmethod
+    def from_dict(cls, restrictions: dict[str, dict[str, t.Any]]) -> "RestrictionPolicy":
+        """
+        Creates policy from configuration in format `{column_name: {operation_name: restricted_value}}`
+        (see `ColumnFilterRestriction.from_dict`).
+        """
+        return cls(
+            *(
+                ColumnFilterRestriction.from_dict(column_name, operations)
+                for column_name, operations in restrictions.items()
+            )
+        )
+
+    @classmethod
+    def coerce(
+        cls, restrictions: t.Sequence[t.Union[ColumnFilterRestriction, "RestrictionPolicy"]]
+    ) -> "RestrictionPolicy":
+        """
+        Returns policy passed as the only restriction, otherwise compiles restrictions into a new policy.
+        """
+        if len(restrictions) == 1 and isinstance(restrictions[0], cls):
+            return restrictions[0]
+        if any(isinstance(restriction, cls) for restriction in restrictions):
+            raise TypeError("Restriction policy cannot be combined with other restrictions.")
+        return cls(*restrictions)
+
+    def restricts(self, column_name: str, operation_name: str) -> bool:
+        """
+        Checks whether the operation of the column is restricted (as a whole or for some values).
+        """
+        operations = self._index.get(column_name)
+        return operations is not None and operation_name in operations
+
+    def is_filter_allowed(self, column_name: str, operation: FilterOperation) -> bool:
+        """
+        Checks if the filter operation is allowed for the column.
+        """
+        operations = self._index.get(column_name)
+        if operations is None:
+            return True
+        forbidden = operations.get(operation.filter_name)
+        if forbidden is None:
+            return True
+        if forbidden is AnyValue:
+            return False
+        return operation.assigned_value not in forbidden
+
+    def check(self, column_name: str, operation: FilterOperation) -> None:
+        """
+        Checks if the filter operation is allowed for the column.
+
+        Raises:
+            FiltrationNotAllowed: If the operation is not allowed.
+        """
+        if not self.is_filter_allowed(column_name, operation):
+            raise FiltrationNotAllowed(
+                f"Filtering operation {operation.filter_name} is not allowed, either with the current value or is forbidden as whole."
+            )
+
+    def items(self) -> t.Iterator[tuple[str, dict[str, ForbiddenValues | type[AnyValue]]]]:
+        """
+        Iterates over restricted columns and their restricted operations.
+        """
+        return iter(self._index.items())
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RestrictionPolicy) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+
 # NOTE: is this useful in other cases except for SQL queries?
 
 
+# default limits of filtering structure size
+DEFAULT_MAX_DEPTH = 64
+DEFAULT_MAX_NODES = 10000
+
+# weights of filtering parts in cost score
+COST_LEAF = 1
+COST_LIST_ITEM = 1
+COST_OR_BRANCH = 2
+COST_ORDER_BY = 2
+
+
+class FilterCost(t.NamedTuple):
+    """
+    Complexity of filtering, measured before it is built.
+    Score sums weighted parts of filtering:
+    - each operation counts `COST_LEAF`, operation with list of values (`in_`/`nin`) counts `COST_LIST_ITEM` per value
+    - each branch of `or` junction beyond the first one counts `COST_OR_BRANCH`
+    - each `order_by` column counts `COST_ORDER_BY`
+    """
+
+    nodes: int
+    depth: int
+    leaves: int
+    or_fanout: int
+    list_length: int
+    order_by: int
+    limit: int | None
+    score: int
+
+
+class FilterBudget:
+    """
+    Limits of filtering complexity - any limit set to `None` is not checked.
+    """
+
+    max_leaves: int | None
+    max_or_fanout: int | None
+    max_list_length: int | None
+    max_order_by: int | None
+    max_limit: int | None
+    max_score: int | None
+
+    def __init__(
+        self,
+        max_leaves: int | None = None,
+        max_or_fanout: int | None = None,
+        max_list_length: int | None = None,
+        max_order_by: int | None = None,
+        max_limit: int | None = None,
+        max_score: int | None = None,
+    ) -> None:
+        self.max_leaves = max_leaves
+        self.max_or_fanout = max_or_fanout
+        self.max_list_length = max_list_length
+        self.max_order_by = max_order_by
+        self.max_limit = max_limit
+        self.max_score = max_score
+
+    def check(self, cost: FilterCost) -> None:
+        """
+        Checks measured filtering against the budget.
+
+        Raises:
+            BudgetExceededError: If any of the limits is exceeded.
+        """
+        violations = self.violations(cost)
+        if violations:
+            raise BudgetExceededError(violations[0])
+
+    def violations(self, cost: FilterCost) -> list[str]:
+        """
+        Returns descriptions of all exceeded limits of measured filtering (empty if the budget is kept).
+        """
+        limits = (
+            ("number of operations", cost.leaves, self.max_leaves),
+            ("number of `or` branches", cost.or_fanout, self.max_or_fanout),
+            ("length of value list", cost.list_length, self.max_list_length),
+            ("number of `order_by` columns", cost.order_by, self.max_order_by),
+            ("limit", cost.limit, self.max_limit),
+            ("cost score", cost.score, self.max_score),
+        )
+        return [
+            f"Filtering exceeds maximum {name} ({value} > {limit})."
+            for name, value, limit in limits
+            if limit is not None and value is not None and value > limit
+        ]
+
+    def __repr__(self) -> str:
+        limits = ", ".join(f"{name}={value}" for name, value in vars(self).items() if value is not None)
+        return f"{self.__class__.__name__}({limits})"
+
+
 class QueryBuilder:
     """
     Base class for all query filters.
@@ -262,7 +805,9 @@ class QueryBuilder:
 
     OPERATIONS = {"eq", "ne", "gt", "ge", "lt", "le", "in_", "nin"}
     JUNCTIONS = {"and", "or"}
-    KEYWORDS = {"limit", "offset", "order_by"}
+    KEYWORDS = {"limit", "offset", "order_by", "after"}
+    # keyword of keyset pagination - it is a column reference if the query has a column of the same name
+    KEYSET_KEYWORD = "after"
 
     table_base: dict[str, t.Any]
 
@@ -314,52 +859,168 @@ class QueryBuilder:
         """
         # reserved keys:
         # 'and', 'or' - junctions
-        # 'limit', 'offset', 'order_by' - special keys for filtering
+        # 'limit', 'offset', 'order_by', 'after' - special keys for filtering
         # operation names - filter operations
-        # 1. begin with checking node type:
-        # 1.1 if it's a leaf - key should be an operation name
-        if node.key in QueryBuilder.KEYWORDS:
-            # reserved keyword - cannot be used as an operation name
+        # nodes are processed iteratively (preorder) using explicit stack
+        resolved_columns = []
+        stack = [(node, parent_column)]
+        while stack:
+            current, current_column = stack.pop()
+            if current.key in QueryBuilder.KEYWORDS:
+                # reserved keyword - cannot be used as an operation name
+                continue
+            is_leaf = current.is_leaf or current.is_simple_array_branch
+            QueryBuilder.verify_node_key(current.key, is_leaf, current_column)
+            if is_leaf:
+                continue
+            if current_column is not None:
+                # nested junction of operations for parent column
+                child_column = current_column
+            elif current.key in QueryBuilder.JUNCTIONS or isinstance(current.key, int):
+                # junction (or multi-use of same junction in array-like format - key is an index)
+                child_column = None
+            else:
+                # key is a column name - children must be either operations or junctions
+                child_column = current.key
+                resolved_columns.append(current.key)
+            stack.extend((child, child_column) for child in reversed(current.value))
+        if (
+            node.key in QueryBuilder.KEYWORDS
+            or parent_column is not None
+            or node.is_leaf
+            or node.is_simple_array_branch
+        ):
             return None
-        if node.is_leaf or node.is_simple_array_branch:
-            if node.key not in QueryBuilder.OPERATIONS:
-                raise InvalidFilteringStructureError(f"Leaf must be operation: Unknown operation: {node.key}")
+        return resolved_columns
+
+    @staticmethod
+    def verify_node_key(key: str | int, is_leaf: bool, parent_column: str | int | None) -> None:
+        """
+        Verifies key of a single (non-keyword) node against its position in the filtering structure.
+        - leaf (or simple array) node must be an operation with parent column set
+        - nested node with parent column set must be a junction
+        - nested node without parent column cannot be an operation
+
+        Args:
+            key: Key of the node.
+            is_leaf: Whether node is a leaf or a simple array node.
+            parent_column: Name of the parent column.
+
+        Raises:
+            InvalidFilteringStructureError: If the key is not allowed on its position.
+        """
+        if is_leaf:
+            if key not in QueryBuilder.OPERATIONS:
+                raise InvalidFilteringStructureError(f"Leaf must be operation: Unknown operation: {key}")
             if parent_column is None:
                 raise InvalidFilteringStructureError("Leaf node must have a parent column name set.")
+        elif parent_column is not None:
+            if key not in QueryBuilder.JUNCTIONS:
+                raise InvalidFilteringStructureError(
+                    f"Parent column is set - <{parent_column}> - for nested node, key must be a junction."
+                )
+        elif key in QueryBuilder.OPERATIONS:
+            raise InvalidFilteringStructureError(f"Parent column is not set - cannot apply operation <{key}>.")
+
+    @staticmethod
+    def verify_filtering_size(
+        filtering: QsRoot | dict[str, t.Any], max_depth: int = DEFAULT_MAX_DEPTH, max_nodes: int = DEFAULT_MAX_NODES
+    ) -> None:
+        """
+        Verifies that the filtering structure is not nested too deep and does not contain too many nodes.
+        Structure is traversed iteratively, so it is safe to use before any recursive processing.
+        Simple arrays (values of `in_`/`nin` operations) count as a single node.
+
+        Args:
+            filtering: Filtering structure (or dictionary) to be verified.
+            max_depth: Maximum allowed depth of nesting.
+            max_nodes: Maximum allowed number of nodes.
+
+        Raises:
+            InvalidFilteringStructureError: If any of the limits is exceeded.
+        """
+        QueryBuilder.measure_filtering(filtering, max_depth, max_nodes)
+
+    @staticmethod
+    def measure_filtering(
+        filtering: QsRoot | dict[str, t.Any], max_depth: int = DEFAULT_MAX_DEPTH, max_nodes: int = DEFAULT_MAX_NODES
+    ) -> FilterCost:
+        """
+        Measures complexity of the filtering structure, verifying its size on the way (see `verify_filtering_size`).
+        Only the plain structure is inspected - nothing is resolved or built, invalid parts are left to be reported
+        by building the filter.
+
+        Args:
+            filtering: Filtering structure (or dictionary) to be measured.
+            max_depth: Maximum allowed depth of nesting.
+            max_nodes: Maximum allowed number of nodes.
+
+        Raises:
+            InvalidFilteringStructureError: If any of the size limits is exceeded.
+
+        Returns:
+            Measured cost of the filtering.
+        """
+        if isinstance(filtering, QsRoot):
+            stack = [(child.key, child, 1) for child in filtering.children]
+            is_node = True
         else:
-            # 1.2 if it's not a leaf - key can be either a junction or a column name
-            # column name only if parent_column is None - meaning if parent_column is set, the key must be a junction
-            if parent_column is not None:
-                if node.key not in QueryBuilder.JUNCTIONS:
-                    raise InvalidFilteringStructureError(
-                        f"Parent column is set - <{parent_column}> - for nested node, key must be a junction."
-                    )
-                for child in node.value:
-                    QueryBuilder.process_node(child, parent_column)
+            stack = [(key, value, 1) for key, value in filtering.items()]
+            is_node = False
+        node_count = deepest = leaves = or_fanout = list_length = order_by = score = 0
+        limit = None
+        while stack:
+            key, current, depth = stack.pop()
+            node_count += 1
+            if node_count > max_nodes:
+                raise InvalidFilteringStructureError(f"Filtering exceeds maximum number of nodes ({max_nodes}).")
+            if depth > max_depth:
+                raise InvalidFilteringStructureError(f"Filtering exceeds maximum depth of nesting ({max_depth}).")
+            deepest = max(deepest, depth)
+            # split node into plain value, list of values or nested items
+            value, values, children = None, None, None
+            if is_node:
+                if current.is_leaf:
+                    value = current.value
+                elif current.is_simple_array_branch:
+                    values = [child.value for child in current.value]
+                else:
+                    children = [(child.key, child) for child in current.value]
+            elif isinstance(current, dict):
+                if is_simple_array_dict(current):
+                    values = list(current.values())
+                else:
+                    children = list(current.items())
+            elif isinstance(current, list):
+                if is_simple_array(current):
+                    values = current
+                else:
+                    children = list(enumerate(current))
             else:
-                # parent column is not set - key cannot be an operation name
-                resolved_columns = []
-                if node.key in QueryBuilder.OPERATIONS:
-                    raise InvalidFilteringStructureError(
-                        f"Parent column is not set - cannot apply operation <{node.key}>."
-                    )
-                if node.key in QueryBuilder.JUNCTIONS:
-                    # if it's a junction - recursively process children
-                    for child in node.value:
-                        # either returns a list of columns or raises an exception - cannot be None
-                        resolved_columns.extend(QueryBuilder.process_node(child))
-                # NOTE: also, it can be multi-use of same junction in array-like format
-                elif isinstance(node.key, int):
-                    # key is an index - verify children - they must be either operations or junctions
-                    for child in node.value:
-                        resolved_columns.extend(QueryBuilder.process_node(child))
+                value = current
+            if children is not None:
+                if key == "or":
+                    or_fanout = max(or_fanout, len(children))
+                    score += COST_OR_BRANCH * max(len(children) - 1, 0)
+                stack.extend((child_key, child, depth + 1) for child_key, child in children)
+            elif key == "order_by":
+                count = len(values) if values is not None else 1
+                order_by += count
+                score += COST_ORDER_BY * count
+            elif key == "limit":
+                try:
+                    limit = int(value)
+                except (TypeError, ValueError):
+                    # reported when keyword is processed
+                    pass
+            elif key not in QueryBuilder.KEYWORDS:
+                leaves += 1
+                if values is not None:
+                    list_length = max(list_length, len(values))
+                    score += max(COST_LIST_ITEM * len(values), COST_LEAF)
                 else:
-                    # key is a column name - verify children - they must be either operations or junctions
-                    for child in node.value:
-                        # returns either `None` or raises an exception
-                        QueryBuilder.process_node(child, node.key)
-                    resolved_columns.append(node.key)
-                return resolved_columns
+                    score += COST_LEAF
+        return FilterCost(node_count, deepest, leaves, or_fanout, list_length, order_by, limit, score)
 
     @staticmethod
     def load_filtering(dict_filtering: dict[str, t.Any]) -> QsRoot:
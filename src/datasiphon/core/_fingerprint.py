@@ -0,0 +1,133 @@
+import typing as t
+import decimal
+import enum
+import hashlib
+import json
+
+from ._filter_core import CURSOR_TYPES, SHAPE_VALUE, SHAPE_LIST
+
+# pair of digests of a filter node - (digest with values, digest of shape without values)
+Digest = tuple[bytes, bytes]
+
+DIGEST_SIZE = 16
+
+
+class FilterFingerprint(t.NamedTuple):
+    """
+    Canonical fingerprint of a filter.
+    `value` identifies the filter including its values, `shape` ignores values (except `None`/`bool` values and
+    `order_by` columns - same as `filter_shape`). Both are insensitive to order of nested expressions of junctions,
+    order of keys and order of `in_`/`nin` values.
+    """
+
+    value: str
+    shape: str
+
+
+def canonical_value(value: t.Any) -> str:
+    """
+    Encodes value into canonical string - equal values of different (numeric) types have the same encoding,
+    collections are encoded regardless of order of their items.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float, decimal.Decimal)):
+        number = decimal.Decimal(str(value)) if isinstance(value, float) else decimal.Decimal(value)
+        return f"n:{number.normalize():f}" if number.is_finite() else f"n:{number}"
+    if isinstance(value, str):
+        return f"s:{json.dumps(value)}"
+    if isinstance(value, enum.Enum):
+        return f"e:{value.name}"
+    for tag, (value_type, _) in CURSOR_TYPES.items():
+        if isinstance(value, value_type):
+            return f"{tag}:{value}" if tag in ("dec", "uuid") else f"{tag}:{value.isoformat()}"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return "[" + ",".join(sorted({canonical_value(item) for item in value})) + "]"
+    if isinstance(value, dict):
+        items = sorted(f"{json.dumps(str(key))}:{canonical_value(item)}" for key, item in value.items())
+        return "{" + ",".join(items) + "}"
+    return f"r:{value!r}"
+
+
+def shape_value(value: t.Any) -> str:
+    """
+    Encodes value into shape - only `None` and `bool` values are kept.
+    """
+    if value is None or isinstance(value, bool):
+        return canonical_value(value)
+    return SHAPE_LIST if isinstance(value, (list, tuple, set, frozenset)) else SHAPE_VALUE
+
+
+def _digest(*parts: bytes) -> bytes:
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for part in parts:
+        # length prefix - parts cannot be confused with each other
+        hasher.update(len(part).to_bytes(4, "big"))
+        hasher.update(part)
+    return hasher.digest()
+
+
+def leaf_digest(column: str, operation: str, value: t.Any) -> Digest:
+    """
+    Creates digests of simple expression.
+    """
+    return (
+        _digest(b"L", str(column).encode(), operation.encode(), canonical_value(value).encode()),
+        leaf_shape_digest(column, operation, value),
+    )
+
+
+def junction_digest(junction: str, nested: t.Sequence[Digest]) -> Digest | None:
+    """
+    Creates digests of junction from digests of its nested expressions (regardless of their order).
+    Junction of a single expression is the expression itself, empty junction has no digest.
+    """
+    if len(nested) == 0:
+        return None
+    if len(nested) == 1:
+        return nested[0]
+    junction = junction.encode()
+    return (
+        _digest(b"J", junction, *sorted(digest[0] for digest in nested)),
+        _digest(b"J", junction, *sorted(digest[1] for digest in nested)),
+    )
+
+
+def leaf_shape_digest(column: str, operation: str, value: t.Any) -> bytes:
+    """
+    Creates shape digest of simple expression (same as shape part of `leaf_digest`).
+    """
+    return _digest(b"L", str(column).encode(), operation.encode(), shape_value(value).encode())
+
+
+def junction_shape_digest(junction: str, nested: t.Sequence[bytes]) -> bytes:
+    """
+    Creates shape digest of junction (same as shape part of `junction_digest`).
+    """
+    if len(nested) == 1:
+        return nested[0]
+    return _digest(b"J", junction.encode(), *sorted(nested))
+
+
+def filter_fingerprint(expression: Digest | None, keywords: dict[str, t.Any]) -> FilterFingerprint:
+    """
+    Creates fingerprint of a filter from digests of its expression and keywords
+    (`limit`, `offset`, `order_by` and `after` - ordering is kept in order of the columns).
+    """
+    values, shapes = [], []
+    for keyword in sorted(keywords):
+        keyword_value = keywords[keyword]
+        if keyword == "order_by":
+            ordering = keyword_value if isinstance(keyword_value, list) else [keyword_value]
+            values.append(f"{keyword}={json.dumps(ordering)}")
+            shapes.append(values[-1])
+        else:
+            values.append(f"{keyword}={canonical_value(keyword_value)}")
+            shapes.append(f"{keyword}={shape_value(keyword_value)}")
+    value_digest, shape_digest = expression if expression is not None else (b"", b"")
+    return FilterFingerprint(
+        _digest(b"F", value_digest, "&".join(values).encode()).hex(),
+        _digest(b"F", shape_digest, "&".join(shapes).encode()).hex(),
+    )
@@ -0,0 +1,409 @@
+import typing as t
+
+from qstion._struct_core import QsRoot, QsNode
+from ._exc import (
+    SiphonError,
+    ColumnError,
+    InvalidFilteringStructureError,
+    InvalidValueTypeError,
+    BadFormatError,
+    BudgetExceededError,
+)
+from ._filter_core import (
+    CURSOR_TYPES,
+    DEFAULT_MAX_DEPTH,
+    DEFAULT_MAX_NODES,
+    AnyValue,
+    ColumnFilterRestriction,
+    FilterBudget,
+    QueryBuilder,
+    RestrictionPolicy,
+    _encode_cursor_value,
+    coerce_value,
+    compile_coercer,
+    decode_cursor,
+    get_operation,
+    is_simple_array,
+    is_simple_array_dict,
+    parse_integer_keyword,
+    parse_order_by,
+)
+
+# version of format of exported schema (see `FilterSchema.to_dict`)
+SCHEMA_VERSION = 1
+
+
+class ColumnSchema(t.NamedTuple):
+    """
+    Accepted column reference of filtering.
+    """
+
+    # key of referenced column - restrictions are looked up by it
+    key: str
+    # name of python type of column values (None if unknown)
+    type: str | None
+    nullable: bool
+    # names of allowed values of enum columns
+    values: list[str] | None = None
+
+
+class Violation(t.NamedTuple):
+    """
+    Single violation of filtering found by `FilterValidator`.
+    """
+
+    # dotted path of the offending node - empty for violations of the whole filtering
+    path: str
+    error: type[SiphonError]
+    message: str
+
+    def to_dict(self) -> dict[str, str]:
+        return {"path": self.path, "error": self.error.__name__, "message": self.message}
+
+
+def _encode_value(value: t.Any) -> t.Any:
+    """
+    Encodes restricted value into JSON-serializable form - same format as values of cursor.
+    """
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(item) for item in value]
+    return _encode_cursor_value(value)
+
+
+def _decode_value(value: t.Any) -> t.Any:
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    if isinstance(value, dict):
+        ((tag, raw),) = value.items()
+        return CURSOR_TYPES[tag][1](raw)
+    return value
+
+
+class FilterSchema:
+    """
+    Precompiled schema of accepted filtering - column references, primary key of the query (tie-breaker of keyset
+    pagination), restrictions, limits of filtering size and complexity and whether values are coerced by column type.
+    Contains no SQLAlchemy objects (exported from a builder by `SqlQueryBuilder.export_schema`), can be exported
+    into JSON-serializable form by `to_dict` and loaded back by `from_dict`.
+    """
+
+    columns: dict[str, ColumnSchema]
+    policy: RestrictionPolicy
+    max_depth: int
+    max_nodes: int
+    budget: FilterBudget | None
+    coerce_values: bool
+    # keys of primary key columns of the query
+    primary_key: list[str]
+
+    def __init__(
+        self,
+        columns: dict[str, ColumnSchema],
+        policy: RestrictionPolicy | None = None,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        max_nodes: int = DEFAULT_MAX_NODES,
+        budget: FilterBudget | None = None,
+        coerce_values: bool = False,
+        primary_key: list[str] | None = None,
+    ) -> None:
+        self.columns = columns
+        self.policy = policy if policy is not None else RestrictionPolicy()
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.budget = budget
+        self.coerce_values = coerce_values
+        self.primary_key = primary_key if primary_key is not None else []
+
+    def column(self, column_ref: str) -> ColumnSchema:
+        """
+        Resolves column reference.
+
+        Raises:
+            ColumnError: If the column is not accepted.
+        """
+        column = self.columns.get(column_ref)
+        if column is None:
+            raise ColumnError(f"Column {column_ref} not found in query columns.")
+        return column
+
+    def to_dict(self) -> dict[str, t.Any]:
+        """
+        Exports the schema into JSON-serializable dictionary - restricted values that are not JSON native are tagged
+        (`{"dt": "2024-01-01T00:00:00"}`), operations restricted as a whole are marked by `"*"`.
+        """
+        return {
+            "version": SCHEMA_VERSION,
+            "columns": {column_ref: column._asdict() for column_ref, column in self.columns.items()},
+            "restrictions": {
+                column_name: {
+                    operation_name: (
+                        "*"
+                        if forbidden is AnyValue
+                        else [
+                            _encode_value(value)
+                            for value in (*sorted(forbidden.hashable, key=repr), *forbidden.unhashable)
+                        ]
+                    )
+                    for operation_name, forbidden in operations.items()
+                }
+                for column_name, operations in self.policy.items()
+            },
+            "max_depth": self.max_depth,
+            "max_nodes": self.max_nodes,
+            "budget": vars(self.budget).copy() if self.budget is not None else None,
+            "coerce_values": self.coerce_values,
+            "primary_key": self.primary_key,
+            "operations": sorted(QueryBuilder.OPERATIONS),
+            "junctions": sorted(QueryBuilder.JUNCTIONS),
+            "keywords": sorted(QueryBuilder.KEYWORDS),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, t.Any]) -> "FilterSchema":
+        """
+        Loads the schema exported by `to_dict`.
+
+        Raises:
+            ValueError: If the schema was exported in different version of the format.
+        """
+        if data.get("version") != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported schema version: {data.get('version')}")
+        restrictions = []
+        for column_name, operations in data["restrictions"].items():
+            restricted = []
+            for operation_name, forbidden in operations.items():
+                operation = get_operation(operation_name)
+                if forbidden == "*":
+                    restricted.append(operation.generate_restriction(AnyValue))
+                else:
+                    restricted.extend(operation.generate_restriction(_decode_value(value)) for value in forbidden)
+            restrictions.append(ColumnFilterRestriction(column_name, *restricted))
+        budget = data.get("budget")
+        return cls(
+            {column_ref: ColumnSchema(**column) for column_ref, column in data["columns"].items()},
+            RestrictionPolicy(*restrictions),
+            data["max_depth"],
+            data["max_nodes"],
+            FilterBudget(**budget) if budget is not None else None,
+            data.get("coerce_values", False),
+            data.get("primary_key"),
+        )
+
+
+class FilterValidator(QueryBuilder):
+    """
+    Validates filtering against `FilterSchema` without building anything (and without SQLAlchemy).
+    All violations are reported in a single pass - structure of nodes (same rules as `verify_filtering`), column
+    references, values of operations, restrictions, keywords (including keyset pagination against the ordering),
+    size and complexity budget.
+    Filtering without violations passes the same checks when it is built by the builder the schema was exported from.
+    """
+
+    schema: FilterSchema
+    coercers: dict[str, t.Callable[[t.Any], t.Any] | None]
+
+    def __init__(self, schema: FilterSchema) -> None:
+        super().__init__({})
+        self.schema = schema
+        # coercers of column values compiled once per column (none if values are not coerced)
+        self.coercers = (
+            {column_ref: compile_coercer(column.type, column.values) for column_ref, column in schema.columns.items()}
+            if schema.coerce_values
+            else {}
+        )
+
+    def validate(self, filtering: QsRoot | dict[str, t.Any]) -> list[Violation]:
+        """
+        Validates the filtering.
+
+        Args:
+            filtering: Filtering structure (or dictionary) to be validated.
+
+        Returns:
+            List of all violations found (empty for valid filtering). Filtering exceeding size limits
+            is not inspected any further.
+        """
+        if not isinstance(filtering, (QsRoot, dict)):
+            raise ValueError(f"Unsupported input filtering type: {type(filtering)}")
+        try:
+            cost = self.measure_filtering(filtering, self.schema.max_depth, self.schema.max_nodes)
+        except InvalidFilteringStructureError as e:
+            return [Violation("", InvalidFilteringStructureError, str(e))]
+        violations = []
+        if self.schema.budget is not None:
+            violations.extend(
+                Violation("", BudgetExceededError, message) for message in self.schema.budget.violations(cost)
+            )
+        if isinstance(filtering, QsRoot):
+            children = filtering.children
+        else:
+            children = []
+            for key, value in filtering.items():
+                try:
+                    children.append(QsNode.load_from_dict(key, value))
+                except ValueError as e:
+                    violations.append(Violation(str(key), InvalidFilteringStructureError, str(e)))
+        # validated keywords - keyword -> (path, parsed value)
+        keywords = {}
+        # nodes are visited in preorder using explicit stack - (node, parent column, path of the node)
+        stack = [(child, None, str(child.key)) for child in reversed(children)]
+        while stack:
+            node, column, path = stack.pop()
+            if self.is_keyword(node.key):
+                try:
+                    keywords[node.key] = (path, self.validate_keyword(node))
+                except SiphonError as e:
+                    violations.append(Violation(path, type(e), str(e)))
+                    keywords[node.key] = (path, e)
+                continue
+            try:
+                child_column = self.validate_node(node, column)
+            except SiphonError as e:
+                violations.append(Violation(path, type(e), str(e)))
+                if not isinstance(e, ColumnError):
+                    # subtree of invalid node is not inspected - nested operations of unknown column still are
+                    continue
+                child_column = node.key
+            if child_column is not False:
+                stack.extend((child, child_column, f"{path}.{child.key}") for child in reversed(node.value))
+        cursor = keywords.get(self.KEYSET_KEYWORD)
+        order_by = keywords.get("order_by", (None, []))[1]
+        if cursor is not None and not isinstance(cursor[1], SiphonError) and not isinstance(order_by, SiphonError):
+            try:
+                self.validate_keyset(order_by, cursor[1])
+            except SiphonError as e:
+                violations.append(Violation(cursor[0], type(e), str(e)))
+        return violations
+
+    def check(self, filtering: QsRoot | dict[str, t.Any]) -> None:
+        """
+        Validates the filtering, raising the first violation.
+
+        Raises:
+            SiphonError: Error of the first violation.
+        """
+        violations = self.validate(filtering)
+        if violations:
+            raise violations[0].error(f"{violations[0].path}: {violations[0].message}")
+
+    def validate_node(self, node: QsNode, parent_column: str | None) -> str | None | t.Literal[False]:
+        """
+        Validates a single node of filtering.
+
+        Returns:
+            Parent column of nested nodes, `False` if the node has no nested nodes to validate.
+
+        Raises:
+            SiphonError: If the node is invalid.
+        """
+        if self.is_keyword(node.key):
+            self.validate_keyword(node)
+            return False
+        is_leaf = node.is_leaf or node.is_simple_array_branch
+        self.verify_node_key(node.key, is_leaf, parent_column)
+        if is_leaf:
+            value = node.value if node.is_leaf else [child.value for child in node.value]
+            self.validate_operation(parent_column, node.key, value)
+            return False
+        if parent_column is not None:
+            # nested junction of operations for parent column
+            return parent_column
+        if node.key in self.JUNCTIONS or isinstance(node.key, int):
+            return None
+        self.schema.column(node.key)
+        return node.key
+
+    def validate_operation(self, column_ref: str, operation_name: str, value: t.Any) -> None:
+        """
+        Validates value of the operation (coerced by column type if enabled) and checks it against restrictions
+        of the column.
+
+        Raises:
+            InvalidValueTypeError: If the value is not valid for the operation or column type.
+            FiltrationNotAllowed: If the operation is restricted.
+        """
+        coercer = self.coercers.get(column_ref)
+        if coercer is not None:
+            value = coerce_value(coercer, value)
+        operation = get_operation(operation_name)(value)
+        column = self.schema.columns.get(column_ref)
+        if column is not None:
+            # unknown column is reported by its node
+            self.schema.policy.check(column.key, operation)
+
+    def is_keyword(self, key: str | int) -> bool:
+        """
+        Checks whether the key of a node is a keyword - same rules as the builder (keyset keyword is a column
+        reference if the schema has a column of the same name).
+        """
+        if key not in self.KEYWORDS:
+            return False
+        return key != self.KEYSET_KEYWORD or key not in self.schema.columns
+
+    def validate_keyword(self, node: QsNode) -> t.Any:
+        """
+        Validates keyword node - same checks as processing of keywords by the builder.
+
+        Returns:
+            Parsed value of the keyword - integer (`limit`, `offset`), list of column references (`order_by`)
+            or values of the cursor (`after` - None for the first page).
+
+        Raises:
+            SiphonError: If the keyword is invalid.
+        """
+        keyword = node.key
+        if node.is_leaf:
+            value = node.value
+        elif node.is_simple_array_branch:
+            value = [child.value for child in node.value]
+        else:
+            value = node.to_dict()
+        if keyword in ("limit", "offset"):
+            if isinstance(value, (dict, list)):
+                raise InvalidValueTypeError(f"{keyword.capitalize()} keyword should be a leaf node.")
+            return parse_integer_keyword(keyword, value)
+        elif keyword == "order_by":
+            if isinstance(value, dict) and is_simple_array_dict(value):
+                value = list(value.values())
+            if isinstance(value, list) and is_simple_array(value):
+                items = value
+            elif not isinstance(value, (dict, list)):
+                items = [value]
+            else:
+                raise InvalidValueTypeError("Order by keyword should be either a leaf node or a simple array node.")
+            column_refs = []
+            for item in items:
+                _, column_ref = parse_order_by(item)
+                self.schema.column(column_ref)
+                column_refs.append(column_ref)
+            return column_refs
+        else:
+            if isinstance(value, (dict, list)):
+                raise InvalidValueTypeError(f"{keyword.capitalize()} keyword should be a leaf node.")
+            if value is None or value == "":
+                return None
+            if not isinstance(value, str):
+                raise InvalidValueTypeError(f"{keyword.capitalize()} keyword should be a cursor string.")
+            return decode_cursor(value)
+
+    def validate_keyset(self, order_by: list[str], after: list[t.Any] | None) -> None:
+        """
+        Validates keyset pagination - same checks as the builder: primary key of the query (tie-breaker appended
+        to the ordering) is required and the cursor has a value for each column of the ordering.
+
+        Args:
+            order_by: Column references of `order_by` keyword.
+            after: Values of the cursor, None for the first page.
+
+        Raises:
+            ColumnError: If the query has no primary key.
+            BadFormatError: If the cursor does not match the ordering.
+        """
+        if not self.schema.primary_key:
+            raise ColumnError("Keyset pagination requires primary key column in query columns.")
+        if after is None:
+            return
+        ordered = [self.schema.column(column_ref).key for column_ref in order_by]
+        tiebreaker = [key for key in self.schema.primary_key if key not in ordered]
+        if len(after) != len(ordered) + len(tiebreaker):
+            raise BadFormatError("Cursor does not match ordering.")
@@ -15,21 +15,52 @@ from sqlalchemy.sql.elements import (
     Label,
     BinaryExpression,
     BindParameter,
+    Over,
+    AsBoolean,
+    False_,
+    True_,
 )
 from sqlalchemy.sql.selectable import ScalarSelect
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql import visitors
 import sqlalchemy.sql.operators as sql_operators
 from sqlalchemy.sql.functions import ReturnTypeFromArgs
 from sqlalchemy.sql.base import ColumnCollection
 from sqlalchemy.sql.sqltypes import TypeEngine, NullType
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.engine import Dialect
 from qstion._struct_core import QsRoot, QsNode
 import enum
 import typing as t
-from copy import deepcopy
+import datetime
+import decimal
+import weakref
+from copy import copy
 
 from .core import _filter_core as core
-from .core._exc import ColumnError, CannotAdjustExpression, FiltrationNotAllowed, InvalidValueTypeError
+from .core._fingerprint import (
+    Digest,
+    FilterFingerprint,
+    leaf_digest,
+    junction_digest,
+    leaf_shape_digest,
+    junction_shape_digest,
+    filter_fingerprint,
+)
+from .core._cache import LRUCache, PlanCache
+from .core._validation import FilterSchema, ColumnSchema
+from .core._exc import (
+    ColumnError,
+    CannotAdjustExpression,
+    InvalidValueTypeError,
+    BadFormatError,
+    StaleSnapshotError,
+)
 
 import functools
+import hashlib
+import pickle
+import types
 
 
 def is_nullable(column: t.Any) -> bool:
@@ -82,6 +113,56 @@ def is_bool_type(column: ColumnElement) -> bool:
     return isinstance(column.type, (sa.Boolean, sa.BOOLEAN))
 
 
+class ColumnInfo:
+    """
+    Precomputed metadata of a column element used in filtering - avoids repeated inspection of the element
+    (nullability, boolean type) for every evaluated expression.
+    """
+
+    element: ColumnElement
+    nullable: bool
+    is_bool: bool
+    python_type: type | None
+    # names of allowed values of enum column
+    values: list[str] | None
+    # coercer of filtered values (see `core.compile_coercer`), None if values of the column are not coerced
+    coerce: t.Callable[[t.Any], t.Any] | None
+
+    def __init__(self, element: ColumnElement) -> None:
+        self.element = element
+        try:
+            self.nullable = is_nullable(element)
+        except AttributeError:
+            # element without nullability information
+            self.nullable = False
+        self.is_bool = is_bool_type(element)
+        try:
+            self.python_type = element.type.python_type
+        except NotImplementedError:
+            self.python_type = None
+        values = getattr(element.type, "enums", None)
+        self.values = list(values) if values is not None else None
+        self.coerce = core.compile_coercer(
+            self.python_type.__name__ if self.python_type is not None else None, self.values
+        )
+
+    def eq(self, value: t.Any) -> ColumnElement:
+        """
+        Equality evaluator - same semantics as `SQLEq.evaluate`.
+        """
+        if (self.nullable and value is None) or self.is_bool:
+            return self.element.is_(value)
+        return self.element == value
+
+    def ne(self, value: t.Any) -> ColumnElement:
+        """
+        Non-equality evaluator - same semantics as `SQLNe.evaluate`.
+        """
+        if (self.nullable and value is None) or self.is_bool:
+            return self.element.isnot(value)
+        return self.element != value
+
+
 class Junction(enum.Enum):
     """
     Enum that represents a junction in SQL.
@@ -97,7 +178,11 @@ class Junction(enum.Enum):
 
 class SQLEq(core.Equals):
 
-    def evaluate(self, column: ColumnElement) -> ColumnElement:
+    __slots__ = ()
+
+    def evaluate(self, column: ColumnElement, info: ColumnInfo | None = None) -> ColumnElement:
+        if info is not None:
+            return info.eq(self.assigned_value)
         # if null handling is set, evaluate normally
         # otherwise implicitely coalesce null values as infinity and use that for comparison
         if (is_nullable(column) and self.assigned_value is None) or is_bool_type(column):
@@ -107,7 +192,11 @@ class SQLEq(core.Equals):
 
 class SQLNe(core.NotEquals):
 
-    def evaluate(self, column: ColumnElement) -> ColumnElement:
+    __slots__ = ()
+
+    def evaluate(self, column: ColumnElement, info: ColumnInfo | None = None) -> ColumnElement:
+        if info is not None:
+            return info.ne(self.assigned_value)
         if (is_nullable(column) and self.assigned_value is None) or is_bool_type(column):
             return column.isnot(self.assigned_value)
         return column != self.assigned_value
@@ -115,40 +204,219 @@ class SQLNe(core.NotEquals):
 
 class SQLGt(core.GreaterThan):
 
-    def evaluate(self, column: ColumnElement) -> ColumnElement:
+    __slots__ = ()
+
+    def evaluate(self, column: ColumnElement, info: ColumnInfo | None = None) -> ColumnElement:
         return column > self.assigned_value
 
 
 class SQLGe(core.GreaterThanOrEqual):
 
-    def evaluate(self, column: ColumnElement) -> ColumnElement:
+    __slots__ = ()
+
+    def evaluate(self, column: ColumnElement, info: ColumnInfo | None = None) -> ColumnElement:
         return column >= self.assigned_value
 
 
 class SQLLt(core.LessThan):
 
-    def evaluate(self, column: ColumnElement) -> ColumnElement:
+    __slots__ = ()
+
+    def evaluate(self, column: ColumnElement, info: ColumnInfo | None = None) -> ColumnElement:
         return column < self.assigned_value
 
 
 class SQLLe(core.LessThanOrEqual):
 
-    def evaluate(self, column: ColumnElement) -> ColumnElement:
+    __slots__ = ()
+
+    def evaluate(self, column: ColumnElement, info: ColumnInfo | None = None) -> ColumnElement:
         return column <= self.assigned_value
 
 
+def unique_values(values: list) -> list:
+    """
+    Deduplicates and sorts values, so equal sets of values produce equal lists.
+    Values that cannot be sorted keep their first-seen order, unhashable values are kept as they are.
+    """
+    try:
+        unique = list(dict.fromkeys(values))
+    except TypeError:
+        return values
+    try:
+        return sorted(unique)
+    except TypeError:
+        return unique
+
+
+class InListStrategy(enum.Enum):
+    """
+    Enum that represents a way of rendering `in_`/`nin` list of values in SQL.
+    """
+
+    # column IN (...) - list bound the SQLAlchemy default way (legacy behaviour)
+    DEFAULT = "default"
+    # column IN (__[POSTCOMPILE_p]) - single expanding bind parameter
+    EXPANDING = "expanding"
+    # column = ANY(:p) / column != ALL(:p) - single array parameter (PostgreSQL)
+    ANY = "any"
+    # column IN (...) OR column IN (...) - chunks of limited size with values rendered at execution time,
+    # avoids limits on number of bound parameters (SQLite) and on length of a single list
+    CHUNKED = "chunked"
+    # column IN (SELECT value FROM (VALUES ...)) - values joined as a derived table (not supported by SQLite)
+    VALUES = "values"
+
+    @classmethod
+    def from_str(cls, value: str) -> "InListStrategy":
+        return cls[value.upper()]
+
+
+class InListOptions:
+    """
+    Configuration of rendering `in_`/`nin` lists of values.
+    Lists longer than `values_threshold` are rendered as VALUES derived table regardless of the strategy.
+    Unless `normalize` is disabled, values are deduplicated and sorted before binding,
+    so repeated lists share one statement.
+    """
+
+    strategy: InListStrategy
+    chunk_size: int
+    values_threshold: int | None
+    normalize: bool
+
+    def __init__(
+        self,
+        strategy: InListStrategy | str = InListStrategy.EXPANDING,
+        chunk_size: int = 500,
+        values_threshold: int | None = None,
+        normalize: bool = True,
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be a positive integer.")
+        self.strategy = InListStrategy.from_str(strategy) if isinstance(strategy, str) else strategy
+        self.chunk_size = chunk_size
+        self.values_threshold = values_threshold
+        self.normalize = normalize
+
+    @property
+    def plannable(self) -> bool:
+        """
+        Whether rendered statement does not depend on the number of values - list can be bound into prebuilt plan.
+        """
+        return self.values_threshold is None and self.strategy in (
+            InListStrategy.DEFAULT,
+            InListStrategy.EXPANDING,
+            InListStrategy.ANY,
+        )
+
+    def prepare(self, values: list) -> list:
+        """
+        Prepares values for binding.
+        """
+        return unique_values(values) if self.normalize and isinstance(values, list) else values
+
+    def evaluate(self, column: ColumnElement, values: list | BindParameter, negate: bool = False) -> ColumnElement:
+        """
+        Creates `in_` (or `nin` if negated) clause for the column.
+        :param column: Column to filter.
+        :param values: List of values or bind parameter of prebuilt plan.
+        :param negate: Whether to create `nin` clause.
+        """
+        if isinstance(values, BindParameter):
+            # plan template (values are bound later - see `plannable`) or deterministic compilation
+            if self.strategy == InListStrategy.ANY:
+                array_type = sa.ARRAY(column.type)
+                param = (
+                    sa.bindparam(values.key, type_=array_type)
+                    if values.required
+                    else sa.bindparam(values.key, values.value, type_=array_type)
+                )
+                return self.evaluate_any(column, param, negate)
+            return column.not_in(values) if negate else column.in_(values)
+        values = self.prepare(values)
+        strategy = self.strategy
+        if self.values_threshold is not None and len(values) > self.values_threshold:
+            strategy = InListStrategy.VALUES
+        if strategy == InListStrategy.EXPANDING:
+            values = sa.bindparam(None, values, expanding=True)
+        elif strategy == InListStrategy.ANY:
+            return self.evaluate_any(column, sa.bindparam(None, values, type_=sa.ARRAY(column.type)), negate)
+        elif strategy == InListStrategy.CHUNKED and len(values) > self.chunk_size:
+            chunks = [
+                sa.bindparam(None, values[i : i + self.chunk_size], expanding=True, literal_execute=True)
+                for i in range(0, len(values), self.chunk_size)
+            ]
+            if negate:
+                return sa_and(*(column.not_in(chunk) for chunk in chunks))
+            return sa_or(*(column.in_(chunk) for chunk in chunks))
+        elif strategy == InListStrategy.CHUNKED:
+            values = sa.bindparam(None, values, expanding=True, literal_execute=True)
+        elif strategy == InListStrategy.VALUES and values:
+            values_clause = sa.values(sa.column("value", column.type), name="in_values").data(
+                [(value,) for value in values]
+            )
+            values = sa.select(values_clause.c.value)
+        return column.not_in(values) if negate else column.in_(values)
+
+    @staticmethod
+    def evaluate_any(column: ColumnElement, param: BindParameter, negate: bool) -> ColumnElement:
+        return column != sa.all_(param) if negate else column == sa.any_(param)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(strategy={self.strategy.value}, chunk_size={self.chunk_size}, "
+            f"values_threshold={self.values_threshold}, normalize={self.normalize})"
+        )
+
+
 class SQLIn(core.In):
 
-    def evaluate(self, column: ColumnElement) -> ColumnElement:
+    __slots__ = ("in_list",)
+
+    in_list: InListOptions | None
+
+    def __init__(self, value: list) -> None:
+        super().__init__(value)
+        self.in_list = None
+
+    def evaluate(self, column: ColumnElement, info: ColumnInfo | None = None) -> ColumnElement:
+        if self.in_list is not None:
+            return self.in_list.evaluate(column, self.assigned_value)
         return column.in_(self.assigned_value)
 
 
 class SQLNotIn(core.NotIn):
 
-    def evaluate(self, column: ColumnElement) -> ColumnElement:
+    __slots__ = ("in_list",)
+
+    in_list: InListOptions | None
+
+    def __init__(self, value: list) -> None:
+        super().__init__(value)
+        self.in_list = None
+
+    def evaluate(self, column: ColumnElement, info: ColumnInfo | None = None) -> ColumnElement:
+        if self.in_list is not None:
+            return self.in_list.evaluate(column, self.assigned_value, negate=True)
         return column.notin_(self.assigned_value)
 
 
+class SQLFalse(core.FilterOperation):
+    """
+    Operation that is never satisfied - used for contradicting filters (see `FilterExpression.simplify`).
+    """
+
+    __slots__ = ()
+
+    filter_name = "false"
+
+    def __init__(self) -> None:
+        super().__init__(None)
+
+    def evaluate(self, column: ColumnElement | None = None, info: ColumnInfo | None = None) -> ColumnElement:
+        return sa.false()
+
+
 def get_sql_operator(operator: str) -> t.Type[core.FilterOperation]:
     """
     Shortcut method that returns a SQL operator based on the string representation.
@@ -182,21 +450,100 @@ def get_restriction(
     return None
 
 
+class PathStep:
+    """
+    Single precompiled step of `ExpressionPath` - either junction (`and`, `or`) or simple expression definition
+    in format `column_name`, `column_name:operator` or `column_name:operator-value`.
+    """
+
+    __slots__ = ("definition", "junction", "column_name", "op_name", "op_value")
+
+    definition: str
+    junction: Junction | None
+    column_name: str
+    op_name: str | None
+    op_value: str | None
+
+    def __init__(self, definition: str) -> None:
+        self.definition = definition
+        self.junction = Junction.from_str(definition) if definition in core.QueryBuilder.JUNCTIONS else None
+        column_definition = definition.split(":", 1)
+        self.column_name = column_definition[0]
+        operator = column_definition[1] if len(column_definition) > 1 else None
+        self.op_name, self.op_value = operator.split("-", 1) if operator and "-" in operator else (operator, None)
+
+    def matches(self, expr: "FilterExpression") -> bool:
+        """
+        Checks if simple expression matches the step definition.
+        """
+        return (
+            expr.column.key == self.column_name
+            and (self.op_name is None or expr.operator.filter_name == self.op_name)
+            and (self.op_value is None or expr.operator.assigned_value == self.op_value)
+        )
+
+
+class ExpressionPath:
+    """
+    Precompiled path to a nested expression (see `FilterExpression.find_expression`).
+    Paths are split and parsed only once - `compile` caches compiled paths.
+    """
+
+    __slots__ = ("steps",)
+
+    steps: tuple[PathStep, ...]
+
+    def __init__(self, steps: tuple[PathStep, ...]) -> None:
+        self.steps = steps
+
+    @classmethod
+    def compile(cls, path: t.Union[list[str], str, "ExpressionPath"]) -> "ExpressionPath":
+        """
+        Compiles path given either as string separated by "." or as list of steps.
+        """
+        if isinstance(path, ExpressionPath):
+            return path
+        return _compile_path(tuple(path.split(".")) if isinstance(path, str) else tuple(path))
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __str__(self) -> str:
+        return ".".join(step.definition for step in self.steps)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_path(path: tuple[str, ...]) -> ExpressionPath:
+    return ExpressionPath(tuple(PathStep(step) for step in path))
+
+
 class FilterExpression:
     """
     Class that represents a filter expression in SQL - Tree structure.
+    SQL clauses are built lazily - only when the where clause is produced (`apply`/`produce_whereclause`),
+    so the expression can be inspected and adjusted without constructing any SQLAlchemy clause.
+    Produced clause of each node is memoized until the node changes (see `produce_whereclause`).
     """
 
+    __slots__ = ("junction", "nested_expressions", "column", "operator", "column_info", "_clause")
+
     junction: Junction | None
     nested_expressions: list["FilterExpression"]
     column: ColumnElement
     operator: core.FilterOperation
+    column_info: ColumnInfo | None
+    # memoized clause along with parts it was built from - see `produce_whereclause`
+    _clause: tuple | None
 
-    def __init__(self, column: ColumnElement, operator: core.FilterOperation):
+    def __init__(
+        self, column: ColumnElement, operator: core.FilterOperation, column_info: ColumnInfo | None = None
+    ) -> None:
         self.column = column
         self.operator = operator
+        self.column_info = column_info
         self.junction = None
         self.nested_expressions = []
+        self._clause = None
 
     @classmethod
     def joined_expressions(cls, junction: Junction, *expressions: "FilterExpression") -> "FilterExpression":
@@ -218,25 +565,112 @@ class FilterExpression:
             instance.nested_expressions = list(expressions)
             return instance
 
+    @classmethod
+    def always_false(cls) -> "FilterExpression":
+        """
+        Generates an expression that is never satisfied - result of contradicting filter.
+        """
+        return cls(None, SQLFalse())
+
     @property
     def is_junction(self) -> bool:
         return self.junction is not None
 
+    @property
+    def is_always_false(self) -> bool:
+        return not self.is_junction and isinstance(self.operator, SQLFalse)
+
     def apply(self, query: Select) -> Select:
         """
         Applies the filter expression to the query.
         """
         whereclause = self.produce_whereclause()
+        if isinstance(whereclause, True_):
+            # nothing to filter (e.g. empty junction)
+            return query
         return query.where(whereclause)
 
     def produce_whereclause(self) -> ColumnElement:
         """
         Creates a where clause based on the expression.
+        Clause of every node is memoized along with parts it was built from (compared by identity) - operation,
+        column and value of simple expression, junction and clauses of nested expressions of junction.
+        Repeated call rebuilds only nodes that changed since (and junctions above them), unchanged subtrees
+        reuse their clauses. Operations are expected not to be modified in place - replace the operation
+        (or the expression) to change its value.
+        """
+        whereclauses = []
+        for expr, count in self.post_order():
+            memo = expr._clause
+            if expr.is_junction:
+                nested_whereclauses = tuple(whereclauses[len(whereclauses) - count :])
+                del whereclauses[len(whereclauses) - count :]
+                if memo is not None and memo[0] is expr.junction and _same_items(memo[1], nested_whereclauses):
+                    whereclauses.append(memo[2])
+                    continue
+                present = [clause for clause in nested_whereclauses if clause is not None]
+                # empty junction is left out
+                clause = expr.junction.value(*present) if present else None
+                expr._memoize((expr.junction, nested_whereclauses, clause))
+            else:
+                operator = expr.operator
+                if (
+                    memo is not None
+                    and memo[0] is operator
+                    and memo[1] is operator.assigned_value
+                    and memo[2] is expr.column
+                    and memo[3] is expr.column_info
+                ):
+                    whereclauses.append(memo[4])
+                    continue
+                if expr.column_info is not None:
+                    clause = operator.evaluate(expr.column, expr.column_info)
+                else:
+                    clause = operator.evaluate(expr.column)
+                expr._memoize((operator, operator.assigned_value, expr.column, expr.column_info, clause))
+            whereclauses.append(clause)
+        return whereclauses[0] if whereclauses[0] is not None else sa.true()
+
+    def _memoize(self, memo: tuple) -> None:
+        self._clause = memo
+
+    def __getstate__(self) -> dict[str, t.Any]:
+        # memoized clause is not copied (or pickled) along with the expression
+        return {name: getattr(self, name) for name in FilterExpression.__slots__ if name != "_clause"}
+
+    def __setstate__(self, state: dict[str, t.Any]) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._clause = None
+
+    def post_order(self) -> t.Iterator[tuple["FilterExpression", int]]:
+        """
+        Iterates over the expression tree in post-order (nested expressions first) without recursion.
+        Yields pairs of expression and number of its nested expressions - so results of nested expressions
+        can be collected on a stack and taken by their junction.
+        """
+        stack = [(self, False)]
+        while stack:
+            expr, expanded = stack.pop()
+            if not expr.is_junction:
+                yield expr, 0
+            elif expanded:
+                yield expr, len(expr.nested_expressions)
+            else:
+                stack.append((expr, True))
+                stack.extend((nested, False) for nested in reversed(expr.nested_expressions))
+
+    def leaves(self) -> t.Iterator["FilterExpression"]:
         """
-        if self.is_junction:
-            nested_whereclauses = [expr.produce_whereclause() for expr in self.nested_expressions]
-            return self.junction.value(*nested_whereclauses)
-        return self.operator.evaluate(self.column)
+        Iterates over simple (non-junction) expressions in depth-first order.
+        """
+        stack = [self]
+        while stack:
+            expr = stack.pop()
+            if expr.is_junction:
+                stack.extend(reversed(expr.nested_expressions))
+            else:
+                yield expr
 
     def add_expression(
         self, path: list[str] | str, expression: "FilterExpression", use_junction: Junction = Junction.AND
@@ -262,16 +696,26 @@ class FilterExpression:
         target_expr = self.find_expression(path)
         if target_expr is None:
             raise CannotAdjustExpression("Destination expression not found.")
-        if target_expr.is_junction and target_expr.junction == use_junction:
-            target_expr.nested_expressions.append(expression)
-        else:
-            target_copy = deepcopy(target_expr)
-            target_expr.junction = use_junction
-            target_expr.nested_expressions = [target_copy, expression]
-            target_expr.column = None
-            target_expr.operator = None
+        target_expr.join(expression, use_junction)
 
-    def find_expression(self, path: list[str] | str) -> t.Union["FilterExpression", None]:
+    def join(self, expression: "FilterExpression", use_junction: Junction = Junction.AND) -> None:
+        """
+        Joins the expression to the current one - appended if current expression is junction of the same type,
+        otherwise content of the current expression is moved into a new node and current expression becomes
+        the junction of both.
+        """
+        if self.is_junction and self.junction == use_junction:
+            self.nested_expressions.append(expression)
+            return
+        moved_expr = FilterExpression(None, None)
+        moved_expr.replace(self)
+        self.junction = use_junction
+        self.nested_expressions = [moved_expr, expression]
+        self.column = None
+        self.operator = None
+        self.column_info = None
+
+    def find_expression(self, path: t.Union[list[str], str, ExpressionPath]) -> t.Union["FilterExpression", None]:
         """
         Finds an expression based on the path.
 
@@ -284,7 +728,7 @@ class FilterExpression:
         either `column_name` or `column_name:operator`, or even `column_name:operator-value`
 
         Args:
-            path (list[str] | str | None): A path to the nested expression.
+            path (list[str] | str | ExpressionPath | None): A path to the nested expression.
 
         Returns:
             FilterExpression: A found expression.
@@ -292,32 +736,41 @@ class FilterExpression:
         Raises:
             CannotAdjustExpression: If the path is invalid.
         """
-        if not isinstance(path, list):
-            path = path.split(".")
-        if len(path) == 0:
-            return self
-        # take first element from path
-        if path[0] in SqlQueryBuilder.JUNCTIONS and self.junction == Junction.from_str(path[0]):
-            if len(path) == 1:
-                return self
-            for expr in self.nested_expressions:
-                found_expr = expr.find_expression(path[1:])
-                if found_expr is not None:
-                    return found_expr
-            return None
-        elif self.column is not None:
-            # try to split the last element
-            column_definition = path[0].split(":")
-            column_name, operator = column_definition[0], column_definition[1] if len(column_definition) > 1 else None
-            op_name, op_value = operator.split("-") if operator and "-" in operator else (operator, None)
-            column_match = self.column.key == column_name
-            operator_match = (self.operator.filter_name == op_name) if op_name is not None else True
-            value_match = (self.operator.assigned_value == op_value) if op_value is not None else True
-            if column_match and operator_match and value_match:
-                return self
-            return None
-        else:
-            return None
+        entry = self.search(ExpressionPath.compile(path))
+        return entry[0] if entry is not None else None
+
+    def search(self, path: ExpressionPath) -> tuple | None:
+        """
+        Depth-first search of the expression on the path.
+        Returns entry of found expression - tuple of (expression, entry of its parent, index in parent),
+        parent entry of the current instance is None.
+        """
+        steps = path.steps
+        if len(steps) == 0:
+            return (self, None, -1)
+        # stack of entries with position in path they are matched against
+        stack = [((self, None, -1), 0)]
+        while stack:
+            entry, position = stack.pop()
+            expr, step = entry[0], steps[position]
+            if step.junction is not None and expr.junction == step.junction:
+                if position == len(steps) - 1:
+                    return entry
+                nested_expressions = expr.nested_expressions
+                stack.extend(
+                    ((nested_expressions[index], entry, index), position + 1)
+                    for index in range(len(nested_expressions) - 1, -1, -1)
+                )
+            elif expr.column is not None and step.matches(expr):
+                return entry
+        return None
+
+    def matches(self, definition: str) -> bool:
+        """
+        Checks if simple expression matches definition in format
+        `column_name`, `column_name:operator` or `column_name:operator-value`.
+        """
+        return PathStep(definition).matches(self)
 
     def replace_expression(self, path: list[str] | str, expression: "FilterExpression") -> None:
         """
@@ -332,8 +785,6 @@ class FilterExpression:
         if not path:
             self.replace(expression)
             return
-        if not isinstance(path, list):
-            path = path.split(".")
         target_expr = self.find_expression(path)
         if target_expr is None:
             raise CannotAdjustExpression("Destination expression not found.")
@@ -347,6 +798,9 @@ class FilterExpression:
         self.nested_expressions = other.nested_expressions
         self.column = other.column
         self.operator = other.operator
+        self.column_info = other.column_info
+        # memoized clause is checked against the parts - still valid for the same content
+        self._clause = other._clause
 
     def remove_expression(self, path: list[str] | str) -> None:
         """
@@ -354,54 +808,164 @@ class FilterExpression:
         """
         if not path:
             raise CannotAdjustExpression("Cannot remove the root expression.")
-        if not isinstance(path, list):
-            path = path.split(".")
-        target_expr = self.find_expression(path)
-        if target_expr is None:
+        entry = self.search(ExpressionPath.compile(path))
+        if entry is None:
             raise CannotAdjustExpression("Destination expression not found.")
-        parent_expr = self.find_expression(path[:-1])
-        parent_expr.nested_expressions.remove(target_expr)
+        _, parent_entry, index = entry
+        if parent_entry is None:
+            raise CannotAdjustExpression("Cannot remove the root expression.")
+        del parent_entry[0].nested_expressions[index]
 
     def normalize(self) -> None:
         """
         Normalizes filter expression by removing redundant junctions,
         and merging simple expressions with same column key into junction.
         """
-        # traverse from root - preorder like, except leave leaf nodes be
-        if self.is_junction:
-            for expr in self.nested_expressions:
-                expr.normalize()
-        else:
-            # simple expression
-            return
-        # 1. remove empty junctions
-        self.nested_expressions = [
-            expr for expr in self.nested_expressions if not expr.is_junction or expr.nested_expressions
-        ]
+        # traverse in post-order, leave leaf nodes be
+        for expr, _ in self.post_order():
+            if not expr.is_junction:
+                # simple expression
+                continue
+            # 1. remove empty junctions
+            expr.nested_expressions = [
+                nested for nested in expr.nested_expressions if not nested.is_junction or nested.nested_expressions
+            ]
         # done
 
-    def dump(self):
-        """
-        Dumps the expression into a dictionary.
-        """
-        if self.is_junction:
-            # after normalization, there should be no junctions with only one nested expression
-            # e.g recursively dump nested expressions and their name should be unique
-            data = {}
-            for expr in self.nested_expressions:
-                # junctions have to be array like - so we have to wrap them into a list
-                dump_result = expr.dump()  # should be dictionary with exactly one key
-                for key, value in dump_result.items():
-                    if key not in data:
-                        data[key] = value
-                    elif key in data and key not in SqlQueryBuilder.JUNCTIONS:
-                        data[key].update(value)
-                    else:
-                        data[key] = FilterExpression.merge_dumps(data[key], value)
-            return {self.junction.name.lower(): data}
-        else:
-            # simple expression
-            return {self.column.key: self.operator.dump()}
+    def simplify(self) -> t.Union["FilterExpression", None]:
+        """
+        Creates simplified equivalent of the expression (simple expressions are shared with the original one):
+        - nested junctions of the same type are flattened, junctions with single expression are collapsed
+        - range operations on the same column joined by `and` are merged (`gt 5` and `gt 10` -> `gt 10`),
+          `eq`/`in_` values are intersected (`in_ [1, 2, 3]` and `in_ [2, 3, 4]` -> `in_ [2, 3]`)
+        - `eq`/`in_` operations on the same column joined by `or` are folded into single `in_`
+        - contradictions (`eq 1` and `eq 2`) result in expression that is never satisfied (see `always_false`)
+        Values are merged only if their comparison in python matches comparison in database - numbers, dates and
+        decimals (strings are left as they are, since database collation may differ).
+        :return: Simplified expression, or None if the expression is always satisfied.
+        """
+        results = []
+        for expr, count in self.post_order():
+            if not expr.is_junction:
+                results.append(expr)
+                continue
+            nested_results = [result for result in results[len(results) - count :] if result is not _EMPTY]
+            del results[len(results) - count :]
+            # empty junction is left out
+            results.append(_simplify_junction(expr.junction, nested_results) if nested_results else _EMPTY)
+        return results[0] if results[0] is not _EMPTY else None
+
+    def dump(self, as_lists: bool = False) -> dict:
+        """
+        Dumps the expression into a dictionary in a single traversal (linear in size of the expression).
+        Simple expressions of a junction are merged under their column, expressions that cannot be merged
+        (same column and operation, repeated nested junction) are dumped as array-like `and` junction
+        - its items are joined by the junction. Empty junctions are left out.
+        :param as_lists: Whether array-like junctions are dumped as lists (same as `QsRoot.to_dict`),
+            otherwise as dictionaries with integer keys.
+        :return: Dictionary with a single key - column name or junction.
+        """
+        dumps = []
+        for expr, count in self.post_order():
+            if expr.is_always_false:
+                raise CannotAdjustExpression("Always false expression cannot be dumped into filtering.")
+            if not expr.is_junction:
+                # simple expression - list value is copied, so the dump is independent of the expression
+                value = expr.operator.assigned_value
+                dumps.append(
+                    (expr.column.key, {expr.operator.filter_name: list(value) if isinstance(value, list) else value})
+                )
+                continue
+            nested_dumps = dumps[len(dumps) - count :]
+            del dumps[len(dumps) - count :]
+            dumps.append((expr.junction.name.lower(), _merge_junction_dumps(nested_dumps, as_lists)))
+        key, value = dumps[0]
+        return {key: value}
+
+    def digest(self) -> Digest | None:
+        """
+        Creates digests of the expression (see `fingerprint`), None for empty junction.
+        """
+        digests = []
+        for expr, count in self.post_order():
+            if not expr.is_junction:
+                column = expr.column.key if expr.column is not None else ""
+                digests.append(leaf_digest(column, expr.operator.filter_name, expr.operator.assigned_value))
+                continue
+            nested_digests = [digest for digest in digests[len(digests) - count :] if digest is not None]
+            del digests[len(digests) - count :]
+            digests.append(junction_digest(expr.junction.name.lower(), nested_digests))
+        return digests[0]
+
+    def canonicalize(self) -> None:
+        """
+        Orders nested expressions of junctions canonically - by their shape (see `fingerprint`), so logically equal
+        expressions produce the same where clause regardless of order they were created in.
+        Expressions of the same shape keep their order.
+        """
+        shapes = []
+        for expr, count in self.post_order():
+            if not expr.is_junction:
+                column = expr.column.key if expr.column is not None else ""
+                shapes.append(leaf_shape_digest(column, expr.operator.filter_name, expr.operator.assigned_value))
+                continue
+            nested_shapes = shapes[len(shapes) - count :]
+            del shapes[len(shapes) - count :]
+            order = sorted(range(count), key=nested_shapes.__getitem__)
+            expr.nested_expressions = [expr.nested_expressions[index] for index in order]
+            shapes.append(junction_shape_digest(expr.junction.name.lower(), [nested_shapes[index] for index in order]))
+
+    def fingerprint(self, keyword_filter: t.Optional["SqlKeywordFilter"] = None) -> FilterFingerprint:
+        """
+        Creates canonical fingerprint of the expression (along with keyword filter) - insensitive to order
+        of nested expressions and `in_`/`nin` values, equal for the same filter built by `SqlQueryBuilder`
+        (see `SqlQueryBuilder.build_with_fingerprint`).
+        """
+        return filter_fingerprint(self.digest(), keyword_filter.to_dict() if keyword_filter is not None else {})
+
+    def index(self) -> "ExpressionIndex":
+        """
+        Creates index of nested expressions for constant time lookup by path (see `ExpressionIndex`).
+        """
+        return ExpressionIndex(self)
+
+    def transform(self, edits: t.Iterable["ExpressionEdit"]) -> "FilterExpression":
+        """
+        Applies many adjustments (see `ExpressionTransformer`) in a single traversal of the expression.
+        All paths are resolved against the expression before any adjustment is applied,
+        adjustments of the same expression are applied in their order.
+
+        Raises:
+            CannotAdjustExpression: If any of the paths is invalid - the expression is left unchanged.
+        """
+        # nested expressions to remove - grouped by list of the parent (it stays the same when the parent is moved)
+        removals = {}
+        for edit, entry in ExpressionIndex(self).resolve(edits):
+            target_expr, parent_entry, index = entry
+            if edit.kind == EditKind.ADD:
+                target_expr.join(edit.expression, edit.use_junction)
+            elif edit.kind == EditKind.REPLACE:
+                target_expr.replace(edit.expression)
+            else:
+                nested_expressions = parent_entry[0].nested_expressions
+                removals.setdefault(id(nested_expressions), (nested_expressions, set()))[1].add(index)
+        for nested_expressions, indexes in removals.values():
+            nested_expressions[:] = [nested for index, nested in enumerate(nested_expressions) if index not in indexes]
+        return self
+
+    def freeze(self) -> "FrozenExpression":
+        """
+        Creates immutable copy of the expression (see `FrozenExpression`), equal simple expressions are interned.
+        """
+        frozen = []
+        for expr, count in self.post_order():
+            if not expr.is_junction:
+                frozen.append(FrozenExpression.leaf(expr.column, expr.operator, expr.column_info))
+                continue
+            nested_expressions = tuple(frozen[len(frozen) - count :])
+            del frozen[len(frozen) - count :]
+            frozen.append(FrozenExpression.junction_node(expr.junction, nested_expressions))
+        return frozen[0]
 
     @staticmethod
     def merge_dumps(current: dict, incoming: dict) -> dict:
@@ -410,8 +974,7 @@ class FilterExpression:
         """
         if not FilterExpression.is_array_like_dict(current):
             current = FilterExpression.to_array_like_dict(current)
-        next_index = max(current.keys()) + 1
-        current[next_index] = incoming
+        current[len(current)] = incoming
         return current
 
     @staticmethod
@@ -425,170 +988,1967 @@ class FilterExpression:
         return {0: item}
 
 
-class NullsLastPosition(enum.Enum):
+def _same_items(first: tuple, second: tuple) -> bool:
     """
-    Enum that represents explicit position of nulls in SQL.
+    Checks whether both tuples contain the same objects (by identity).
     """
-
-    ALWAYS = "always"
-    NEVER = "never"
-    ASC = "asc"
-    DESC = "desc"
-
-    @classmethod
-    def from_str(cls, value: str) -> "NullsLastPosition":
-        return cls[value.upper()]
-
-    def apply(self, column: UnaryExpression) -> UnaryExpression:
-        """
-        Applies the nulls position to the column.
-        """
-        # verify that column used in unary expression is nullable
-        if not is_nullable(column.element):
-            return column
-        if self == NullsLastPosition.ASC:
-            # nulls will be last for ascending order and first for descending order
-            if column.modifier == sql_operators.asc_op:
-                return column.nullslast()
-            return column.nullsfirst()
-        elif self == NullsLastPosition.DESC:
-            # nulls will be last for descending order and first for ascending order
-            if column.modifier == sql_operators.desc_op:
-                return column.nullslast()
-            return column.nullsfirst()
-        elif self == NullsLastPosition.ALWAYS:
-            return column.nullslast()
-        return column.nullsfirst()
+    return len(first) == len(second) and all(a is b for a, b in zip(first, second))
 
 
-class SqlKeywordFilter:
+def _typed_value(value: t.Any) -> t.Any:
     """
-    A class that represents a keyword filtering in SQL.
+    Converts value into hashable form which keeps its type - equal values of different types
+    (e.g. `True`, `1`, `1.0`, `Decimal(1)`) are told apart, (nested) lists are converted item by item.
     """
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_typed_value(item) for item in value)
+    return type(value), value
 
-    limit: int | None
-    offset: int | None
-    order_by: list[UnaryExpression]
-
-    def __init__(self):
-        self.limit = None
-        self.offset = None
-        self.order_by = []
-
-    def add_keyword(self, keyword: str, value: t.Any) -> None:
-        if keyword == "limit":
-            self.add_limit(value)
-        elif keyword == "offset":
-            self.add_offset(value)
-        elif keyword == "order_by":
-            self.add_order_by(*value)
-        else:
-            raise ValueError(f"Unsupported keyword: {keyword}")
-
-    def add_limit(self, limit: int) -> None:
-        self.limit = limit
-
-    def add_offset(self, offset: int) -> None:
-        self.offset = offset
 
-    def add_order_by(self, *columns: ColumnElement) -> None:
-        self.order_by.extend(columns)
+# interned simple frozen expressions - kept only while referenced by some expression tree
+_FROZEN_LEAVES: "weakref.WeakValueDictionary[tuple, FrozenExpression]" = weakref.WeakValueDictionary()
 
-    def apply(self, query: Select, nulls: t.Optional[NullsLastPosition]) -> Select:
-        if self.limit is not None:
-            query = query.limit(self.limit)
-        if self.offset is not None:
-            query = query.offset(self.offset)
-        if self.order_by is not None:
-            if nulls is None:
-                query = query.order_by(*self.order_by)
-            else:
-                query = query.order_by(*[nulls.apply(column) for column in self.order_by])
-        return query
 
-    def to_dict(self) -> dict[str, t.Any]:
-        order_by_direction = {
-            sql_operators.asc_op: "+",
-            sql_operators.desc_op: "-",
-        }
-        data = {}
-        if self.limit is not None:
-            data["limit"] = self.limit
-        if self.offset is not None:
-            data["offset"] = self.offset
-        if self.order_by:
-            # parse always from `UnaryExpression` to string
-            # use sign notation for direction
-            data["order_by"] = (
-                [f"{order_by_direction[c.modifier]}{c.element.key}" for c in self.order_by]
-                if len(self.order_by) > 1
-                else f"{order_by_direction[self.order_by[0].modifier]}{self.order_by[0].element.key}"
-            )
-        return data
+def _copy_operator(operator: core.FilterOperation) -> core.FilterOperation:
+    """
+    Copies operation so that changes of the original (or its list value) do not propagate into the copy.
+    """
+    operator = copy(operator)
+    if isinstance(operator.assigned_value, list):
+        operator.assigned_value = list(operator.assigned_value)
+    return operator
 
 
-class SqlQueryBuilder(core.QueryBuilder):
+class FrozenExpression(FilterExpression):
     """
-    A class that builds a SQL query based on a filtering object.
-    Providing table base is optional, but allows for more advanced filtering.
+    Immutable (persistent) variant of `FilterExpression`.
+    Adjusting methods (`add_expression`, `replace_expression`, `remove_expression`, `normalize`) return a new root
+    instead of modifying the expression - only expressions on the path to the adjusted one are recreated,
+    untouched subtrees are shared with the original expression. Equal simple expressions are interned,
+    so repeated conditions are stored only once. Frozen expressions are compared and hashed structurally,
+    they can be safely cached and shared between threads.
+    Created by `FilterExpression.freeze`, mutable copy can be obtained by `thaw`.
     """
 
-    table_base: dict[str, Table]
+    __slots__ = ("_hash", "__weakref__")
 
-    def __init__(self, table_base: dict[str, Table]) -> None:
-        self.table_base = table_base
+    nested_expressions: tuple["FrozenExpression", ...]
+    _hash: int
 
-    def create_filter(
-        self, filtering: QsRoot | dict, query_columns: ColumnCollection, *restrictions: core.ColumnFilterRestriction
-    ) -> tuple[FilterExpression, SqlKeywordFilter]:
-        """
-        Generates a filter expression and keyword filter based on the filtering object and provided query columns.
+    def __init__(
+        self, column: ColumnElement, operator: core.FilterOperation, column_info: ColumnInfo | None = None
+    ) -> None:
+        object.__setattr__(self, "column", column)
+        object.__setattr__(self, "operator", operator)
+        object.__setattr__(self, "column_info", column_info)
+        object.__setattr__(self, "junction", None)
+        object.__setattr__(self, "nested_expressions", ())
+        object.__setattr__(self, "_clause", None)
+        value = _typed_value(operator.assigned_value) if operator is not None else None
+        try:
+            object.__setattr__(self, "_hash", hash((id(column), type(operator), value)))
+        except TypeError:
+            object.__setattr__(self, "_hash", hash((id(column), type(operator))))
+
+    @classmethod
+    def leaf(
+        cls, column: ColumnElement, operator: core.FilterOperation, column_info: ColumnInfo | None = None
+    ) -> "FrozenExpression":
+        """
+        Returns interned simple expression - equal expression is reused if it exists, otherwise new one is created
+        with a copy of the operation.
+        """
+        value = _typed_value(operator.assigned_value)
+        key = (id(column), id(column_info), type(operator), value, id(getattr(operator, "in_list", None)))
+        try:
+            expr = _FROZEN_LEAVES.get(key)
+        except TypeError:
+            # unhashable value cannot be interned
+            return cls(column, _copy_operator(operator), column_info)
+        if expr is None:
+            expr = cls(column, _copy_operator(operator), column_info)
+            _FROZEN_LEAVES[key] = expr
+        return expr
+
+    @classmethod
+    def junction_node(
+        cls, junction: Junction, nested_expressions: tuple["FrozenExpression", ...]
+    ) -> "FrozenExpression":
+        """
+        Creates junction of already frozen expressions.
+        """
+        instance = cls.__new__(cls)
+        object.__setattr__(instance, "column", None)
+        object.__setattr__(instance, "operator", None)
+        object.__setattr__(instance, "column_info", None)
+        object.__setattr__(instance, "junction", junction)
+        object.__setattr__(instance, "nested_expressions", nested_expressions)
+        object.__setattr__(instance, "_clause", None)
+        object.__setattr__(instance, "_hash", hash((junction, tuple(nested._hash for nested in nested_expressions))))
+        return instance
+
+    @classmethod
+    def joined_expressions(cls, junction: Junction, *expressions: FilterExpression) -> "FrozenExpression":
+        if len(expressions) == 0:
+            return None
+        elif len(expressions) == 1:
+            return expressions[0].freeze()
+        return cls.junction_node(junction, tuple(expr.freeze() for expr in expressions))
+
+    def __setattr__(self, name: str, value: t.Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def _memoize(self, memo: tuple) -> None:
+        # memoized clause is a cache, not a state of the expression
+        object.__setattr__(self, "_clause", memo)
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __copy__(self) -> "FrozenExpression":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "FrozenExpression":
+        return self
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FrozenExpression):
+            return NotImplemented
+        stack = [(self, other)]
+        while stack:
+            left, right = stack.pop()
+            if left is right:
+                continue
+            if left._hash != right._hash or left.junction != right.junction:
+                return False
+            if left.is_junction:
+                if len(left.nested_expressions) != len(right.nested_expressions):
+                    return False
+                stack.extend(zip(left.nested_expressions, right.nested_expressions))
+            elif not (
+                left.column is right.column
+                and left.column_info is right.column_info
+                and type(left.operator) is type(right.operator)
+                and getattr(left.operator, "in_list", None) is getattr(right.operator, "in_list", None)
+                and _typed_value(left.operator.assigned_value) == _typed_value(right.operator.assigned_value)
+            ):
+                return False
+        return True
+
+    def freeze(self) -> "FrozenExpression":
+        return self
+
+    def thaw(self) -> FilterExpression:
+        """
+        Creates mutable copy of the expression.
+        """
+        thawed = []
+        for expr, count in self.post_order():
+            if not expr.is_junction:
+                thawed.append(FilterExpression(expr.column, _copy_operator(expr.operator), expr.column_info))
+                continue
+            junction_expr = FilterExpression(None, None)
+            junction_expr.junction = expr.junction
+            junction_expr.nested_expressions = thawed[len(thawed) - count :]
+            del thawed[len(thawed) - count :]
+            thawed.append(junction_expr)
+        return thawed[0]
+
+    def locate(self, path: t.Union[list[str], str, ExpressionPath]) -> tuple[int, ...] | None:
+        """
+        Finds an expression based on the path (same as `find_expression`)
+        and returns indexes of nested expressions leading to it, None if not found.
+        """
+        entry = self.search(ExpressionPath.compile(path))
+        return _entry_trail(entry) if entry is not None else None
+
+    def rebuild(self, trail: tuple[int, ...], expression: "FrozenExpression") -> "FrozenExpression":
+        """
+        Returns new root with expression at the position given by `trail` (see `locate`) replaced,
+        only its ancestors are recreated.
+        """
+        ancestors = [self]
+        for index in trail[:-1]:
+            ancestors.append(ancestors[-1].nested_expressions[index])
+        for parent, index in zip(reversed(ancestors), reversed(trail)):
+            nested_expressions = parent.nested_expressions
+            expression = FrozenExpression.junction_node(
+                parent.junction, nested_expressions[:index] + (expression,) + nested_expressions[index + 1 :]
+            )
+        return expression
+
+    def add_expression(
+        self, path: list[str] | str, expression: FilterExpression, use_junction: Junction = Junction.AND
+    ) -> "FrozenExpression":
+        """
+        Same as `FilterExpression.add_expression`, but returns new root with the expression added.
+
+        Raises:
+            CannotAdjustExpression: If the path is invalid.
+        """
+        trail = self.locate(path)
+        if trail is None:
+            raise CannotAdjustExpression("Destination expression not found.")
+        target_expr = self
+        for index in trail:
+            target_expr = target_expr.nested_expressions[index]
+        return self.rebuild(trail, target_expr.join(expression, use_junction))
+
+    def join(self, expression: FilterExpression, use_junction: Junction = Junction.AND) -> "FrozenExpression":
+        """
+        Same as `FilterExpression.join`, but returns new expression with both expressions joined.
+        """
+        if self.is_junction and self.junction == use_junction:
+            nested_expressions = self.nested_expressions + (expression.freeze(),)
+        else:
+            nested_expressions = (self, expression.freeze())
+        return FrozenExpression.junction_node(use_junction, nested_expressions)
+
+    def replace_expression(self, path: list[str] | str, expression: FilterExpression) -> "FrozenExpression":
+        """
+        Same as `FilterExpression.replace_expression`, but returns new root with the expression replaced.
+        """
+        if not path:
+            return expression.freeze()
+        trail = self.locate(path)
+        if trail is None:
+            raise CannotAdjustExpression("Destination expression not found.")
+        return self.rebuild(trail, expression.freeze())
+
+    def replace(self, other: FilterExpression) -> None:
+        raise CannotAdjustExpression("Frozen expression cannot be replaced, use `replace_expression` instead.")
+
+    def remove_expression(self, path: list[str] | str) -> "FrozenExpression":
+        """
+        Same as `FilterExpression.remove_expression`, but returns new root with the expression removed.
+        """
+        if not path:
+            raise CannotAdjustExpression("Cannot remove the root expression.")
+        trail = self.locate(path)
+        if trail is None:
+            raise CannotAdjustExpression("Destination expression not found.")
+        if not trail:
+            raise CannotAdjustExpression("Cannot remove the root expression.")
+        parent_expr = self
+        for index in trail[:-1]:
+            parent_expr = parent_expr.nested_expressions[index]
+        nested_expressions = parent_expr.nested_expressions
+        index = trail[-1]
+        return self.rebuild(
+            trail[:-1],
+            FrozenExpression.junction_node(
+                parent_expr.junction, nested_expressions[:index] + nested_expressions[index + 1 :]
+            ),
+        )
+
+    def normalize(self) -> "FrozenExpression":
+        """
+        Same as `FilterExpression.normalize`, but returns normalized expression (unchanged subtrees are shared).
+        """
+        results = []
+        for expr, count in self.post_order():
+            if not expr.is_junction:
+                results.append(expr)
+                continue
+            nested_results = tuple(results[len(results) - count :])
+            del results[len(results) - count :]
+            nested_expressions = tuple(
+                nested for nested in nested_results if not nested.is_junction or nested.nested_expressions
+            )
+            if len(nested_expressions) == count and all(
+                new is old for new, old in zip(nested_expressions, expr.nested_expressions)
+            ):
+                results.append(expr)
+            else:
+                results.append(FrozenExpression.junction_node(expr.junction, nested_expressions))
+        return results[0]
+
+    def simplify(self) -> t.Union["FrozenExpression", None]:
+        simplified = super().simplify()
+        return simplified.freeze() if simplified is not None else None
+
+    def transform(self, edits: t.Iterable["ExpressionEdit"]) -> "FrozenExpression":
+        """
+        Same as `FilterExpression.transform`, but returns new root with edits applied,
+        only expressions on paths to edited expressions are recreated.
+        """
+        index = ExpressionIndex(self)
+        # trie of edited positions - nested tries by index of nested expression and edits of the position
+        trie = ({}, [])
+        for edit in index.resolve(edits):
+            node = trie
+            for position in _entry_trail(edit[1]):
+                node = node[0].setdefault(position, ({}, []))
+            node[1].append(edit[0])
+        # post-order rebuild of edited positions
+        results = {}
+        stack = [(trie, self, False)]
+        while stack:
+            node, expr, expanded = stack.pop()
+            nested_tries, node_edits = node
+            if not expanded:
+                stack.append((node, expr, True))
+                stack.extend((nested, expr.nested_expressions[index], False) for index, nested in nested_tries.items())
+                continue
+            if nested_tries:
+                nested_expressions = tuple(
+                    results.pop(id(nested_tries[index]), nested) if index in nested_tries else nested
+                    for index, nested in enumerate(expr.nested_expressions)
+                )
+                expr = FrozenExpression.junction_node(
+                    expr.junction, tuple(nested for nested in nested_expressions if nested is not None)
+                )
+            for edit in node_edits:
+                if expr is None:
+                    # already removed
+                    break
+                if edit.kind == EditKind.ADD:
+                    expr = expr.join(edit.expression, edit.use_junction)
+                elif edit.kind == EditKind.REPLACE:
+                    expr = edit.expression.freeze()
+                else:
+                    expr = None
+            results[id(node)] = expr
+        return results[id(trie)]
+
+
+def _entry_trail(entry: tuple) -> tuple[int, ...]:
+    """
+    Returns indexes of nested expressions leading to the expression of the entry (see `FilterExpression.search`).
+    """
+    trail = []
+    while entry[1] is not None:
+        trail.append(entry[2])
+        entry = entry[1]
+    return tuple(reversed(trail))
+
+
+class ExpressionIndex:
+    """
+    Index of expressions of a filter expression for constant time lookup by path.
+    Built in a single traversal, expressions are keyed by junctions on their path and column name, operator
+    and (string) value - lookup returns the same expression as `FilterExpression.find_expression`.
+    NOTE: index reflects the expression at the time it was built - it has to be rebuilt after the expression changes.
+    """
+
+    __slots__ = ("root", "chains", "entries")
+
+    root: FilterExpression
+    # chains of junctions - (chain id of parent, junction) -> chain id, 0 is empty chain
+    chains: dict[tuple[int, Junction], int]
+    # expression entries (see `FilterExpression.search`) keyed by chain id (junctions)
+    # or by (chain id, column name, operator, value) (simple expressions)
+    entries: dict[tuple, tuple]
+
+    def __init__(self, root: FilterExpression) -> None:
+        self.root = root
+        self.chains = {}
+        self.entries = {}
+        stack = [((root, None, -1), 0)]
+        while stack:
+            entry, chain = stack.pop()
+            expr = entry[0]
+            if expr.is_junction:
+                chain = self.chains.setdefault((chain, expr.junction), len(self.chains) + 1)
+                self.entries.setdefault((chain,), entry)
+                nested_expressions = expr.nested_expressions
+                stack.extend(
+                    ((nested_expressions[index], entry, index), chain)
+                    for index in range(len(nested_expressions) - 1, -1, -1)
+                )
+                continue
+            if expr.column is None:
+                continue
+            name, op_name, value = expr.column.key, expr.operator.filter_name, expr.operator.assigned_value
+            self.entries.setdefault((chain, name, None, None), entry)
+            self.entries.setdefault((chain, name, op_name, None), entry)
+            if isinstance(value, str):
+                self.entries.setdefault((chain, name, op_name, value), entry)
+
+    def entry(self, path: t.Union[list[str], str, ExpressionPath]) -> tuple | None:
+        """
+        Returns entry of the expression on the path (see `FilterExpression.search`), None if not found.
+        """
+        path = ExpressionPath.compile(path)
+        if len(path) == 0:
+            return (self.root, None, -1)
+        chain = 0
+        for step in path.steps[:-1]:
+            if step.junction is None:
+                # simple expression inside the path is not indexed
+                return self.root.search(path)
+            chain = self.chains.get((chain, step.junction))
+            if chain is None:
+                return None
+        step = path.steps[-1]
+        if step.junction is not None and (chain, step.junction) in self.chains:
+            return self.entries[(self.chains[(chain, step.junction)],)]
+        return self.entries.get((chain, step.column_name, step.op_name, step.op_value))
+
+    def find(self, path: t.Union[list[str], str, ExpressionPath]) -> FilterExpression | None:
+        """
+        Returns expression on the path, None if not found.
+        """
+        entry = self.entry(path)
+        return entry[0] if entry is not None else None
+
+    def resolve(self, edits: t.Iterable["ExpressionEdit"]) -> list[tuple["ExpressionEdit", tuple]]:
+        """
+        Finds entries of expressions targeted by edits.
+
+        Raises:
+            CannotAdjustExpression: If any of the edits is invalid - before anything is changed.
+        """
+        resolved = []
+        for edit in edits:
+            entry = self.entry(edit.path)
+            if entry is None:
+                raise CannotAdjustExpression(f"Destination expression not found: {edit.path}.")
+            if edit.kind == EditKind.REMOVE and entry[1] is None:
+                raise CannotAdjustExpression("Cannot remove the root expression.")
+            resolved.append((edit, entry))
+        return resolved
+
+
+class EditKind(enum.Enum):
+    """
+    Kind of expression adjustment.
+    """
+
+    ADD = "add"
+    REPLACE = "replace"
+    REMOVE = "remove"
+
+
+class ExpressionEdit(t.NamedTuple):
+    """
+    Single adjustment of filter expression (see `ExpressionTransformer`).
+    """
+
+    kind: EditKind
+    path: ExpressionPath
+    expression: FilterExpression | None = None
+    use_junction: Junction = Junction.AND
+
+
+class ExpressionTransformer:
+    """
+    Collects adjustments of filter expression and applies them all at once (see `FilterExpression.transform`).
+    Paths are compiled when the adjustment is added, so the transformer can be reused for many expressions.
+
+    Example:
+    transformer = ExpressionTransformer().add("and", tenant_expr).remove("and.deleted")
+    expr = transformer.apply(expr)
+    """
+
+    __slots__ = ("edits",)
+
+    edits: list[ExpressionEdit]
+
+    def __init__(self) -> None:
+        self.edits = []
+
+    def add(
+        self,
+        path: t.Union[list[str], str, ExpressionPath],
+        expression: FilterExpression,
+        use_junction: Junction = Junction.AND,
+    ) -> "ExpressionTransformer":
+        self.edits.append(ExpressionEdit(EditKind.ADD, ExpressionPath.compile(path), expression, use_junction))
+        return self
+
+    def replace(
+        self, path: t.Union[list[str], str, ExpressionPath], expression: FilterExpression
+    ) -> "ExpressionTransformer":
+        self.edits.append(ExpressionEdit(EditKind.REPLACE, ExpressionPath.compile(path), expression))
+        return self
+
+    def remove(self, path: t.Union[list[str], str, ExpressionPath]) -> "ExpressionTransformer":
+        self.edits.append(ExpressionEdit(EditKind.REMOVE, ExpressionPath.compile(path)))
+        return self
+
+    def apply(self, expression: FilterExpression) -> FilterExpression:
+        """
+        Applies collected adjustments to the expression.
+        :return: Adjusted expression - the same instance for mutable expression, new root for `FrozenExpression`.
+        """
+        return expression.transform(self.edits)
+
+
+def _merge_junction_dumps(nested_dumps: list[tuple[str, dict]], as_lists: bool) -> dict:
+    """
+    Merges dumps of nested expressions of a junction (see `FilterExpression.dump`).
+    """
+    data = {}
+    # items of array-like `and` - each item is joined by `and` internally, items are joined by the junction
+    items = []
+    for key, value in nested_dumps:
+        if key in core.QueryBuilder.JUNCTIONS:
+            if not value:
+                # empty junction
+                continue
+            if key not in data:
+                data[key] = value
+            else:
+                # nested `and` junction is an item itself
+                items.append(value if key == "and" else {key: value})
+            continue
+        column_data = data.get(key)
+        if column_data is None:
+            data[key] = value
+        elif column_data.keys().isdisjoint(value):
+            column_data.update(value)
+        else:
+            items.append({key: value})
+    if items:
+        if "and" in data:
+            items.insert(0, data["and"])
+        data["and"] = items if as_lists else dict(enumerate(items))
+    return data
+
+
+class NullsLastPosition(enum.Enum):
+    """
+    Enum that represents explicit position of nulls in SQL.
+    """
+
+    ALWAYS = "always"
+    NEVER = "never"
+    ASC = "asc"
+    DESC = "desc"
+
+    @classmethod
+    def from_str(cls, value: str) -> "NullsLastPosition":
+        return cls[value.upper()]
+
+    def nulls_last(self, ascending: bool) -> bool:
+        """
+        Whether nulls are ordered last for given order direction.
+        """
+        if self == NullsLastPosition.ASC:
+            return ascending
+        elif self == NullsLastPosition.DESC:
+            return not ascending
+        return self == NullsLastPosition.ALWAYS
+
+    def apply(self, column: UnaryExpression) -> UnaryExpression:
+        """
+        Applies the nulls position to the column.
+        """
+        # verify that column used in unary expression is nullable
+        if not is_nullable(column.element):
+            return column
+        if self == NullsLastPosition.ASC:
+            # nulls will be last for ascending order and first for descending order
+            if column.modifier == sql_operators.asc_op:
+                return column.nullslast()
+            return column.nullsfirst()
+        elif self == NullsLastPosition.DESC:
+            # nulls will be last for descending order and first for ascending order
+            if column.modifier == sql_operators.desc_op:
+                return column.nullslast()
+            return column.nullsfirst()
+        elif self == NullsLastPosition.ALWAYS:
+            return column.nullslast()
+        return column.nullsfirst()
+
+
+class CountMode(enum.Enum):
+    """
+    Enum that represents a way of obtaining total count of paginated results along with the page.
+    """
+
+    # `COUNT(*) OVER()` column (`TOTAL_COUNT_LABEL`) - page and total count in a single round trip
+    WINDOW = "window"
+    # `limit + 1` rows are selected - existence of next page is known without counting
+    # (see `SqlKeywordFilter.split_page`)
+    HAS_NEXT = "has_next"
+
+    @classmethod
+    def from_str(cls, value: str) -> "CountMode":
+        return cls[value.upper()]
+
+
+TOTAL_COUNT_LABEL = "total_count"
+# functions known not to aggregate rows - any other function in query columns is considered an aggregate
+SCALAR_FUNCTIONS = {"coalesce", "nullif", "lower", "upper", "trim", "concat", "length", "abs", "round", "date_trunc"}
+
+
+def count_query(query: Select) -> Select:
+    """
+    Creates statement counting rows of the query - ordering is dropped, query is wrapped into subquery only if
+    counting its rows directly would change the result (distinct, grouping, limit/offset, aggregates in columns).
+    :param query: Filtered SQL query (without pagination keywords).
+    :return: Count statement.
+    """
+    query = query.order_by(None)
+    if _requires_count_subquery(query):
+        return sa.select(sa_func.count()).select_from(query.subquery())
+    return query.with_only_columns(sa_func.count(), maintain_column_froms=True)
+
+
+# attributes of `Select` holding clauses that change number of rows - SQLAlchemy has no public accessors for them,
+# they are read only by `_row_changing_clauses`
+SELECT_ROW_CLAUSES = (
+    "_distinct",
+    "_group_by_clauses",
+    "_having_criteria",
+    "_limit_clause",
+    "_offset_clause",
+    "_fetch_clause",
+)
+
+
+def _row_changing_clauses(query: Select) -> list[t.Any]:
+    """
+    Returns clauses of the query that change number of its rows (falsy or None if not used) - distinct, grouping,
+    having, limit, offset and fetch.
+    :raises RuntimeError: If `Select` of installed SQLAlchemy version does not have the attributes.
+    """
+    try:
+        return [getattr(query, name) for name in SELECT_ROW_CLAUSES]
+    except AttributeError as e:
+        raise RuntimeError(f"Unsupported SQLAlchemy version - `Select` has no attribute {e.name}.") from e
+
+
+def _requires_count_subquery(query: Select) -> bool:
+    distinct, group_by, having, *pagination = _row_changing_clauses(query)
+    if distinct or group_by or having or any(clause is not None for clause in pagination):
+        return True
+    # aggregate or window functions in columns change number of rows
+    return any(
+        isinstance(element, Over)
+        or (isinstance(element, FunctionElement) and getattr(element, "name", "").lower() not in SCALAR_FUNCTIONS)
+        for column in query.selected_columns
+        for element in visitors.iterate(column)
+    )
+
+
+def is_always_false(query: Select) -> bool:
+    """
+    Checks if the filtered query can never return any rows (e.g. its filter is a contradiction),
+    so it does not need to be executed.
+    """
+    whereclause = query.whereclause
+    if isinstance(whereclause, AsBoolean) and whereclause.operator is sql_operators.is_true:
+        whereclause = whereclause.element
+    return isinstance(whereclause, False_)
+
+
+# types of values that are compared in the same way in python and in database
+ORDERED_VALUE_TYPES = (int, float, decimal.Decimal, datetime.date, datetime.time)
+
+
+def _ordered_value_kind(value: t.Any) -> t.Hashable | None:
+    """
+    Returns kind of value that can be safely compared with other values of the same kind, None if it cannot be.
+    Naive and timezone aware datetimes (times) are of different kinds.
+    """
+    if isinstance(value, bool) or not isinstance(value, ORDERED_VALUE_TYPES):
+        return None
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return int
+    kind = datetime.datetime if isinstance(value, datetime.datetime) else type(value)
+    if kind in (datetime.datetime, datetime.time):
+        return kind, value.tzinfo is None
+    return kind
+
+
+# marker of empty junction in simplification - left out of its parent junction
+_EMPTY = object()
+
+
+def _simplify_junction(
+    junction: Junction, nested_results: list[t.Union[FilterExpression, None]]
+) -> t.Union[FilterExpression, None]:
+    """
+    Simplifies junction of already simplified nested expressions (None stands for always satisfied expression).
+    """
+    nested_expressions = []
+    for expr in nested_results:
+        if expr is None:
+            if junction == Junction.OR:
+                # always satisfied branch
+                return None
+            continue
+        if expr.is_always_false:
+            if junction == Junction.AND:
+                return FilterExpression.always_false()
+            continue
+        if expr.is_junction and expr.junction == junction:
+            # flatten nested junction of the same type
+            nested_expressions.extend(expr.nested_expressions)
+        else:
+            nested_expressions.append(expr)
+    if junction == Junction.AND:
+        nested_expressions = _merge_column_conditions(nested_expressions)
+        if nested_expressions is None:
+            return FilterExpression.always_false()
+    else:
+        nested_expressions = _fold_column_alternatives(nested_expressions)
+    if not nested_expressions:
+        return None if junction == Junction.AND else FilterExpression.always_false()
+    if len(nested_expressions) == 1:
+        return nested_expressions[0]
+    return FilterExpression.joined_expressions(junction, *nested_expressions)
+
+
+def _group_by_column(
+    expressions: list[FilterExpression], accepts: t.Callable[[core.FilterOperation], bool]
+) -> tuple[dict[int, list[FilterExpression]], list[FilterExpression | int]]:
+    """
+    Groups simple expressions accepted for merging by their column - returns groups keyed by column identity
+    and order of expressions, where groups are represented by their key at the position of their first expression.
+    """
+    groups, order = {}, []
+    for expr in expressions:
+        if expr.is_junction or not accepts(expr.operator):
+            order.append(expr)
+            continue
+        key = id(expr.column)
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(expr)
+    return groups, order
+
+
+def _accepts_and_merge(operator: core.FilterOperation) -> bool:
+    if isinstance(operator, (SQLIn, SQLEq, SQLGt, SQLGe, SQLLt, SQLLe)):
+        values = operator.assigned_value if isinstance(operator, SQLIn) else [operator.assigned_value]
+        return isinstance(values, list) and all(_ordered_value_kind(value) is not None for value in values)
+    return False
+
+
+def _merge_column_conditions(expressions: list[FilterExpression]) -> list[FilterExpression] | None:
+    """
+    Merges `eq`/`in_`/range operations on the same column joined by `and`, None if they contradict each other.
+    """
+    groups, order = _group_by_column(expressions, _accepts_and_merge)
+    merged = {}
+    for key, group in groups.items():
+        if len(group) == 1 or len({_ordered_value_kind(value) for expr in group for value in _values(expr)}) > 1:
+            merged[key] = group
+            continue
+        allowed, lower, upper = None, None, None
+        for expr in group:
+            operator = expr.operator
+            if isinstance(operator, (SQLEq, SQLIn)):
+                values = set(_values(expr))
+                allowed = values if allowed is None else allowed & values
+            elif isinstance(operator, (SQLGt, SQLGe)):
+                bound = (operator.assigned_value, isinstance(operator, SQLGe))
+                # higher value, for same value exclusive bound is stricter
+                lower = bound if lower is None or bound[0] > lower[0] or bound == (lower[0], False) else lower
+            else:
+                bound = (operator.assigned_value, isinstance(operator, SQLLe))
+                upper = bound if upper is None or bound[0] < upper[0] or bound == (upper[0], False) else upper
+        base = group[0]
+        if allowed is not None:
+            allowed = sorted(
+                value
+                for value in allowed
+                if (lower is None or value > lower[0] or (lower[1] and value == lower[0]))
+                and (upper is None or value < upper[0] or (upper[1] and value == upper[0]))
+            )
+            if not allowed:
+                return None
+            in_operator = next((expr.operator for expr in group if isinstance(expr.operator, SQLIn)), None)
+            if len(allowed) == 1:
+                merged[key] = [_leaf_like(base, SQLEq(allowed[0]))]
+            else:
+                operator = SQLIn(allowed)
+                operator.in_list = getattr(in_operator, "in_list", None)
+                merged[key] = [_leaf_like(base, operator)]
+            continue
+        if lower is not None and upper is not None:
+            if lower[0] > upper[0] or (lower[0] == upper[0] and not (lower[1] and upper[1])):
+                return None
+            if lower[0] == upper[0]:
+                merged[key] = [_leaf_like(base, SQLEq(lower[0]))]
+                continue
+        merged[key] = [
+            _leaf_like(base, (SQLGe if inclusive else SQLGt)(value))
+            for value, inclusive in ([lower] if lower is not None else [])
+        ] + [
+            _leaf_like(base, (SQLLe if inclusive else SQLLt)(value))
+            for value, inclusive in ([upper] if upper is not None else [])
+        ]
+    result = []
+    for item in order:
+        if isinstance(item, int):
+            result.extend(merged[item])
+        else:
+            result.append(item)
+    return result
+
+
+def _accepts_or_fold(operator: core.FilterOperation) -> bool:
+    if isinstance(operator, SQLEq):
+        value = operator.assigned_value
+        return not (value is None or isinstance(value, bool)) and isinstance(value, t.Hashable)
+    if isinstance(operator, SQLIn):
+        values = operator.assigned_value
+        return isinstance(values, list) and all(
+            not (value is None or isinstance(value, bool)) and isinstance(value, t.Hashable) for value in values
+        )
+    return False
+
+
+def _fold_column_alternatives(expressions: list[FilterExpression]) -> list[FilterExpression]:
+    """
+    Folds `eq`/`in_` operations on the same column joined by `or` into single `in_` operation.
+    """
+    groups, order = _group_by_column(expressions, _accepts_or_fold)
+    result = []
+    for item in order:
+        if not isinstance(item, int):
+            result.append(item)
+            continue
+        group = groups[item]
+        if len(group) == 1:
+            result.extend(group)
+            continue
+        values = list(dict.fromkeys(value for expr in group for value in _values(expr)))
+        in_operator = next((expr.operator for expr in group if isinstance(expr.operator, SQLIn)), None)
+        operator = SQLIn(values)
+        operator.in_list = getattr(in_operator, "in_list", None)
+        result.append(_leaf_like(group[0], operator))
+    return result
+
+
+def _values(expr: FilterExpression) -> list[t.Any]:
+    value = expr.operator.assigned_value
+    return value if isinstance(expr.operator, SQLIn) else [value]
+
+
+def _leaf_like(expr: FilterExpression, operator: core.FilterOperation) -> FilterExpression:
+    return FilterExpression(expr.column, operator, expr.column_info)
+
+
+class SqlKeywordFilter:
+    """
+    A class that represents a keyword filtering in SQL.
+    """
+
+    __slots__ = ("limit", "offset", "order_by", "keyset", "after", "tiebreaker")
+
+    limit: int | None
+    offset: int | None
+    order_by: list[UnaryExpression]
+    # keyset pagination - enabled by `after` keyword, values of the last row of previous page (None for first page)
+    keyset: bool
+    after: list[t.Any] | None
+    # ordering appended to make keyset ordering unique - not part of the filtering (see `to_dict`)
+    tiebreaker: list[UnaryExpression]
+
+    def __init__(self):
+        self.limit = None
+        self.offset = None
+        self.order_by = []
+        self.keyset = False
+        self.after = None
+        self.tiebreaker = []
+
+    def add_keyword(self, keyword: str, value: t.Any) -> None:
+        if keyword == "limit":
+            self.add_limit(value)
+        elif keyword == "offset":
+            self.add_offset(value)
+        elif keyword == "order_by":
+            self.add_order_by(*value)
+        elif keyword == "after":
+            self.add_after(value)
+        else:
+            raise ValueError(f"Unsupported keyword: {keyword}")
+
+    def add_limit(self, limit: int) -> None:
+        self.limit = limit
+
+    def add_offset(self, offset: int) -> None:
+        self.offset = offset
+
+    def add_order_by(self, *columns: ColumnElement) -> None:
+        self.order_by.extend(columns)
+
+    def add_after(self, values: list[t.Any] | None) -> None:
+        self.keyset = True
+        self.after = values
+
+    def add_tiebreaker(self, *columns: ColumnElement) -> None:
+        """
+        Appends (ascending) ordering by columns that are not ordered by yet - makes keyset ordering unique.
+        Tie-breaker is applied to the query, but it is kept apart from `order_by` of the filtering.
+        """
+        ordered = [column.element for column in self.ordering]
+        self.tiebreaker.extend(sa_asc(column) for column in columns if not any(column is o for o in ordered))
+
+    @property
+    def ordering(self) -> list[UnaryExpression]:
+        """
+        Ordering applied to the query - `order_by` followed by tie-breaker.
+        """
+        return self.order_by + self.tiebreaker if self.tiebreaker else self.order_by
+
+    def seek_clause(self, nulls: NullsLastPosition) -> ColumnElement:
+        """
+        Creates predicate selecting rows following the `after` values in keyset ordering.
+        Row-value comparison is used if all columns have same direction and are not nullable,
+        otherwise the predicate is expanded: (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+        Null values are ordered according to `nulls` position.
+        """
+        ordering = self.ordering
+        if len(self.after) != len(ordering):
+            raise BadFormatError("Cursor does not match ordering.")
+        columns = [column.element for column in ordering]
+        ascending = [column.modifier != sql_operators.desc_op for column in ordering]
+        nullable = [is_nullable(column) for column in columns]
+        if len(set(ascending)) == 1 and not any(nullable) and None not in self.after:
+            values = sa.tuple_(
+                *(sa.bindparam(None, value, type_=column.type) for column, value in zip(columns, self.after))
+            )
+            return sa.tuple_(*columns) > values if ascending[0] else sa.tuple_(*columns) < values
+        conditions, equalities = [], []
+        for column, value, is_ascending, is_column_nullable in zip(columns, self.after, ascending, nullable):
+            nulls_last = is_column_nullable and nulls.nulls_last(is_ascending)
+            if value is None:
+                # rows after null are non-null values if nulls are first, none if nulls are last
+                following = None if nulls_last else column.isnot(None)
+                equal = column.is_(None)
+            else:
+                following = column > value if is_ascending else column < value
+                if nulls_last:
+                    following = sa_or(following, column.is_(None))
+                equal = column == value
+            if following is not None:
+                conditions.append(sa_and(*equalities, following))
+            equalities.append(equal)
+        return sa_or(*conditions) if conditions else sa.false()
+
+    def cursor(self, row: t.Any) -> str:
+        """
+        Creates cursor token of the next page from the last row of current page.
+        :param row: Result row - `Row`, mapping or object with attributes named as ordered columns.
+        """
+        if not self.keyset:
+            raise BadFormatError("Keyset pagination is not used - `after` keyword is missing.")
+        mapping = getattr(row, "_mapping", row)
+        values = []
+        for column in self.ordering:
+            key = column.element.key
+            values.append(mapping[key] if isinstance(mapping, t.Mapping) else getattr(row, key))
+        return core.encode_cursor(values)
+
+    def split_page(self, rows: t.Sequence[t.Any]) -> tuple[t.Sequence[t.Any], bool]:
+        """
+        Splits rows selected in `CountMode.HAS_NEXT` mode into rows of the page and whether next page exists.
+        """
+        if self.limit is None or len(rows) <= self.limit:
+            return rows, False
+        return rows[: self.limit], True
+
+    def apply(self, query: Select, nulls: t.Optional[NullsLastPosition], count: t.Optional[CountMode] = None) -> Select:
+        if self.keyset:
+            # explicit nulls position keeps ordering of pages consistent with seek predicate
+            nulls = nulls if nulls is not None else NullsLastPosition.ASC
+            if self.after is not None:
+                query = query.where(self.seek_clause(nulls))
+        if count == CountMode.WINDOW:
+            # window is evaluated before limit/offset - counts all filtered rows
+            query = query.add_columns(sa_func.count().over().label(TOTAL_COUNT_LABEL))
+        if self.limit is not None:
+            # limit bound in filter plan is already increased when binding its value
+            has_next = count == CountMode.HAS_NEXT and isinstance(self.limit, int)
+            query = query.limit(self.limit + 1 if has_next else self.limit)
+        if self.offset is not None:
+            query = query.offset(self.offset)
+        ordering = self.ordering
+        if ordering is not None:
+            if nulls is None:
+                query = query.order_by(*ordering)
+            else:
+                query = query.order_by(*[nulls.apply(column) for column in ordering])
+        return query
+
+    def to_dict(self) -> dict[str, t.Any]:
+        order_by_direction = {
+            sql_operators.asc_op: "+",
+            sql_operators.desc_op: "-",
+        }
+        data = {}
+        if self.limit is not None:
+            data["limit"] = self.limit
+        if self.offset is not None:
+            data["offset"] = self.offset
+        if self.order_by:
+            # parse always from `UnaryExpression` to string
+            # use sign notation for direction
+            data["order_by"] = (
+                [f"{order_by_direction[c.modifier]}{c.element.key}" for c in self.order_by]
+                if len(self.order_by) > 1
+                else f"{order_by_direction[self.order_by[0].modifier]}{self.order_by[0].element.key}"
+            )
+        if self.keyset:
+            data["after"] = core.encode_cursor(self.after) if self.after is not None else ""
+        return data
+
+
+class NodeKind(enum.Enum):
+    """
+    Enum that represents kind of a node in filtering structure.
+    """
+
+    # plain value or simple array of values
+    LEAF = "leaf"
+    # array-like node - nested nodes keyed by index
+    ARRAY = "array"
+    # object-like node - nested nodes keyed by name
+    OBJECT = "object"
+
+
+class FilterSource:
+    """
+    Describes entries of a filtering structure for `SqlQueryBuilder.walk_expression`.
+    """
+
+    @staticmethod
+    def key(entry: t.Any) -> str | int:
+        raise NotImplementedError("The method 'key' must be implemented in the derived class.")
+
+    @staticmethod
+    def keyword(builder: "SqlQueryBuilder", entry: t.Any, columns: ColumnCollection) -> tuple[str, t.Any]:
+        raise NotImplementedError("The method 'keyword' must be implemented in the derived class.")
+
+    @staticmethod
+    def classify(entry: t.Any) -> tuple[NodeKind, t.Any]:
+        """
+        Returns kind of the entry with either its value (leaf) or list of nested entries.
+        """
+        raise NotImplementedError("The method 'classify' must be implemented in the derived class.")
+
+
+class QsNodeSource(FilterSource):
+    """
+    Entries are `QsNode` objects.
+    """
+
+    @staticmethod
+    def key(entry: QsNode) -> str | int:
+        return entry.key
+
+    @staticmethod
+    def keyword(builder: "SqlQueryBuilder", entry: QsNode, columns: ColumnCollection) -> tuple[str, t.Any]:
+        return builder.process_keyword_node(entry, columns)
+
+    @staticmethod
+    def classify(entry: QsNode) -> tuple[NodeKind, t.Any]:
+        if entry.is_leaf:
+            return NodeKind.LEAF, entry.value
+        if entry.is_simple_array_branch:
+            return NodeKind.LEAF, [child.value for child in entry.value]
+        if entry.is_array_branch:
+            return NodeKind.ARRAY, entry.value
+        return NodeKind.OBJECT, entry.value
+
+
+class DictSource(FilterSource):
+    """
+    Entries are `(key, value)` items of (nested) dictionary, interpreted same way as by `QsNode`:
+    - dictionary with integer keys or list is an array, simple if none of its values is nested
+    - any other value is a leaf
+    """
+
+    @staticmethod
+    def key(entry: tuple[str | int, t.Any]) -> str | int:
+        return entry[0]
+
+    @staticmethod
+    def keyword(
+        builder: "SqlQueryBuilder", entry: tuple[str | int, t.Any], columns: ColumnCollection
+    ) -> tuple[str, t.Any]:
+        return builder.process_keyword(entry[0], entry[1], columns)
+
+    @staticmethod
+    def classify(entry: tuple[str | int, t.Any]) -> tuple[NodeKind, t.Any]:
+        value = entry[1]
+        if isinstance(value, dict):
+            if not value:
+                # same error as loading the filtering into `QsRoot`
+                raise ValueError("Empty objects are not allowed")
+            if all(isinstance(child_key, int) for child_key in value):
+                if core.is_simple_array_dict(value):
+                    return NodeKind.LEAF, list(value.values())
+                return NodeKind.ARRAY, list(value.items())
+            return NodeKind.OBJECT, list(value.items())
+        if isinstance(value, list):
+            if core.is_simple_array(value):
+                return NodeKind.LEAF, list(value)
+            return NodeKind.ARRAY, list(enumerate(value))
+        return NodeKind.LEAF, value
+
+
+# marker of join items on the stack of `SqlQueryBuilder.walk_expression`
+_JOIN = object()
+
+
+def _collect_expression(
+    results: list, expr: FilterExpression | list[FilterExpression] | None, raw: bool = False
+) -> None:
+    """
+    Collects built expression into results of parent node - lists (array-like junctions) are flattened
+    and keyword nodes (None) are skipped. Raw results are collected as they are.
+    """
+    if raw:
+        results.append(expr)
+    elif isinstance(expr, list):
+        results.extend(expr)
+    elif expr is not None:
+        results.append(expr)
+
+
+def _filtering_fingerprint(digests: list[Digest], keyword_filter: SqlKeywordFilter) -> FilterFingerprint:
+    """
+    Creates fingerprint of filtering from digests of its top level expressions (joined by `and`).
+    """
+    return filter_fingerprint(junction_digest(Junction.AND.name.lower(), digests), keyword_filter.to_dict())
+
+
+PLAN_PARAM_PREFIX = "siphon_"
+COLUMN_INDEX_CACHE_SIZE = 128
+# version of format of builder snapshots (see `SqlQueryBuilder.dump_snapshot`)
+SNAPSHOT_VERSION = 1
+
+
+def _bind_type(column: ColumnElement, value: t.Any) -> TypeEngine:
+    """
+    Returns type of bind parameter of the value compared to the column - same type SQLAlchemy infers when the value
+    is compared directly (e.g. `String` for string compared to `DateTime` column), lists by their first item.
+    """
+    if isinstance(value, list):
+        if not value:
+            return column.type
+        value = value[0]
+    return column.type.coerce_compared_value(sql_operators.eq, value)
+
+
+def _bind_stable_parameters(expression: FilterExpression) -> dict[str, str]:
+    """
+    Binds values of simple expressions as bind parameters named by their position in the expression
+    (lists as expanding parameters) - rendered statement depends only on the shape of the expression.
+    `None` and `bool` values are left as they are, since they change the statement.
+    Operations are replaced by their copies - the expression is expected to be built only for the statement.
+    :return: Mapping of original names of already bound parameters (plan template) to new names.
+    """
+    renamed = {}
+    leaves = (
+        leaf
+        for leaf in expression.leaves()
+        if not (leaf.operator.assigned_value is None or isinstance(leaf.operator.assigned_value, bool))
+    )
+    for index, leaf in enumerate(leaves):
+        name = f"{PLAN_PARAM_PREFIX}{index}"
+        operator = copy(leaf.operator)
+        value = operator.assigned_value
+        if isinstance(value, BindParameter):
+            renamed[value.key] = name
+            operator.assigned_value = sa.bindparam(name, type_=value.type, expanding=value.expanding)
+        else:
+            # typed as the value compared directly - bind processing of column type is kept
+            operator.assigned_value = sa.bindparam(
+                name, value, type_=_bind_type(leaf.column, value), expanding=isinstance(value, list)
+            )
+        in_list = getattr(operator, "in_list", None)
+        if in_list is not None and not in_list.plannable:
+            # rendering depends on number of values - bound as expanding parameter instead
+            operator.in_list = None
+        leaf.operator = operator
+    return renamed
+
+
+def _check_restriction(
+    policy: core.RestrictionPolicy, column_name: str, operator_type: t.Type[core.FilterOperation], value: t.Any
+) -> t.Any:
+    policy.check(column_name, operator_type(value))
+    return value
+
+
+def _coerce_checked(
+    coerce: t.Callable[[t.Any], t.Any], check: t.Callable[[t.Any], t.Any] | None, value: t.Any
+) -> t.Any:
+    value = core.coerce_value(coerce, value)
+    return check(value) if check is not None else value
+
+
+def _prepare_in_list(in_list: InListOptions, check: t.Callable[[t.Any], t.Any] | None, value: t.Any) -> t.Any:
+    return in_list.prepare(check(value) if check is not None else value)
+
+
+def _parse_next_page_limit(value: t.Any) -> int:
+    # one more row than limit is selected in `has_next` count mode
+    return core.parse_integer_keyword("limit", value) + 1
+
+
+# marker of filter shapes for which plan cannot be created
+_NO_PLAN = object()
+
+
+class CompiledQuery(t.NamedTuple):
+    """
+    SQL text compiled for a dialect with parameters ready for DBAPI `cursor.execute` - tuple for positional
+    paramstyles of the dialect, dictionary otherwise.
+    """
+
+    sql: str
+    params: tuple | dict[str, t.Any]
+
+
+# bind processors of compiled statements - created once per compiled statement
+_BIND_PROCESSORS: "weakref.WeakKeyDictionary[SQLCompiler, dict[str, t.Callable[[t.Any], t.Any]]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _compiled_bind_processors(compiled: SQLCompiler) -> dict[str, t.Callable[[t.Any], t.Any]]:
+    """
+    Returns bind processors of parameters of compiled statement keyed by their rendered names - processors
+    of parameter types implemented by the dialect of the statement (parameters without processor are left out).
+    """
+    processors = _BIND_PROCESSORS.get(compiled)
+    if processors is None:
+        dialect = compiled.dialect
+        processors = {}
+        for bind, name in compiled.bind_names.items():
+            processor = bind.type.dialect_impl(dialect).bind_processor(dialect)
+            if processor is not None:
+                processors[compiled.escaped_bind_names.get(name, name)] = processor
+        _BIND_PROCESSORS[compiled] = processors
+    return processors
+
+
+def compiled_query(compiled: SQLCompiler, params: dict[str, t.Any] | None = None) -> CompiledQuery:
+    """
+    Renders compiled statement with parameters for DBAPI execution - expanding parameters are rendered
+    for the number of their values and bind processors of parameter types are applied (same as on execution
+    by SQLAlchemy).
+    :param compiled: Statement compiled for a dialect.
+    :param params: Values of bind parameters, values bound in the statement are used if not given.
+    :return: SQL text and its parameters.
+    """
+    state = compiled.construct_expanded_state(params)
+    processors = _compiled_bind_processors(compiled)
+    if state.processors:
+        processors = {**processors, **state.processors}
+    values = {
+        name: processors[name](value) if name in processors else value for name, value in state.parameters.items()
+    }
+    if state.positiontup is not None:
+        # positions keep names of parameters before escaping
+        escaped = compiled.escaped_bind_names
+        return CompiledQuery(state.statement, tuple(values[escaped.get(name, name)] for name in state.positiontup))
+    return CompiledQuery(state.statement, values)
+
+
+class FilterPlan:
+    """
+    Prebuilt query for a single filter shape.
+    Values of the filter are represented by bind parameters - using the plan only binds new values.
+    Template is compiled once per dialect when the plan is used for DBAPI execution (see `compile`).
+    """
+
+    template: Select
+    names: list[str]
+    checks: list[t.Callable[[t.Any], t.Any] | None]
+
+    def __init__(self, template: Select, names: list[str], checks: list[t.Callable[[t.Any], t.Any] | None]) -> None:
+        self.template = template
+        self.names = names
+        self.checks = checks
+        # template compiled for dialects - keyed by dialect, concurrent first use may compile the template
+        # more than once (last one is kept), compiled statement is only read afterwards
+        self._compiled: dict[Dialect, SQLCompiler] = {}
+
+    def parameters(self, values: t.Iterable[t.Any]) -> dict[str, t.Any]:
+        """
+        Validates values (restrictions, keyword values) and maps them to bind parameter names.
+        """
+        params = {}
+        for name, check, value in zip(self.names, self.checks, values):
+            params[name] = check(value) if check is not None else value
+        return params
+
+    def bind(self, values: t.Iterable[t.Any]) -> Select:
+        """
+        Binds values into the template.
+        """
+        return self.template.params(self.parameters(values))
+
+    def compile(self, dialect: Dialect, values: t.Iterable[t.Any]) -> CompiledQuery:
+        """
+        Renders the template for the dialect with bound values - template is compiled only on first use
+        with the dialect.
+        """
+        compiled = self._compiled.get(dialect)
+        if compiled is None:
+            compiled = self._compiled[dialect] = self.template.compile(dialect=dialect)
+        return compiled_query(compiled, self.parameters(values))
+
+
+class SqlQueryBuilder(core.QueryBuilder):
+    """
+    A class that builds a SQL query based on a filtering object.
+    Providing table base is optional, but allows for more advanced filtering.
+    Optional plan cache reuses prebuilt queries for dictionary filters with the same shape.
+    With `single_pass` enabled, filtering is validated and built in a single traversal
+    (dictionary filtering is traversed directly, without loading it into `QsRoot`).
+    Filtering deeper than `max_depth` or with more than `max_nodes` nodes is rejected before it is processed.
+    Optional budget limits complexity of filtering (see `core.FilterBudget`) - it is checked before anything is built.
+    Rendering of `in_`/`nin` lists can be configured by `InListOptions` - by default lists are bound as they are.
+    With `simplify` enabled, filter expression is simplified (see `FilterExpression.simplify`) before it is applied -
+    contradicting filter results in always false query (see `is_always_false`). Simplification depends on values,
+    so plan cache is not used with it.
+    With `deterministic` enabled, built statement depends only on the shape of the filter - nested expressions are
+    ordered canonically and values are bound as parameters named by their position (lists as expanding parameters),
+    so logically equal filters compile to the same SQL text (reused by statement caches).
+    With `coerce_values` enabled, values of operations (including every value of `in_`/`nin` lists) are coerced
+    into values of column type (see `core.compile_coercer`) before restrictions are checked - the database
+    compares the column with typed parameter instead of casting the column, invalid values are rejected early
+    with `InvalidValueTypeError`. Coercers are compiled once per column (along with column index).
+    Builder holds no mutable state besides its caches (plan cache, column indexes), which are safe to share
+    between threads - single builder can be used by a thread pool.
+    """
+
+    table_base: dict[str, Table]
+    plan_cache: PlanCache | None
+    single_pass: bool
+    max_depth: int
+    max_nodes: int
+    budget: core.FilterBudget | None
+    in_list: InListOptions | None
+    simplify: bool
+    deterministic: bool
+    coerce_values: bool
+    base_index: dict[str, ColumnInfo]
+
+    def __init__(
+        self,
+        table_base: dict[str, Table],
+        plan_cache: PlanCache | None = None,
+        single_pass: bool = False,
+        max_depth: int = core.DEFAULT_MAX_DEPTH,
+        max_nodes: int = core.DEFAULT_MAX_NODES,
+        budget: core.FilterBudget | None = None,
+        in_list: InListOptions | None = None,
+        simplify: bool = False,
+        deterministic: bool = False,
+        coerce_values: bool = False,
+    ) -> None:
+        self.table_base = table_base
+        self.plan_cache = plan_cache
+        self.single_pass = single_pass
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.budget = budget
+        self.in_list = in_list
+        self.simplify = simplify
+        self.deterministic = deterministic
+        self.coerce_values = coerce_values
+        # `table.column` references of table base
+        self.base_index = {
+            f"{table_name}.{column.key}": ColumnInfo(column)
+            for table_name, table in table_base.items()
+            for column in table.columns
+        }
+        # column indexes of query columns - keyed by identity of column collection
+        self._column_indexes = LRUCache(COLUMN_INDEX_CACHE_SIZE)
+
+    def create_filter(
+        self,
+        filtering: QsRoot | dict,
+        query_columns: ColumnCollection,
+        *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy,
+    ) -> tuple[FilterExpression, SqlKeywordFilter]:
+        """
+        Generates a filter expression and keyword filter based on the filtering object and provided query columns.
         :param filtering: Filtering object or dictionary.
         :param query_columns: Query columns.
-        :param restrictions: Restrictions to use when filtering.
+        :param restrictions: Restrictions to use when filtering - either column restrictions
+            or a single `RestrictionPolicy`.
         :return: Tuple containing filter expression and keyword filter.
         """
         if not isinstance(filtering, (QsRoot, dict)):
             raise ValueError(f"Unsupported input filtering type: {type(filtering)}")
-        if isinstance(filtering, dict):
-            filtering = self.load_filtering(filtering)
-        self.verify_filtering(filtering)
+        self.verify_filtering_size(filtering, self.max_depth, self.max_nodes)
+        return self.create_measured_filter(filtering, query_columns, core.RestrictionPolicy.coerce(restrictions))
+
+    def create_measured_filter(
+        self,
+        filtering: QsRoot | dict,
+        query_columns: ColumnCollection,
+        restrictions: core.RestrictionPolicy,
+        digests: list[Digest] | None = None,
+    ) -> tuple[FilterExpression, SqlKeywordFilter]:
+        """
+        Same as `create_filter`, for filtering which size was already verified (or measured).
+        :param filtering: Filtering object or dictionary.
+        :param query_columns: Query columns.
+        :param restrictions: Restriction policy to use when filtering.
+        :param digests: If given, digests of top level expressions are collected into it (see `walk_expression`).
+        :return: Tuple containing filter expression and keyword filter.
+        """
         filter_expressions = []
         keyword_filter = SqlKeywordFilter()
-        for node in filtering.children:
-            filter_expression = self.create_filter_expression(
-                node, query_columns, keyword_filter, restrictions=restrictions
+        if isinstance(filtering, dict) and self.single_pass:
+            # walk dictionary directly - without intermediate QsRoot
+            expressions = (
+                self.build_dict_expression(
+                    key, value, query_columns, keyword_filter, restrictions=restrictions, digests=digests
+                )
+                for key, value in filtering.items()
+            )
+        else:
+            if isinstance(filtering, dict):
+                filtering = self.load_filtering(filtering)
+            if not self.single_pass:
+                self.verify_filtering(filtering)
+            expressions = (
+                self.create_filter_expression(
+                    node, query_columns, keyword_filter, restrictions=restrictions, digests=digests
+                )
+                for node in filtering.children
             )
-            if filter_expression is not None:
+        for filter_expression in expressions:
+            if isinstance(filter_expression, list):
+                # array-like junction on top level
+                filter_expressions.extend(filter_expression)
+            elif filter_expression is not None:
                 filter_expressions.append(filter_expression)
-        return FilterExpression.joined_expressions(Junction.AND, *filter_expressions), keyword_filter
+        if keyword_filter.keyset:
+            keyword_filter.add_tiebreaker(*self.primary_key_columns(query_columns))
+        filter_expression = FilterExpression.joined_expressions(Junction.AND, *filter_expressions)
+        if self.simplify and filter_expression is not None:
+            filter_expression = filter_expression.simplify()
+        return filter_expression, keyword_filter
 
     def build(
         self,
         query: Select,
         filtering: QsRoot | dict,
-        *restrictions: core.ColumnFilterRestriction,
+        *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy,
         nulls_last: t.Optional[str] = None,
+        budget: core.FilterBudget | None = None,
+        count: t.Optional[str] = None,
     ) -> Select:
         """
         Builds a SQL query based on the filtering object.
         :param query: SQL query to filter.
         :param filtering: Filtering object or dictionary.
-        :param restrictions: Restrictions to use when filtering.
+        :param restrictions: Restrictions to use when filtering - either column restrictions
+            or a single `RestrictionPolicy`.
         :param nulls_last: where to explicitely put nulls results in ordering.
             - can be one of following:
                 - "always" - nulls will be ordered last regardless of order direction
                 - "never" - nulls will be ordered first regardless of order direction
                 - "asc" - nulls will be ordered last for ascending order and first for descending order
                 - "desc" - nulls will be ordered last for descending order and first for ascending order
+        :param budget: Complexity budget of filtering - overrides budget of the builder.
+        :param count: count mode of paginated query (see `CountMode`) - "window" or "has_next",
+            total count only is built by `build_count`.
         :return: Filtered SQL query.
         """
+        built, _ = self.build_with_cost(
+            query, filtering, *restrictions, nulls_last=nulls_last, budget=budget, count=count
+        )
+        return built
+
+    def build_with_cost(
+        self,
+        query: Select,
+        filtering: QsRoot | dict,
+        *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy,
+        nulls_last: t.Optional[str] = None,
+        budget: core.FilterBudget | None = None,
+        count: t.Optional[str] = None,
+    ) -> tuple[Select, core.FilterCost]:
+        """
+        Builds a SQL query based on the filtering object (see `build`) and returns it with measured cost of filtering.
+        Cost is measured and checked against the budget before any part of query is built.
+        :raises BudgetExceededError: If filtering exceeds the budget.
+        :return: Tuple containing filtered SQL query and cost of filtering.
+        """
+        cost = self.check_budget(filtering, budget)
         nulls = NullsLastPosition.from_str(nulls_last) if nulls_last is not None else None
-        columns = self.extract_columns(query)
-        filter_expression, keyword_filter = self.create_filter(filtering, columns, *restrictions)
-        query = filter_expression.apply(query) if filter_expression else query
-        query = keyword_filter.apply(query, nulls=nulls)
-        return query
+        count_mode = CountMode.from_str(count) if count is not None else None
+        policy = core.RestrictionPolicy.coerce(restrictions)
+        if self.plan_cache is not None and isinstance(filtering, dict) and not self.simplify:
+            return self.build_cached(query, filtering, policy, nulls, count_mode), cost
+        return self.build_uncached(query, filtering, policy, nulls, count_mode), cost
+
+    def build_with_fingerprint(
+        self,
+        query: Select,
+        filtering: QsRoot | dict,
+        *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy,
+        nulls_last: t.Optional[str] = None,
+        budget: core.FilterBudget | None = None,
+        count: t.Optional[str] = None,
+    ) -> tuple[Select, FilterFingerprint]:
+        """
+        Builds a SQL query based on the filtering object (see `build`) and returns it with canonical fingerprint
+        of the filtering (see `FilterFingerprint`) - computed in the same traversal as the filter is built.
+        Plan cache is not used, since cached plan does not traverse the filtering.
+        :return: Tuple containing filtered SQL query and fingerprint of filtering.
+        """
+        self.check_budget(filtering, budget)
+        nulls = NullsLastPosition.from_str(nulls_last) if nulls_last is not None else None
+        count_mode = CountMode.from_str(count) if count is not None else None
+        digests = []
+        filter_expression, keyword_filter = self.create_measured_filter(
+            filtering, self.extract_columns(query), core.RestrictionPolicy.coerce(restrictions), digests
+        )
+        query = self.apply_expression(query, filter_expression)
+        return keyword_filter.apply(query, nulls=nulls, count=count_mode), _filtering_fingerprint(
+            digests, keyword_filter
+        )
+
+    def create_fingerprinted_filter(
+        self,
+        filtering: QsRoot | dict,
+        query_columns: ColumnCollection,
+        *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy,
+    ) -> tuple[FilterExpression, SqlKeywordFilter, FilterFingerprint]:
+        """
+        Same as `create_filter`, additionally returns canonical fingerprint of the filtering
+        (same as `FilterExpression.fingerprint` of the expression before simplification).
+        :return: Tuple containing filter expression, keyword filter and fingerprint.
+        """
+        if not isinstance(filtering, (QsRoot, dict)):
+            raise ValueError(f"Unsupported input filtering type: {type(filtering)}")
+        self.verify_filtering_size(filtering, self.max_depth, self.max_nodes)
+        digests = []
+        filter_expression, keyword_filter = self.create_measured_filter(
+            filtering, query_columns, core.RestrictionPolicy.coerce(restrictions), digests
+        )
+        return filter_expression, keyword_filter, _filtering_fingerprint(digests, keyword_filter)
+
+    def check_budget(self, filtering: QsRoot | dict, budget: core.FilterBudget | None = None) -> core.FilterCost:
+        """
+        Measures the filtering and checks it against the budget (given one or budget of the builder).
+        :raises BudgetExceededError: If filtering exceeds the budget.
+        :return: Cost of filtering.
+        """
+        if not isinstance(filtering, (QsRoot, dict)):
+            raise ValueError(f"Unsupported input filtering type: {type(filtering)}")
+        cost = self.measure_filtering(filtering, self.max_depth, self.max_nodes)
+        budget = budget if budget is not None else self.budget
+        if budget is not None:
+            budget.check(cost)
+        return cost
+
+    def export_schema(
+        self, query: Select, *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy
+    ) -> FilterSchema:
+        """
+        Exports schema of filtering accepted for the query - column references (with their types), restrictions
+        and limits of the builder. Schema holds no SQLAlchemy objects, filtering can be validated against it
+        by `FilterValidator` without the query (e.g. at the edge of the service).
+        :param query: Query to be filtered.
+        :param restrictions: Restrictions to use when filtering - either column restrictions
+            or a single `RestrictionPolicy`.
+        :return: Schema of accepted filtering.
+        """
+        columns = {}
+        query_columns = self.extract_columns(query)
+        for column_ref, column_info in self.column_index(query_columns).items():
+            columns[column_ref] = ColumnSchema(
+                column_info.element.key,
+                column_info.python_type.__name__ if column_info.python_type is not None else None,
+                column_info.nullable,
+                column_info.values,
+            )
+        return FilterSchema(
+            columns,
+            core.RestrictionPolicy.coerce(restrictions),
+            self.max_depth,
+            self.max_nodes,
+            self.budget,
+            self.coerce_values,
+            [column.key for column in query_columns if getattr(column, "primary_key", False)],
+        )
+
+    def build_sql(
+        self,
+        query: Select,
+        filtering: QsRoot | dict,
+        *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy,
+        dialect: Dialect,
+        nulls_last: t.Optional[str] = None,
+        budget: core.FilterBudget | None = None,
+        count: t.Optional[str] = None,
+    ) -> CompiledQuery:
+        """
+        Builds a SQL query based on the filtering object (see `build`) and compiles it for the dialect
+        into SQL text with parameters for direct DBAPI execution.
+        With plan cache, plan of the filter shape keeps the template compiled for the dialect - repeated shapes
+        skip both building and compilation of the query.
+        :param dialect: Dialect to compile the query for (e.g. `engine.dialect`).
+        :return: SQL text and parameters in paramstyle of the dialect (see `CompiledQuery`).
+        """
+        self.check_budget(filtering, budget)
+        nulls = NullsLastPosition.from_str(nulls_last) if nulls_last is not None else None
+        count_mode = CountMode.from_str(count) if count is not None else None
+        policy = core.RestrictionPolicy.coerce(restrictions)
+        if self.plan_cache is not None and isinstance(filtering, dict) and not self.simplify:
+            plan, slots = self.get_plan(query, filtering, policy, nulls, count_mode)
+            if plan is not None:
+                return plan.compile(dialect, (value for _, value in slots))
+        query = self.build_uncached(query, filtering, policy, nulls, count_mode)
+        return compiled_query(query.compile(dialect=dialect))
+
+    def warmup(
+        self,
+        query: Select,
+        shapes: t.Iterable[QsRoot | dict],
+        *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy,
+        dialects: t.Iterable[Dialect] = (),
+        nulls_last: t.Optional[str] = None,
+        count: t.Optional[str] = None,
+    ) -> int:
+        """
+        Prepares the builder for the query before traffic arrives - resolves query columns (column index), parses
+        `order_by` values and builds every representative filter. With plan cache, plan of each filter shape is
+        created and its template is compiled for every dialect (see `build_sql`), without plan cache the built
+        queries are compiled for every dialect (initializes type processors of the dialect).
+        :param query: SQL query to filter.
+        :param shapes: Representative filters - e.g. recorded filters of previous traffic, only shapes of dictionary
+            filters matter for plan cache.
+        :param restrictions: Restrictions to use when filtering - either column restrictions
+            or a single `RestrictionPolicy`.
+        :param dialects: Dialects to compile the query for (e.g. `engine.dialect`).
+        :param nulls_last: where to explicitely put nulls results in ordering (see `build`).
+        :param count: count mode of paginated query (see `build`).
+        :return: Number of distinct plans prepared in plan cache.
+        """
+        dialects = list(dialects)
+        nulls = NullsLastPosition.from_str(nulls_last) if nulls_last is not None else None
+        count_mode = CountMode.from_str(count) if count is not None else None
+        policy = core.RestrictionPolicy.coerce(restrictions)
+        self.column_index(self.extract_columns(query))
+        plans = set()
+        for filtering in shapes:
+            self.check_budget(filtering)
+            if self.plan_cache is not None and isinstance(filtering, dict) and not self.simplify:
+                plan, slots = self.get_plan(query, filtering, policy, nulls, count_mode)
+                if plan is not None:
+                    plans.add(id(plan))
+                    for dialect in dialects:
+                        plan.compile(dialect, (value for _, value in slots))
+                    continue
+            built = self.build_uncached(query, filtering, policy, nulls, count_mode)
+            for dialect in dialects:
+                compiled_query(built.compile(dialect=dialect))
+        return len(plans)
+
+    def dump_snapshot(self, queries: dict[str, Select]) -> bytes:
+        """
+        Serializes plans of plan cache created for the named queries (e.g. prepared by `warmup`), so other processes
+        can load them instead of building them again (see `load_snapshot`). Plans keep their validation
+        of values - compiled restriction policies and keyword parsing.
+        Snapshot is versioned by digest of table metadata (tables of table base and of the queries), SQL of the queries
+        and configuration of the builder affecting the plans.
+        :param queries: Queries to persist plans of - keyed by name they are matched by on load.
+        :return: Serialized snapshot.
+        """
+        from sqlalchemy.ext import serializer
+
+        if self.plan_cache is None:
+            raise ValueError("Snapshot requires plan cache.")
+        names = {id(query): name for name, query in queries.items()}
+        plans = []
+        for (query, shape, policy_key, nulls, count), plan in self.plan_cache.items():
+            name = names.get(id(query))
+            if name is None or queries[name] is not query:
+                continue
+            content = None if plan is _NO_PLAN else (plan.template, plan.names, plan.checks)
+            plans.append((name, shape, policy_key, nulls, count, content))
+        # plans are serialized separately - they are deserialized only once the snapshot is known to be valid
+        return pickle.dumps(
+            {"version": SNAPSHOT_VERSION, "digest": self.snapshot_digest(queries), "plans": serializer.dumps(plans)}
+        )
+
+    def load_snapshot(self, snapshot: bytes, queries: dict[str, Select], dialects: t.Iterable[Dialect] = ()) -> int:
+        """
+        Loads plans serialized by `dump_snapshot` into plan cache - templates are bound to the tables of the table base
+        and the queries, column indexes of the queries are created. Loading the snapshot before workers are forked
+        shares loaded plans between them (copy-on-write).
+        SQLAlchemy compiled statements cannot be serialized - templates are compiled for the dialects on load.
+        NOTE: snapshot is unpickled - load only snapshots created by your own deployment.
+        :param snapshot: Serialized snapshot.
+        :param queries: Queries the plans were created for - keyed by the same names as on dump.
+        :param dialects: Dialects to compile the templates for (see `build_sql`).
+        :raises StaleSnapshotError: If the snapshot was created for different table metadata, queries
+            or builder configuration (or by different version of the format).
+        :return: Number of loaded plans.
+        """
+        from sqlalchemy.ext import serializer
+
+        if self.plan_cache is None:
+            raise ValueError("Snapshot requires plan cache.")
+        dialects = list(dialects)
+        content = pickle.loads(snapshot)
+        if content.get("version") != SNAPSHOT_VERSION:
+            raise StaleSnapshotError(f"Unsupported snapshot version: {content.get('version')}")
+        if content["digest"] != self.snapshot_digest(queries):
+            raise StaleSnapshotError("Snapshot does not match table metadata, queries or configuration of the builder.")
+        # serialized tables and columns are resolved by their key - the same objects as in the application are used
+        tables = types.SimpleNamespace(tables={table.key: table for table in self.snapshot_tables(queries)})
+        plans = serializer.loads(content["plans"], tables)
+        for query in queries.values():
+            self.column_index(self.extract_columns(query))
+        loaded = 0
+        for name, shape, policy_key, nulls, count, plan_content in plans:
+            key = (queries[name], shape, policy_key, nulls, count)
+            if plan_content is None:
+                self.plan_cache.put(key, _NO_PLAN)
+                continue
+            plan = FilterPlan(*plan_content)
+            for dialect in dialects:
+                plan._compiled[dialect] = plan.template.compile(dialect=dialect)
+            self.plan_cache.put(key, plan)
+            loaded += 1
+        return loaded
+
+    def snapshot_tables(self, queries: dict[str, Select]) -> list[Table]:
+        """
+        Returns tables of table base and tables used by the queries - ordered by their key.
+        """
+        from sqlalchemy.sql.util import find_tables
+
+        tables = {table.key: table for table in self.table_base.values()}
+        for query in queries.values():
+            tables.update((table.key, table) for table in find_tables(query, check_columns=True, include_joins=False))
+        return [tables[key] for key in sorted(tables)]
+
+    def snapshot_digest(self, queries: dict[str, Select]) -> str:
+        """
+        Creates digest of everything plans of the queries depend on - definitions of tables (see `snapshot_tables`),
+        SQL of the queries and configuration of the builder (`in_list` options, `deterministic` mode, value coercion).
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        for table in self.snapshot_tables(queries):
+            hasher.update(repr(table.key).encode())
+            for column in table.columns:
+                definition = (column.key, column.name, repr(column.type), column.nullable, column.primary_key)
+                hasher.update(repr(definition).encode())
+        for name in sorted(queries):
+            hasher.update(repr((name, str(queries[name]))).encode())
+        hasher.update(repr((self.in_list, self.deterministic, self.coerce_values, PLAN_PARAM_PREFIX)).encode())
+        return hasher.hexdigest()
+
+    def build_page(
+        self,
+        query: Select,
+        filtering: QsRoot | dict,
+        *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy,
+        nulls_last: t.Optional[str] = None,
+        budget: core.FilterBudget | None = None,
+        count: t.Optional[str] = None,
+    ) -> tuple[Select, SqlKeywordFilter]:
+        """
+        Builds a SQL query based on the filtering object (see `build`) and returns it with processed keywords,
+        which can create cursor of the next page (`SqlKeywordFilter.cursor`) in keyset pagination
+        or split the page in `has_next` count mode (`SqlKeywordFilter.split_page`).
+        Plan cache is not used.
+        :return: Tuple containing filtered SQL query and keyword filter.
+        """
+        self.check_budget(filtering, budget)
+        nulls = NullsLastPosition.from_str(nulls_last) if nulls_last is not None else None
+        count_mode = CountMode.from_str(count) if count is not None else None
+        policy = core.RestrictionPolicy.coerce(restrictions)
+        filter_expression, keyword_filter = self.create_measured_filter(filtering, self.extract_columns(query), policy)
+        query = self.apply_expression(query, filter_expression)
+        return keyword_filter.apply(query, nulls=nulls, count=count_mode), keyword_filter
+
+    def build_count(
+        self,
+        query: Select,
+        filtering: QsRoot | dict,
+        *restrictions: core.ColumnFilterRestriction | core.RestrictionPolicy,
+        budget: core.FilterBudget | None = None,
+    ) -> Select:
+        """
+        Builds a statement counting all rows matching the filtering - keywords (ordering, pagination) are not applied
+        and query is not wrapped into subquery unless it is needed (see `count_query`).
+        :param query: SQL query to filter.
+        :param filtering: Filtering object or dictionary.
+        :param restrictions: Restrictions to use when filtering - either column restrictions
+            or a single `RestrictionPolicy`.
+        :param budget: Complexity budget of filtering - overrides budget of the builder.
+        :return: Count statement.
+        """
+        self.check_budget(filtering, budget)
+        policy = core.RestrictionPolicy.coerce(restrictions)
+        filter_expression, _ = self.create_measured_filter(filtering, self.extract_columns(query), policy)
+        query = self.apply_expression(query, filter_expression)
+        return count_query(query)
+
+    def build_cached(
+        self,
+        query: Select,
+        filtering: dict,
+        policy: core.RestrictionPolicy,
+        nulls: NullsLastPosition | None,
+        count: CountMode | None = None,
+    ) -> Select:
+        """
+        Builds a SQL query using plan cache - plan is looked up by query, filter shape, restrictions, nulls position
+        and count mode.
+        On cache hit only the values are validated and bound into the prebuilt template.
+        :param query: SQL query to filter.
+        :param filtering: Filtering dictionary.
+        :param policy: Restriction policy to use when filtering.
+        :param nulls: Explicit position of nulls in ordering.
+        :param count: Count mode of paginated query.
+        :return: Filtered SQL query.
+        """
+        plan, slots = self.get_plan(query, filtering, policy, nulls, count)
+        if plan is None:
+            # plan cannot be created for this shape - build regularly
+            return self.build_uncached(query, filtering, policy, nulls, count)
+        return plan.bind(value for _, value in slots)
+
+    def get_plan(
+        self,
+        query: Select,
+        filtering: dict,
+        policy: core.RestrictionPolicy,
+        nulls: NullsLastPosition | None,
+        count: CountMode | None = None,
+    ) -> tuple[FilterPlan | None, list[tuple[str | int, t.Any]]]:
+        """
+        Looks up plan of the filter shape in plan cache, plan is created on cache miss.
+        :return: Tuple containing plan (None if plan cannot be created for the shape) and values extracted
+            from the filtering (see `core.filter_shape`).
+        """
+        shape, slots = core.filter_shape(filtering)
+        key = (query, shape, policy.key, nulls, count)
+        plan = self.plan_cache.get(key)
+        if plan is None:
+            plan = self.create_plan(query, filtering, slots, policy, nulls, count)
+            self.plan_cache.put(key, plan if plan is not None else _NO_PLAN)
+        return (plan if plan is not _NO_PLAN else None), slots
+
+    def build_uncached(
+        self,
+        query: Select,
+        filtering: QsRoot | dict,
+        policy: core.RestrictionPolicy,
+        nulls: NullsLastPosition | None,
+        count: CountMode | None = None,
+    ) -> Select:
+        """
+        Builds a SQL query without plan cache - filtering size is expected to be verified already.
+        """
+        filter_expression, keyword_filter = self.create_measured_filter(filtering, self.extract_columns(query), policy)
+        query = self.apply_expression(query, filter_expression)
+        return keyword_filter.apply(query, nulls=nulls, count=count)
+
+    def create_plan(
+        self,
+        query: Select,
+        filtering: dict,
+        slots: list[tuple[str | int, t.Any]],
+        policy: core.RestrictionPolicy,
+        nulls: NullsLastPosition | None,
+        count: CountMode | None = None,
+    ) -> FilterPlan | None:
+        """
+        Creates a plan for the filter - builds filter with bind parameters in place of extracted values.
+        :param query: SQL query to filter.
+        :param filtering: Filtering dictionary.
+        :param slots: Values extracted from filter shape (see `core.filter_shape`).
+        :param policy: Restriction policy to use when filtering.
+        :param nulls: Explicit position of nulls in ordering.
+        :param count: Count mode of paginated query.
+        :return: Filter plan or None if values could not be matched to built expression
+            (or statement depends on the values - see `InListOptions.plannable`).
+        """
+        filter_expression, keyword_filter = self.create_measured_filter(filtering, self.extract_columns(query), policy)
+        leaves = (
+            leaf
+            for leaf in (filter_expression.leaves() if filter_expression is not None else ())
+            if not (leaf.operator.assigned_value is None or isinstance(leaf.operator.assigned_value, bool))
+        )
+        names, checks = [], []
+        for index, (key, value) in enumerate(slots):
+            if key in ("limit", "offset"):
+                name = f"{PLAN_PARAM_PREFIX}{key}"
+                names.append(name)
+                setattr(keyword_filter, key, sa.bindparam(name, type_=sa.Integer))
+                if key == "limit" and count == CountMode.HAS_NEXT:
+                    checks.append(_parse_next_page_limit)
+                else:
+                    checks.append(functools.partial(core.parse_integer_keyword, key))
+                continue
+            name = f"{PLAN_PARAM_PREFIX}{index}"
+            names.append(name)
+            leaf = next(leaves, None)
+            if leaf is None or leaf.operator.filter_name != key:
+                return None
+            coerce = leaf.column_info.coerce if self.coerce_values and leaf.column_info is not None else None
+            if coerce is not None:
+                try:
+                    value = core.coerce_value(coerce, value)
+                except InvalidValueTypeError:
+                    # value belongs to another leaf (e.g. coerced into bool, which is not bound)
+                    return None
+            if leaf.operator.assigned_value != value:
+                return None
+            operator = copy(leaf.operator)
+            if isinstance(value, list) and not isinstance(operator, (SQLIn, SQLNotIn)):
+                # list compared by other operations is bound as a single value, not as expanding parameter
+                return None
+            in_list = getattr(operator, "in_list", None)
+            if in_list is not None and not in_list.plannable:
+                return None
+            operator.assigned_value = sa.bindparam(
+                name, type_=_bind_type(leaf.column, value), expanding=isinstance(value, list)
+            )
+            leaf.operator = operator
+            column_name = leaf.column.key
+            check = (
+                functools.partial(_check_restriction, policy, column_name, type(operator))
+                if policy.restricts(column_name, operator.filter_name)
+                else None
+            )
+            if coerce is not None:
+                check = functools.partial(_coerce_checked, coerce, check)
+            if in_list is not None and in_list.normalize:
+                check = functools.partial(_prepare_in_list, in_list, check)
+            checks.append(check)
+        if next(leaves, None) is not None:
+            return None
+        if self.deterministic and filter_expression is not None:
+            filter_expression.canonicalize()
+            renamed = _bind_stable_parameters(filter_expression)
+            names = [renamed.get(name, name) for name in names]
+        template = filter_expression.apply(query) if filter_expression else query
+        template = keyword_filter.apply(template, nulls=nulls, count=count)
+        return FilterPlan(template, names, checks)
+
+    def apply_expression(self, query: Select, filter_expression: FilterExpression | None) -> Select:
+        """
+        Applies filter expression built for the query - in `deterministic` mode nested expressions are ordered
+        canonically and values are bound with stable names (see `_bind_stable_parameters`).
+        """
+        if filter_expression is None:
+            return query
+        if self.deterministic:
+            filter_expression.canonicalize()
+            _bind_stable_parameters(filter_expression)
+        return filter_expression.apply(query)
 
     def create_filter_expression(
         self,
@@ -596,83 +2956,167 @@ class SqlQueryBuilder(core.QueryBuilder):
         columns: ColumnCollection,
         keyword_filter: SqlKeywordFilter,
         parent_column: str | None = None,
-        restrictions: list[core.ColumnFilterRestriction] = None,
+        restrictions: core.RestrictionPolicy | t.Sequence[core.ColumnFilterRestriction] = None,
         parent_junction: Junction = Junction.AND,
-    ) -> FilterExpression | list[FilterExpression]:
+        digests: list[Digest] | None = None,
+    ) -> FilterExpression | list[FilterExpression] | None:
         """
-        Creates a filter expression object based on a QsNode which is assumed to be already validated.
+        Creates a filter expression object based on a QsNode.
+        Node keys are verified (same rules as `verify_filtering`), columns resolved and restrictions checked
+        as each node is reached - no separate verification is needed.
         :param node: QsNode to create the expression from.
         :param columns: Query columns.
         :param keyword_filter: Keyword filter to use.
         :param parent_column: Parent column name.
         :param restrictions: Restrictions to use when filtering.
-        :param parent_junction: Parent junction - used for recursive calls.
+        :param parent_junction: Parent junction - used for nested column nodes.
+        :param digests: If given, digests of built expressions are collected into it (see `walk_expression`).
         :return: Filter expression object.
         """
-        if node.key in self.KEYWORDS:
-            keyword, value = self.process_keyword_node(node, columns)
-            keyword_filter.add_keyword(keyword, value)
-            return None
-        if node.key in self.JUNCTIONS:
-            # NOTE: if value of this node is array like dict - it indicates that there are multiple junctions
-            # with same name (which cannot be represented in dict format in other way than array-like dict)
-            if node.is_array_branch:
-                return [
-                    FilterExpression.joined_expressions(
-                        Junction.from_str(node.key),
-                        self.create_filter_expression(
-                            child, columns, keyword_filter, parent_column, restrictions=restrictions
-                        ),
-                    )
-                    for child in node.value
-                ]
-            nested_expressions = []
-            for child in node.value:
-                expr = self.create_filter_expression(
-                    child,
-                    columns,
-                    keyword_filter,
-                    parent_column,
-                    restrictions=restrictions,
-                    parent_junction=Junction.from_str(node.key),
-                )
-                if isinstance(expr, list):
-                    nested_expressions.extend(expr)
-                else:
-                    nested_expressions.append(expr)
+        return self.walk_expression(
+            node, QsNodeSource, columns, keyword_filter, parent_column, restrictions, parent_junction, digests
+        )
 
-            return FilterExpression.joined_expressions(
-                Junction.from_str(node.key),
-                *nested_expressions,
-            )
-        # check for multi-junction in array-like dict format
-        else:
-            # if node is a leaf node, key is operator and thus expression will inherit from parent column
-            # otherwise key is column name and passed as parent column
-            if node.is_leaf:
-                column_ref = self.resolve_column(parent_column, columns)
-                operator = get_sql_operator(node.key)(node.value)
-                if restrictions and (restriction := get_restriction(column_ref.key, restrictions)):
-                    if not restriction.is_filter_allowed(operator):
-                        raise FiltrationNotAllowed(
-                            f"Filtering operation {operator.filter_name} is not allowed, either with the current value or is forbidden as whole."
-                        )
-                return FilterExpression(column_ref, operator)
-            elif node.is_simple_array_branch:
-                # in case of `in_` or `nin` operator, node is a simple array branch
-                column_ref = self.resolve_column(parent_column, columns)
-                operator = get_sql_operator(node.key)([child.value for child in node.value])
-                return FilterExpression(column_ref, operator)
+    def build_dict_expression(
+        self,
+        key: str | int,
+        value: t.Any,
+        columns: ColumnCollection,
+        keyword_filter: SqlKeywordFilter,
+        parent_column: str | None = None,
+        restrictions: core.RestrictionPolicy | t.Sequence[core.ColumnFilterRestriction] = None,
+        parent_junction: Junction = Junction.AND,
+        digests: list[Digest] | None = None,
+    ) -> FilterExpression | list[FilterExpression] | None:
+        """
+        Validates and creates a filter expression directly from (nested) dictionary item - without `QsRoot`.
+        Dictionaries and lists are interpreted same way as by `QsNode` (see `DictSource`).
+        :param key: Key of the item.
+        :param value: Value of the item.
+        :param columns: Query columns.
+        :param keyword_filter: Keyword filter to use.
+        :param parent_column: Parent column name.
+        :param restrictions: Restrictions to use when filtering.
+        :param parent_junction: Parent junction - used for nested column nodes.
+        :param digests: If given, digests of built expressions are collected into it (see `walk_expression`).
+        :return: Filter expression object.
+        """
+        return self.walk_expression(
+            (key, value), DictSource, columns, keyword_filter, parent_column, restrictions, parent_junction, digests
+        )
+
+    def walk_expression(
+        self,
+        entry: t.Any,
+        source: t.Type["FilterSource"],
+        columns: ColumnCollection,
+        keyword_filter: SqlKeywordFilter,
+        parent_column: str | None = None,
+        restrictions: core.RestrictionPolicy | t.Sequence[core.ColumnFilterRestriction] = None,
+        parent_junction: Junction = Junction.AND,
+        digests: list[Digest] | None = None,
+    ) -> FilterExpression | list[FilterExpression] | None:
+        """
+        Validates and creates a filter expression from a single entry of filtering in one traversal.
+        Traversal is iterative (explicit stack), nested expressions are joined once all children of a node are built.
+        Meaning of the nodes:
+        - keyword node - processed into keyword filter
+        - leaf (or simple array) node - operation on parent column
+        - junction node - joins nested expressions, array-like junction results in list of expressions
+        that are joined by the parent junction
+        - column (or array index) node - joins nested expressions with parent junction
+        :param entry: Entry of filtering - its format is given by `source`.
+        :param source: Source describing entries (`QsNodeSource` or `DictSource`).
+        :param columns: Query columns.
+        :param keyword_filter: Keyword filter to use.
+        :param parent_column: Parent column name.
+        :param restrictions: Restrictions to use when filtering.
+        :param parent_junction: Parent junction - used for nested column nodes.
+        :param digests: If given, digests of built expressions (see `FilterExpression.fingerprint`) are collected
+            into it - fingerprint is computed in the same traversal.
+        :return: Filter expression object, list of expressions (array-like junction) or None (keyword).
+        """
+        root = []
+        # stack items are either entries to visit: (entry, parent column, parent junction, results, result digests)
+        # or joins of already built nested expressions:
+        # (_JOIN, junction, as list, nested expressions, nested digests, results, result digests)
+        stack = [(entry, parent_column, parent_junction, root, digests)]
+        while stack:
+            item = stack.pop()
+            if item[0] is _JOIN:
+                _, junction, as_list, nested_expressions, nested_digests, results, result_digests = item
+                if as_list:
+                    expr = nested_expressions
+                else:
+                    expr = FilterExpression.joined_expressions(junction, *nested_expressions)
+                _collect_expression(results, expr, raw=results is root)
+                if result_digests is not None:
+                    if as_list:
+                        result_digests.extend(nested_digests)
+                    elif nested_digests:
+                        result_digests.append(junction_digest(junction.name.lower(), nested_digests))
+                continue
+            current, current_column, current_junction, results, result_digests = item
+            key = source.key(current)
+            if self.is_keyword(key, columns):
+                keyword, value = source.keyword(self, current, columns)
+                keyword_filter.add_keyword(keyword, value)
+                continue
+            kind, payload = source.classify(current)
+            self.verify_node_key(key, kind is NodeKind.LEAF, current_column)
+            if kind is NodeKind.LEAF:
+                expr = self.create_leaf_expression(current_column, key, payload, columns, restrictions)
+                _collect_expression(results, expr, raw=results is root)
+                if result_digests is not None:
+                    result_digests.append(expr.digest())
+                continue
+            nested_expressions = []
+            nested_digests = [] if result_digests is not None else None
+            if key in self.JUNCTIONS:
+                junction = Junction.from_str(key)
+                # multiple junctions with same name in array-like format - joined by parent junction
+                as_list = kind is NodeKind.ARRAY
+                child_junction = Junction.AND if as_list else junction
+                child_column = current_column
             else:
-                # node is a nested node - column argument
-                nested_expressions = [
-                    self.create_filter_expression(child, columns, keyword_filter, node.key, restrictions=restrictions)
-                    for child in node.value
-                ]
-                return FilterExpression.joined_expressions(
-                    parent_junction,
-                    *nested_expressions,
-                )
+                # key is either an index of array-like junction or a column name
+                junction, as_list = current_junction, False
+                child_junction = Junction.AND
+                child_column = None if isinstance(key, int) else key
+            stack.append((_JOIN, junction, as_list, nested_expressions, nested_digests, results, result_digests))
+            stack.extend(
+                (child, child_column, child_junction, nested_expressions, nested_digests) for child in reversed(payload)
+            )
+        return root[0] if root else None
+
+    def create_leaf_expression(
+        self,
+        column_ref: str,
+        operation: str,
+        value: t.Any,
+        columns: ColumnCollection,
+        restrictions: core.RestrictionPolicy | t.Sequence[core.ColumnFilterRestriction] | None = None,
+    ) -> FilterExpression:
+        """
+        Creates a simple filter expression - resolves column, creates operator and checks restrictions.
+        :param column_ref: Column reference.
+        :param operation: Name of the operation.
+        :param value: Value of the operation.
+        :param columns: Query columns.
+        :param restrictions: Restrictions to use when filtering.
+        :return: Filter expression object.
+        """
+        column_info = self.resolve_column_info(column_ref, columns)
+        if self.coerce_values and column_info.coerce is not None:
+            value = core.coerce_value(column_info.coerce, value)
+        operator = get_sql_operator(operation)(value)
+        if self.in_list is not None and isinstance(operator, (SQLIn, SQLNotIn)):
+            operator.in_list = self.in_list
+        if restrictions:
+            if not isinstance(restrictions, core.RestrictionPolicy):
+                restrictions = core.RestrictionPolicy(*restrictions)
+            restrictions.check(column_info.element.key, operator)
+        return FilterExpression(column_info.element, operator, column_info)
 
     def process_keyword_node(self, keyword_node: QsNode, query_columns: ColumnCollection) -> tuple[str, t.Any]:
         """
@@ -681,40 +3125,66 @@ class SqlQueryBuilder(core.QueryBuilder):
         :param query_columns: Query columns.
         :return: Tuple containing keyword and its value.
         """
-        if keyword_node.key == "limit":
-            # node should be always a leaf node
-            # value should be an integer-like value
-            if not keyword_node.is_leaf:
-                raise InvalidValueTypeError("Limit keyword should be a leaf node.")
-            try:
-                return "limit", int(keyword_node.value)
-            except ValueError:
-                raise InvalidValueTypeError("Limit value should be an integer-like value.")
-        elif keyword_node.key == "offset":
+        if keyword_node.is_leaf:
+            value = keyword_node.value
+        elif keyword_node.is_simple_array_branch:
+            value = [child.value for child in keyword_node.value]
+        else:
+            value = keyword_node.to_dict()
+        return self.process_keyword(keyword_node.key, value, query_columns)
+
+    def process_keyword(self, keyword: str, value: t.Any, query_columns: ColumnCollection) -> tuple[str, t.Any]:
+        """
+        Processes a keyword with its plain value and returns a tuple containing keyword and its processed value.
+        :param keyword: Keyword name.
+        :param value: Keyword value - plain value, list or (array-like) dictionary.
+        :param query_columns: Query columns.
+        :return: Tuple containing keyword and its value.
+        """
+        if keyword in ("limit", "offset"):
             # node should be always a leaf node
             # value should be an integer-like value
-            if not keyword_node.is_leaf:
-                raise InvalidValueTypeError("Offset keyword should be a leaf node.")
-            try:
-                return "offset", int(keyword_node.value)
-            except ValueError:
-                raise InvalidValueTypeError("Offset value should be an integer-like value.")
-        elif keyword_node.key == "order_by":
+            if isinstance(value, (dict, list)):
+                raise InvalidValueTypeError(f"{keyword.capitalize()} keyword should be a leaf node.")
+            return keyword, core.parse_integer_keyword(keyword, value)
+        elif keyword == "order_by":
             # node can be either a leaf node or a simple array node
             # value(s) should have correct format see parse_order_by in `siphon._filter_core`
-            if keyword_node.is_leaf:
+            if isinstance(value, dict) and core.is_simple_array_dict(value):
+                value = list(value.values())
+            if not isinstance(value, (dict, list)):
                 # single column
-                direction, column_ref = core.parse_order_by(keyword_node.value)
+                direction, column_ref = core.parse_order_by(value)
                 return "order_by", self.resolve_order_by(direction, column_ref, query_columns)
-            elif keyword_node.is_simple_array_branch:
+            elif isinstance(value, list) and core.is_simple_array(value):
                 # multiple columns
                 order_by_columns = []
-                for child in keyword_node.value:
-                    direction, column_ref = core.parse_order_by(child.value)
+                for item in value:
+                    direction, column_ref = core.parse_order_by(item)
                     order_by_columns.extend(self.resolve_order_by(direction, column_ref, query_columns))
                 return "order_by", order_by_columns
             else:
                 raise InvalidValueTypeError("Order by keyword should be either a leaf node or a simple array node.")
+        elif keyword == self.KEYSET_KEYWORD:
+            # opaque cursor token, empty for the first page
+            if isinstance(value, (dict, list)):
+                raise InvalidValueTypeError(f"{keyword.capitalize()} keyword should be a leaf node.")
+            if value is None or value == "":
+                return "after", None
+            if not isinstance(value, str):
+                raise InvalidValueTypeError(f"{keyword.capitalize()} keyword should be a cursor string.")
+            return "after", core.decode_cursor(value)
+
+    def is_keyword(self, key: str | int, query_columns: ColumnCollection) -> bool:
+        """
+        Checks whether the key of filtering node is a keyword - keyset keyword is a column reference
+        if query columns contain a column of the same name (keyset pagination is not available for such query).
+        :param key: Key of the node.
+        :param query_columns: Query columns.
+        """
+        if key not in self.KEYWORDS:
+            return False
+        return key != self.KEYSET_KEYWORD or key not in self.column_index(query_columns)
 
     def resolve_order_by(self, direction: int, column_ref: str, query_columns: ColumnCollection) -> list[ColumnElement]:
         """
@@ -736,18 +3206,47 @@ class SqlQueryBuilder(core.QueryBuilder):
         :param query_columns: Query columns.
         :return: Resolved column element
         """
-        if "." in column_ref:
-            table_name, column_name = column_ref.split(".")
-            referenced_column = self.get_base_column(table_name, column_name)
-            if referenced_column is not None:
-                # found correct column reference
-                return referenced_column
-        # column reference is not from table_base
-        # try to find it in query_columns
-        referenced_column = query_columns.get(column_ref)
-        if referenced_column is None:
+        return self.resolve_column_info(column_ref, query_columns).element
+
+    def resolve_column_info(self, column_ref: str, query_columns: ColumnCollection) -> ColumnInfo:
+        """
+        Resolves a column reference from string to a column metadata using column index of query columns.
+        :param column_ref: Column reference (string name of column or table.column).
+        :param query_columns: Query columns.
+        :return: Resolved column metadata
+        """
+        column_info = self.column_index(query_columns).get(column_ref)
+        if column_info is None:
             raise ColumnError(f"Column {column_ref} not found in query columns.")
-        return referenced_column
+        return column_info
+
+    def column_index(self, query_columns: ColumnCollection) -> dict[str, ColumnInfo]:
+        """
+        Returns index of all accepted column references for query columns - names of query columns
+        (including labels) and `table.column` references of table base (taking precedence).
+        Index is created once per column collection.
+        :param query_columns: Query columns.
+        :return: Mapping of column reference to column metadata.
+        """
+        entry = self._column_indexes.get(id(query_columns))
+        # entry keeps reference to column collection, so its id cannot be reused while cached
+        if entry is not None and entry[0] is query_columns:
+            return entry[1]
+        index = {key: ColumnInfo(query_columns.get(key)) for key in query_columns.keys()}
+        index.update(self.base_index)
+        self._column_indexes.put(id(query_columns), (query_columns, index))
+        return index
+
+    @staticmethod
+    def primary_key_columns(query_columns: ColumnCollection) -> list[ColumnElement]:
+        """
+        Returns primary key columns of query columns - used as tie-breaker of keyset pagination.
+        :raises ColumnError: If query columns contain no primary key column.
+        """
+        columns = [column for column in query_columns if getattr(column, "primary_key", False)]
+        if not columns:
+            raise ColumnError("Keyset pagination requires primary key column in query columns.")
+        return columns
 
     def get_base_column(self, table: str, column: str) -> ColumnElement | None:
         if table in self.table_base:
@@ -770,19 +3269,22 @@ def reconstruct_filtering(
     :param as_obj: Whether to return the filtering object as an object.
     :return: Reconstructed filtering object.
     """
-    # 1. iterate over expression and dump it into a dictionary
-    # 2. iterate over keywords and dump them into a dictionary
-    if expression is not None:
-        expression.normalize()
-        filter_dump = expression.dump()
-    else:
-        filter_dump = {}
-    keyword_dump = keywords.to_dict()
-    filter_dump.update(keyword_dump)
+    filter_dump = expression.dump(as_lists=True) if expression is not None else {}
+    filter_dump.update(keywords.to_dict())
+    if not as_obj:
+        # dump is already in the form of `QsRoot.to_dict`
+        return filter_dump
     root = QsRoot()
     for key, value in filter_dump.items():
-        node = QsNode.load_from_dict(key, value, parse_array=True)
-        root.add_child(node)
-    if as_obj:
-        return root
-    return root.to_dict()
+        root.add_child(QsNode.load_from_dict(key, value, parse_array=True))
+    return root
+
+
+def reconstruct_query_string(expression: FilterExpression | None, keywords: SqlKeywordFilter) -> str:
+    """
+    Reconstructs filtering as query string (same format as `qstion.stringify`) - e.g. for links of other pages.
+    :param expression: Filter expression.
+    :param keywords: Keyword filter.
+    :return: Query string of the filtering.
+    """
+    return core.encode_query_string(reconstruct_filtering(expression, keywords))
@@ -2480,6 +2480,1882 @@ class SQLTest(unittest.TestCase):
         nullable = is_nullable(expr)
         self.assertFalse(nullable)
 
+    def test_plan_cache(self):
+        import src.datasiphon as ds
+        from src.datasiphon import _exc as core_exc
+
+        # prepare builders - one without and one with plan cache
+        builder = ds.SqlQueryBuilder({"tt": data.test_table})
+        cached_builder = ds.SqlQueryBuilder({"tt": data.test_table}, plan_cache=ds.PlanCache(maxsize=2))
+
+        def literal(query):
+            return str(query.compile(compile_kwargs={"literal_binds": True}))
+
+        f_ = {
+            "name": {"eq": "John", "in_": ["John", "Doe"]},
+            "or": {"age": {"gt": 20}, "is_active": {"eq": True}},
+            "limit": 10,
+            "offset": "5",
+            "order_by": "-age",
+        }
+        self.assertEqual(
+            literal(cached_builder.build(data.basic_enum_select, f_)),
+            literal(builder.build(data.basic_enum_select, f_)),
+        )
+        self.assertEqual(cached_builder.plan_cache.info().misses, 1)
+
+        # same shape, different values - values are bound into cached plan
+        f_ = {
+            "name": {"eq": "Jane", "in_": ["Jane"]},
+            "or": {"age": {"gt": 30}, "is_active": {"eq": True}},
+            "limit": 20,
+            "offset": 0,
+            "order_by": "-age",
+        }
+        self.assertEqual(
+            literal(cached_builder.build(data.basic_enum_select, f_)),
+            literal(builder.build(data.basic_enum_select, f_)),
+        )
+        info = cached_builder.plan_cache.info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+
+        # `None` and bool values change the expression - they are part of the shape
+        f_ = {"name": {"eq": None}}
+        cached_builder.build(data.basic_enum_select, f_)
+        self.assertEqual(cached_builder.plan_cache.info().misses, 2)
+
+        # values are still validated on cache hit
+        f_ = {"name": {"eq": "John"}, "limit": 10}
+        cached_builder.build(data.basic_enum_select, f_)
+        with self.assertRaises(core_exc.InvalidValueTypeError):
+            cached_builder.build(data.basic_enum_select, {"name": {"eq": "John"}, "limit": "john"})
+
+        # restrictions with specific values are checked on cache hit
+        restriction = ds.ColumnFilterRestriction.from_dict("name", {"eq": "Doe"})
+        cached_builder.build(data.basic_enum_select, {"name": {"eq": "John"}}, restriction)
+        with self.assertRaises(core_exc.FiltrationNotAllowed):
+            cached_builder.build(data.basic_enum_select, {"name": {"eq": "Doe"}}, restriction)
+
+        # restrictions of list operations are checked with and without plan
+        restriction = ds.ColumnFilterRestriction.from_dict("name", {"in_": ["Doe"]})
+        cached_builder.build(data.basic_enum_select, {"name": {"in_": ["John"]}}, restriction)
+        for filter_builder in (cached_builder, builder):
+            with self.assertRaises(core_exc.FiltrationNotAllowed):
+                filter_builder.build(data.basic_enum_select, {"name": {"in_": ["Doe"]}}, restriction)
+
+        # least recently used plans are evicted
+        info = cached_builder.plan_cache.info()
+        self.assertEqual(info.currsize, 2)
+        self.assertGreater(info.evictions, 0)
+        cache = ds.PlanCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertEqual(cache.items(), [("a", 1), ("c", 3)])
+        self.assertEqual(cache.info(), (1, 0, 1, 2, 2))
+        # counters of finished threads are kept in totals, but not registered per thread
+        import threading
+
+        for _ in range(5):
+            lookup = threading.Thread(target=cache.get, args=("b",))
+            lookup.start()
+            lookup.join()
+        self.assertEqual(cache.info(), (1, 5, 1, 2, 2))
+        self.assertLessEqual(len(cache._thread_counts), 2)
+
+        # values are bound with the same type as without plan - strings compared to non-string columns
+        # are bound as strings, plans are not shared between values of different types
+        import datetime
+
+        tt = data.test_table
+        query = sa.select(tt)
+        cached_builder = ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache())
+        engine = sa.create_engine("sqlite://")
+        tt.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                sa.insert(tt),
+                [
+                    {"id": i, "name": "a", "age": i, "is_active": True, "created_at": datetime.datetime(2024, 1, i)}
+                    for i in range(1, 6)
+                ],
+            )
+        filters = [
+            {"created_at": {"ge": "2024-01-03 00:00:00.000000"}},
+            {"created_at": {"ge": datetime.datetime(2024, 1, 2)}},
+            {"created_at": {"in_": ["2024-01-02 00:00:00.000000", "2024-01-04 00:00:00.000000"]}},
+            {"created_at": {"in_": [datetime.datetime(2024, 1, 2)]}},
+            {"age": {"lt": "3"}},
+            {"age": {"lt": 4}},
+        ]
+        with engine.connect() as connection:
+            for f_ in filters * 2:
+                self.assertEqual(
+                    connection.execute(cached_builder.build(query, f_)).all(),
+                    connection.execute(builder.build(query, f_)).all(),
+                )
+        info = cached_builder.plan_cache.info()
+        self.assertEqual((info.hits, info.misses), (len(filters), len(filters)))
+        # list compared by other operations than `in_`/`nin` is not planned - statement is the same as without plan
+        f_ = {"name": {"eq": ["a", "b"]}}
+        for _ in range(2):
+            self.assertEqual(str(cached_builder.build(query, f_)), str(builder.build(query, f_)))
+
+    def test_single_pass_filter(self):
+        import src.datasiphon as ds
+        from src.datasiphon import _exc as core_exc
+
+        # prepare builders - two-pass and single-pass
+        builder = ds.SqlQueryBuilder({"tt": data.test_table, "st": data.secondary_test})
+        single_pass_builder = ds.SqlQueryBuilder({"tt": data.test_table, "st": data.secondary_test}, single_pass=True)
+
+        def literal(query):
+            return str(query.compile(compile_kwargs={"literal_binds": True}))
+
+        filters = [
+            {},
+            {"name": {"eq": "John"}, "age": {"gt": 20}},
+            {"name": {"or": {"eq": "John", "ne": "Doe"}}, "tt.age": {"in_": [1, 2, 3]}},
+            {"or": {"id": {"eq": 1}, "and": {0: {"age": {"gt": 1}}, 1: {"name": {"eq": "a"}, "id": {"lt": 5}}}}},
+            {"or": [{"name": {"eq": "John"}}, {"age": {"le": 20}}], "limit": 5, "order_by": ["-age", "+name"]},
+        ]
+        for f_ in filters:
+            self.assertEqual(
+                literal(single_pass_builder.build(data.combined_enum_select, f_)),
+                literal(builder.build(data.combined_enum_select, f_)),
+            )
+
+        # same errors as with separate verification
+        invalid_filters = [
+            ({"name": "john"}, core_exc.InvalidFilteringStructureError),
+            ({"name": {"unknown": "john"}}, core_exc.InvalidFilteringStructureError),
+            ({"eq": "john"}, core_exc.InvalidFilteringStructureError),
+            ({"name": {"age": {"eq": 1}}}, core_exc.InvalidFilteringStructureError),
+            ({"country": {"eq": "USA"}}, core_exc.ColumnError),
+            ({"limit": "john"}, core_exc.InvalidValueTypeError),
+        ]
+        for f_, error in invalid_filters:
+            with self.assertRaises(error):
+                single_pass_builder.build(data.combined_enum_select, f_)
+
+        # restrictions are checked for list operations as well
+        restriction = ds.ColumnFilterRestriction.from_dict("age", {"in_": ds.AnyValue})
+        for filter_builder in (builder, single_pass_builder):
+            with self.assertRaises(core_exc.FiltrationNotAllowed):
+                filter_builder.build(data.combined_enum_select, {"age": {"in_": [1, 2]}}, restriction)
+
+    def test_single_pass_dict_filter(self):
+        import src.datasiphon as ds
+        from src.datasiphon import _exc as core_exc
+
+        # prepare builders - two-pass and single-pass
+        builder = ds.SqlQueryBuilder({"tt": data.test_table})
+        single_pass_builder = ds.SqlQueryBuilder({"tt": data.test_table}, single_pass=True)
+
+        def literal(query):
+            return str(query.compile(compile_kwargs={"literal_binds": True}))
+
+        # array-like dictionaries are handled same way as by `qstion`
+        filters = [
+            {"name": {"in_": {0: "John", 1: "Doe"}}},
+            {"and": {0: {"age": {"gt": 1}, "name": {"eq": 1}}, 1: {"age": {"lt": 10}}}, "order_by": {0: "-age"}},
+            {"name": {"nin": []}},
+        ]
+        for f_ in filters:
+            self.assertEqual(
+                literal(single_pass_builder.build(data.basic_enum_select, f_)),
+                literal(builder.build(data.basic_enum_select, f_)),
+            )
+
+        # `QsRoot` filtering is still supported
+        f_ = {"name": {"eq": "John"}, "limit": 10}
+        self.assertEqual(
+            literal(single_pass_builder.build(data.basic_enum_select, single_pass_builder.load_filtering(f_))),
+            literal(builder.build(data.basic_enum_select, f_)),
+        )
+
+        # empty objects are not allowed - same error as on the default path
+        for f_ in ({"name": {}}, {"or": {}}, {"name": {"eq": {}}}, {"and": [{}]}):
+            for filter_builder in (single_pass_builder, builder):
+                with self.assertRaises(ValueError):
+                    filter_builder.build(data.basic_enum_select, f_)
+        # nested keyword values are not allowed
+        with self.assertRaises(core_exc.InvalidValueTypeError):
+            single_pass_builder.build(data.basic_enum_select, {"limit": [1, 2]})
+
+    def test_column_index(self):
+        import src.datasiphon as ds
+        from src.datasiphon import sql_filter as sqlf
+        from src.datasiphon import _exc as core_exc
+
+        # prepare builder
+        builder = ds.SqlQueryBuilder({"tt": data.test_table, "ngt": data.nullables_generic_types_table})
+
+        # table base references are indexed at construction
+        self.assertIs(builder.base_index["tt.name"].element, data.test_table.c.name)
+        self.assertTrue(builder.base_index["ngt.int_type"].nullable)
+        self.assertTrue(builder.base_index["tt.is_active"].is_bool)
+        self.assertIs(builder.base_index["tt.age"].python_type, int)
+
+        # query columns (including labels) are indexed once per column collection
+        columns = ds.SqlQueryBuilder.extract_columns(data.labeled_select)
+        index = builder.column_index(columns)
+        self.assertIs(builder.column_index(columns), index)
+        self.assertIs(index["tt_name"].element, columns["tt_name"])
+        self.assertIs(index["tt.name"].element, data.test_table.c.name)
+        with self.assertRaises(core_exc.ColumnError):
+            builder.resolve_column("name", columns)
+
+        # evaluators produce same expressions as operators without column metadata
+        for column in (data.test_table.c.is_active, data.nullables_generic_types_table.c.int_type):
+            info = sqlf.ColumnInfo(column)
+            for operator in (sqlf.SQLEq(None), sqlf.SQLNe(None), sqlf.SQLEq(1), sqlf.SQLNe(True)):
+                self.assertEqual(
+                    str(operator.evaluate(column, info).compile(compile_kwargs={"literal_binds": True})),
+                    str(operator.evaluate(column).compile(compile_kwargs={"literal_binds": True})),
+                )
+
+    def test_restriction_policy(self):
+        import src.datasiphon as ds
+        from src.datasiphon import _exc as core_exc
+        from src.datasiphon import sql_filter as sqlf
+
+        # prepare builder
+        builder = ds.SqlQueryBuilder({"tt": data.test_table})
+
+        # policy compiled once from restrictions or configuration
+        policy = ds.RestrictionPolicy(
+            ds.ColumnFilterRestriction.from_dict("age", {"eq": ds.AnyValue}),
+            ds.ColumnFilterRestriction("name", sqlf.SQLEq.generate_restriction("John")),
+            ds.ColumnFilterRestriction("name", sqlf.SQLIn.generate_restriction(["a", "b"])),
+        )
+        self.assertEqual(
+            policy,
+            ds.RestrictionPolicy.from_dict({"name": {"in_": ["a", "b"], "eq": "John"}, "age": {"eq": ds.AnyValue}}),
+        )
+        self.assertFalse(policy.is_filter_allowed("age", sqlf.SQLEq(20)))
+        self.assertTrue(policy.is_filter_allowed("age", sqlf.SQLGt(20)))
+        self.assertFalse(policy.is_filter_allowed("name", sqlf.SQLEq("John")))
+        self.assertTrue(policy.is_filter_allowed("name", sqlf.SQLEq("Doe")))
+        self.assertFalse(policy.is_filter_allowed("name", sqlf.SQLIn(["a", "b"])))
+        self.assertTrue(policy.is_filter_allowed("name", sqlf.SQLIn(["a"])))
+        self.assertTrue(policy.is_filter_allowed("is_active", sqlf.SQLEq(True)))
+
+        # policy can be passed to build in place of restrictions
+        with self.assertRaises(core_exc.FiltrationNotAllowed):
+            builder.build(data.basic_enum_select, {"age": {"eq": 20}}, policy)
+        with self.assertRaises(core_exc.FiltrationNotAllowed):
+            builder.build(data.basic_enum_select, {"name": {"in_": ["a", "b"]}}, policy)
+        self.assertEqual(
+            str(builder.build(data.basic_enum_select, {"name": {"eq": "Doe"}}, policy)),
+            str(data.basic_enum_select.where(data.test_table.c.name == "Doe")),
+        )
+
+        # policy cannot be combined with other restrictions
+        with self.assertRaises(TypeError):
+            builder.build(data.basic_enum_select, {"name": {"eq": "Doe"}}, policy, policy)
+
+    def test_filtering_size_limits(self):
+        import src.datasiphon as ds
+        from src.datasiphon import _exc as core_exc
+        from src.datasiphon import sql_filter as sqlf
+
+        # prepare builders
+        builder = ds.SqlQueryBuilder({"tt": data.test_table}, max_depth=8, max_nodes=20)
+        single_pass_builder = ds.SqlQueryBuilder({"tt": data.test_table}, single_pass=True, max_depth=8)
+
+        def nested(depth: int) -> dict:
+            filtering = {"name": {"eq": "John"}}
+            for _ in range(depth):
+                filtering = {"and": filtering}
+            return filtering
+
+        # nesting within limit is built as usual
+        expected = str(data.basic_enum_select.where(data.test_table.c.name == "John"))
+        self.assertEqual(str(builder.build(data.basic_enum_select, nested(5))), expected)
+        self.assertEqual(str(single_pass_builder.build(data.basic_enum_select, nested(5))), expected)
+
+        # too deep nesting is rejected - dictionary as well as loaded filtering
+        for b in (builder, single_pass_builder):
+            with self.assertRaises(core_exc.InvalidFilteringStructureError):
+                b.build(data.basic_enum_select, nested(10))
+            with self.assertRaises(core_exc.InvalidFilteringStructureError):
+                b.build(data.basic_enum_select, b.load_filtering(nested(10)))
+
+        # default limits reject deeply nested filtering instead of overflowing the stack
+        with self.assertRaises(core_exc.InvalidFilteringStructureError):
+            ds.SqlQueryBuilder({"tt": data.test_table}).build(data.basic_enum_select, nested(2000))
+
+        # too many nodes - simple arrays count as a single node
+        wide = {"or": {str(i): {"age": {"eq": i}} for i in range(10)}}
+        with self.assertRaises(core_exc.InvalidFilteringStructureError):
+            builder.build(data.basic_enum_select, {"or": {"age": {"eq": 1}, "name": {"eq": "a"}}, "and": wide})
+        builder.build(data.basic_enum_select, {"age": {"in_": list(range(100))}})
+
+        # expressions built programmatically are processed without recursion
+        expr = ds.sql_filter.FilterExpression(data.test_table.c.age, sqlf.SQLEq(0))
+        for i in range(1, 3000):
+            expr = ds.sql_filter.FilterExpression.joined_expressions(
+                sqlf.Junction.OR if i % 2 else sqlf.Junction.AND,
+                expr,
+                ds.sql_filter.FilterExpression(data.test_table.c.age, sqlf.SQLEq(i)),
+            )
+        self.assertEqual(len(list(expr.leaves())), 3000)
+        self.assertIsNotNone(expr.produce_whereclause())
+        self.assertIsNotNone(expr.dump())
+        self.assertIsNotNone(expr.find_expression("or.and.age:eq"))
+
+    def test_filter_budget(self):
+        import src.datasiphon as ds
+        from src.datasiphon import _exc as core_exc
+
+        # prepare builders
+        budget = ds.FilterBudget(max_leaves=5, max_or_fanout=3, max_list_length=10, max_order_by=2, max_limit=100)
+        builder = ds.SqlQueryBuilder({"tt": data.test_table}, budget=budget)
+        cached_builder = ds.SqlQueryBuilder({"tt": data.test_table}, plan_cache=ds.PlanCache(), budget=budget)
+
+        # cost is measured and returned with the query
+        f_ = {
+            "or": {"name": {"eq": "John"}, "age": {"in_": [1, 2, 3]}},
+            "is_active": {"eq": True},
+            "order_by": ["-age", "+name"],
+            "limit": "10",
+        }
+        for b in (builder, cached_builder):
+            query, cost = b.build_with_cost(data.basic_enum_select, f_)
+            self.assertEqual(str(query), str(b.build(data.basic_enum_select, f_)))
+            self.assertEqual(cost.leaves, 3)
+            self.assertEqual(cost.or_fanout, 2)
+            self.assertEqual(cost.list_length, 3)
+            self.assertEqual(cost.order_by, 2)
+            self.assertEqual(cost.limit, 10)
+            # 2 simple operations, 3 list values, one extra `or` branch and 2 `order_by` columns
+            self.assertEqual(cost.score, 2 + 3 + 2 + 4)
+        self.assertEqual(builder.build_with_cost(data.basic_enum_select, builder.load_filtering(f_))[1], cost)
+
+        # filtering over budget is rejected
+        over_budget = [
+            {"age": {"in_": list(range(50))}},
+            {"or": {"age": {"eq": 1}, "name": {"eq": "a"}, "is_active": {"eq": True}, "id": {"eq": 1}}},
+            {"age": {"gt": 1, "lt": 10, "ne": 5}, "name": {"ne": "a", "eq": "b"}, "id": {"eq": 1}},
+            {"order_by": ["-age", "+name", "id.asc"]},
+            {"limit": 1000},
+        ]
+        for f_ in over_budget:
+            for b in (builder, cached_builder):
+                with self.assertRaises(core_exc.BudgetExceededError):
+                    b.build(data.basic_enum_select, f_)
+
+        # budget of build overrides budget of the builder
+        builder.build(data.basic_enum_select, {"limit": 1000}, budget=ds.FilterBudget(max_limit=1000))
+        with self.assertRaises(core_exc.BudgetExceededError):
+            builder.build(data.basic_enum_select, {"age": {"eq": 1}}, budget=ds.FilterBudget(max_score=0))
+
+        # budget is checked before the filter is built - even invalid filtering is rejected by budget first
+        with self.assertRaises(core_exc.BudgetExceededError):
+            builder.build(data.basic_enum_select, {"unknown": {"in_": list(range(50))}})
+
+    def test_in_list_strategies(self):
+        import src.datasiphon as ds
+        from sqlalchemy.dialects import postgresql
+
+        def compiled(query, dialect=None):
+            return query.compile(dialect=dialect or postgresql.dialect())
+
+        f_ = {"age": {"in_": [3, 1, 2, 3, 1]}, "id": {"nin": [5, 4, 5]}}
+
+        # default - legacy rendering, values are kept as they are
+        query = ds.SqlQueryBuilder({"tt": data.test_table}).build(data.basic_enum_select, f_)
+        self.assertEqual(sorted(compiled(query).params.values()), [[3, 1, 2, 3, 1], [5, 4, 5]])
+
+        # expanding bind parameter with deduplicated and sorted values
+        builder = ds.SqlQueryBuilder({"tt": data.test_table}, in_list=ds.InListOptions("expanding"))
+        query = builder.build(data.basic_enum_select, f_)
+        self.assertIn("POSTCOMPILE", str(compiled(query)))
+        self.assertEqual(sorted(compiled(query).params.values()), [[1, 2, 3], [4, 5]])
+        other_query = builder.build(data.basic_enum_select, {"age": {"in_": [1, 2, 3, 4, 5, 6]}, "id": {"nin": [1]}})
+        self.assertEqual(str(query), str(other_query))
+
+        # single array parameter on PostgreSQL
+        builder = ds.SqlQueryBuilder({"tt": data.test_table}, in_list=ds.InListOptions(ds.InListStrategy.ANY))
+        sql = compiled(builder.build(data.basic_enum_select, f_))
+        self.assertIn("tt.age = ANY (%(param_1)s::INTEGER[])", str(sql))
+        self.assertIn("tt.id != ALL (%(param_2)s::INTEGER[])", str(sql))
+        self.assertEqual(sql.params, {"param_1": [1, 2, 3], "param_2": [4, 5]})
+
+        # chunked - values rendered at execution time in chunks of limited size
+        builder = ds.SqlQueryBuilder({"tt": data.test_table}, in_list=ds.InListOptions("chunked", chunk_size=2))
+        query = builder.build(data.basic_enum_select, f_)
+        self.assertEqual(str(compiled(query)).count("POSTCOMPILE"), 3)
+        engine = sa.create_engine("sqlite://")
+        data.test_table.metadata.create_all(engine)
+        with engine.connect() as connection:
+            builder = ds.SqlQueryBuilder({"tt": data.test_table}, in_list=ds.InListOptions("chunked"))
+            rows = connection.execute(
+                builder.build(sa.select(data.test_table.c.id), {"id": {"in_": list(range(100000))}})
+            ).all()
+            self.assertEqual(rows, [])
+
+        # VALUES derived table above threshold
+        builder = ds.SqlQueryBuilder({"tt": data.test_table}, in_list=ds.InListOptions(values_threshold=2))
+        sql = str(compiled(builder.build(data.basic_enum_select, f_)))
+        self.assertIn("tt.age IN (SELECT in_values.value", sql)
+        self.assertIn("tt.id NOT IN (__[POSTCOMPILE", sql)
+
+        # plan cache binds normalized values into single plan for plannable strategies
+        cache = ds.PlanCache()
+        builder = ds.SqlQueryBuilder({"tt": data.test_table}, plan_cache=cache, in_list=ds.InListOptions("any"))
+        builder.build(data.basic_enum_select, f_)
+        sql = compiled(builder.build(data.basic_enum_select, {"age": {"in_": [9, 9, 8]}, "id": {"nin": [7]}}))
+        self.assertEqual(sql.params, {"siphon_0": [8, 9], "siphon_1": [7]})
+        self.assertEqual(cache.info().hits, 1)
+        # other strategies are built regularly
+        cache = ds.PlanCache()
+        builder = ds.SqlQueryBuilder({"tt": data.test_table}, plan_cache=cache, in_list=ds.InListOptions("chunked", 2))
+        for _ in range(2):
+            query = builder.build(data.basic_enum_select, f_)
+        self.assertEqual(str(compiled(query)).count("POSTCOMPILE"), 3)
+        self.assertEqual(cache.info().currsize, 1)
+
+    def test_keyset_pagination(self):
+        import src.datasiphon as ds
+        from src.datasiphon import _exc as core_exc
+
+        ngt = data.nullables_generic_types_table
+        engine = sa.create_engine("sqlite://")
+        ngt.metadata.create_all(engine)
+        # values with duplicates and nulls
+        int_values = [5, None, 3, 5, None, 1, 3, 2, None, 5, 4, 1]
+        with engine.begin() as connection:
+            connection.execute(sa.insert(ngt), [{"id": i + 1, "int_type": value} for i, value in enumerate(int_values)])
+        builder = ds.SqlQueryBuilder({"ngt": ngt})
+        query = sa.select(ngt.c.id, ngt.c.int_type)
+
+        def read_pages(order_by, nulls_last=None, page_size=5):
+            # read all pages using cursor of the last row of the page
+            rows, token = [], ""
+            with engine.connect() as connection:
+                while True:
+                    page_query, keywords = builder.build_page(
+                        query, {"order_by": order_by, "limit": page_size, "after": token}, nulls_last=nulls_last
+                    )
+                    page = connection.execute(page_query).all()
+                    rows.extend(page)
+                    if len(page) < page_size:
+                        return rows
+                    token = keywords.cursor(page[-1])
+
+        def read_all(order_by, nulls_last=None):
+            with engine.connect() as connection:
+                full_query, _ = builder.build_page(query, {"order_by": order_by, "after": ""}, nulls_last=nulls_last)
+                return connection.execute(full_query).all()
+
+        # pages follow single ordered query - primary key is used as tie-breaker
+        for order_by in ("+int_type", "-int_type", ["-int_type", "+id"], "-id"):
+            for nulls_last in (None, "always", "never", "asc", "desc"):
+                self.assertEqual(read_pages(order_by, nulls_last), read_all(order_by, nulls_last))
+                self.assertEqual(len(read_pages(order_by, nulls_last, page_size=1)), len(int_values))
+
+        # row value comparison for non-nullable columns with same direction
+        _, keywords = builder.build_page(query, {"order_by": "-id", "after": ""})
+        token = keywords.cursor({"id": 4})
+        page_query = builder.build(query, {"order_by": "-id", "after": token})
+        self.assertIn("(ngt.id) < (", str(page_query))
+        # tie-breaker is appended only if primary key is not ordered already
+        self.assertEqual(len(keywords.order_by), 1)
+
+        # keyset keyword is kept on reconstruction
+        expr, keywords = builder.create_filter({"after": token, "order_by": "-id"}, query.selected_columns)
+        self.assertEqual(keywords.after, [4])
+        self.assertEqual(ds.sql_filter.reconstruct_filtering(expr, keywords), {"order_by": "-id", "after": token})
+        # tie-breaker is applied to the query, but it is not part of reconstructed filtering
+        expr, keywords = builder.create_filter({"order_by": "-int_type", "after": ""}, query.selected_columns)
+        self.assertEqual([column.element.key for column in keywords.ordering], ["int_type", "id"])
+        self.assertEqual(ds.sql_filter.reconstruct_filtering(expr, keywords), {"order_by": "-int_type", "after": ""})
+        self.assertIn("ORDER BY ngt.int_type DESC NULLS FIRST, ngt.id ASC", str(keywords.apply(query, nulls=None)))
+
+        # cursor values of various types
+        import datetime, decimal, uuid
+
+        values = [datetime.datetime(2024, 1, 2, 3, 4), datetime.date(2024, 1, 2), decimal.Decimal("1.5"), uuid.uuid4()]
+        self.assertEqual(ds.sql_filter.core.decode_cursor(ds.sql_filter.core.encode_cursor(values)), values)
+
+        # invalid cursors
+        with self.assertRaises(core_exc.BadFormatError):
+            builder.build(query, {"after": "not a cursor"})
+        with self.assertRaises(core_exc.BadFormatError):
+            builder.build(query, {"order_by": "-int_type", "after": token})
+        with self.assertRaises(core_exc.InvalidValueTypeError):
+            builder.build(query, {"after": {"a": 1}})
+        # primary key is required for keyset pagination
+        with self.assertRaises(core_exc.ColumnError):
+            builder.build(sa.select(ngt.c.int_type), {"order_by": "-int_type", "after": ""})
+        # column named as keyset keyword takes precedence over the keyword
+        shadowed = sa.select(ngt.c.id, ngt.c.int_type.label("after"))
+        self.assertIn("WHERE ngt.int_type = ", str(builder.build(shadowed, {"after": {"eq": 1}})))
+        with self.assertRaises(core_exc.InvalidFilteringStructureError):
+            builder.build(shadowed, {"after": ""})
+        # other column names are not reserved
+        cursor_query = sa.select(ngt.c.id, ngt.c.int_type.label("cursor"))
+        self.assertIn("WHERE ngt.int_type = ", str(builder.build(cursor_query, {"cursor": {"eq": 1}})))
+
+    def test_count_modes(self):
+        import src.datasiphon as ds
+        import datetime
+
+        tt = data.test_table
+        engine = sa.create_engine("sqlite://")
+        tt.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                sa.insert(tt),
+                [
+                    {
+                        "id": i,
+                        "name": f"n{i % 3}",
+                        "age": i,
+                        "is_active": i % 2 == 0,
+                        "created_at": datetime.datetime.now(),
+                    }
+                    for i in range(1, 21)
+                ],
+            )
+        builder = ds.SqlQueryBuilder({"tt": tt})
+        f_ = {"age": {"gt": 5}, "order_by": "-age", "limit": 4, "offset": 2}
+
+        # count statement without ordering, pagination and subquery
+        count = builder.build_count(data.basic_enum_select, f_)
+        self.assertEqual(str(count), str(sa.select(sa.func.count()).select_from(tt).where(tt.c.age > 5)))
+        # subquery is kept where counting rows directly would change the result
+        grouped = sa.select(tt.c.name, sa.func.max(tt.c.age)).group_by(tt.c.name)
+        distinct = sa.select(tt.c.name).distinct()
+        aggregated = sa.select(sa.func.max(tt.c.age).label("max_age"))
+        scalar = sa.select(sa.func.coalesce(tt.c.name, "").label("name"), tt.c.age)
+        with engine.connect() as connection:
+            self.assertEqual(connection.scalar(count), 15)
+            for query, expected in ((grouped, 3), (distinct, 3), (aggregated, 1), (scalar, 15)):
+                count = builder.build_count(query, {"tt.age": {"gt": 5}, "limit": 1})
+                self.assertEqual(connection.scalar(count), expected)
+            self.assertNotIn("FROM (SELECT", str(builder.build_count(scalar, {"age": {"gt": 5}})))
+
+        # clauses changing number of rows are read from private attributes of `Select` - each of them must be found
+        # (fails if SQLAlchemy renames them)
+        plain = sa.select(tt.c.name)
+        self.assertEqual([bool(clause) for clause in ds.sql_filter._row_changing_clauses(plain)[:3]], [False] * 3)
+        self.assertEqual(ds.sql_filter._row_changing_clauses(plain)[3:], [None] * 3)
+        for query in (
+            plain.distinct(),
+            plain.group_by(tt.c.name),
+            plain.having(tt.c.age > 1),
+            plain.limit(1),
+            plain.offset(1),
+            plain.fetch(1),
+        ):
+            self.assertTrue(ds.sql_filter._requires_count_subquery(query))
+        self.assertFalse(ds.sql_filter._requires_count_subquery(plain))
+
+        # window column with total count
+        with engine.connect() as connection:
+            rows = connection.execute(builder.build(data.basic_enum_select, f_, count="window")).all()
+            self.assertEqual([row.age for row in rows], [18, 17, 16, 15])
+            self.assertEqual({row.total_count for row in rows}, {15})
+
+        # limit + 1 - next page is detected without counting
+        for b in (builder, ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache())):
+            with engine.connect() as connection:
+                for offset, has_next in ((0, True), (11, False), (10, False), (9, True)):
+                    f_ = {"age": {"gt": 5}, "order_by": "-age", "limit": 5, "offset": offset}
+                    _, keywords = b.build_page(data.basic_enum_select, f_, count="has_next")
+                    rows = connection.execute(b.build(data.basic_enum_select, f_, count="has_next")).all()
+                    page, next_page = keywords.split_page(rows)
+                    self.assertEqual(len(page), min(5, 15 - offset))
+                    self.assertEqual(next_page, has_next)
+                    self.assertEqual(page, connection.execute(b.build(data.basic_enum_select, f_)).all())
+
+    def test_simplify_expression(self):
+        import src.datasiphon as ds
+        import datetime
+        import random
+
+        tt = data.test_table
+        builder = ds.SqlQueryBuilder({"tt": tt})
+        simplifying_builder = ds.SqlQueryBuilder({"tt": tt}, simplify=True)
+        columns = data.basic_enum_select.selected_columns
+
+        def simplified(f_):
+            expr, _ = builder.create_filter(f_, columns)
+            expr = expr.simplify()
+            return expr.dump() if expr is not None and not expr.is_always_false else expr
+
+        # range operations are merged
+        self.assertEqual(
+            simplified({"age": {"gt": 5, "and": {"gt": 10, "le": 20}}}), {"and": {"age": {"gt": 10, "le": 20}}}
+        )
+        self.assertEqual(simplified({"age": {"ge": 5, "gt": 5}}), {"age": {"gt": 5}})
+        self.assertEqual(simplified({"age": {"ge": 5, "le": 5}}), {"age": {"eq": 5}})
+        # `in_` lists are intersected and restricted by ranges
+        self.assertEqual(
+            simplified({"age": {"in_": [1, 2, 3, 7], "and": {"in_": [2, 3, 4, 7], "lt": 7}}}), {"age": {"in_": [2, 3]}}
+        )
+        self.assertEqual(simplified({"age": {"in_": [1, 2], "eq": 2}}), {"age": {"eq": 2}})
+        # `eq` alternatives are folded into `in_`, nested junctions flattened
+        self.assertEqual(
+            simplified({"or": {"name": {"eq": "a"}, "or": {"name": {"in_": ["b", "a"]}, "age": {"eq": 1}}}}),
+            {"or": {"name": {"in_": ["a", "b"]}, "age": {"eq": 1}}},
+        )
+        # strings and mixed types are not compared
+        self.assertEqual(
+            simplified({"name": {"gt": "b", "and": {"gt": "a"}}}),
+            {"and": {"name": {"gt": "b"}, "and": {0: {"name": {"gt": "a"}}}}},
+        )
+        # naive and timezone aware datetimes are not compared
+        naive, aware = datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc)
+        self.assertEqual(
+            simplified({"created_at": {"gt": naive, "and": {"lt": aware}}}),
+            {"and": {"created_at": {"gt": naive, "lt": aware}}},
+        )
+        self.assertEqual(
+            simplified({"created_at": {"in_": [naive, aware], "and": {"gt": naive}}}),
+            {"and": {"created_at": {"in_": [naive, aware], "gt": naive}}},
+        )
+        # contradictions
+        for f_ in (
+            {"age": {"eq": 1, "and": {"eq": 2}}},
+            {"age": {"gt": 10, "lt": 5}},
+            {"age": {"ge": 5, "lt": 5}},
+            {"age": {"in_": [1, 2], "eq": 3}},
+            {"and": {"age": {"eq": 1}, "id": {"eq": 1}, "or": {"and": {"age": {"eq": 2}}}}},
+        ):
+            self.assertTrue(simplified(f_).is_always_false)
+            query = simplifying_builder.build(data.basic_enum_select, f_)
+            self.assertTrue(ds.is_always_false(query))
+            self.assertFalse(ds.is_always_false(builder.build(data.basic_enum_select, f_)))
+        # contradiction in `or` branch is dropped
+        self.assertEqual(
+            simplified({"or": {"and": {"age": {"gt": 3, "lt": 2}}, "name": {"eq": "a"}}}), {"name": {"eq": "a"}}
+        )
+        # empty junction is left out of the where clause (it is not a contradiction)
+        from src.datasiphon import sql_filter as sqlf
+
+        empty = sqlf.FilterExpression(None, None)
+        empty.junction = sqlf.Junction.OR
+        expr = sqlf.FilterExpression.joined_expressions(
+            sqlf.Junction.AND, sqlf.FilterExpression(tt.c.age, sqlf.SQLGt(1)), empty
+        )
+        self.assertEqual(str(expr.produce_whereclause()), str(sa.and_(tt.c.age > 1)))
+        self.assertFalse(empty.is_always_false)
+        self.assertEqual(expr.simplify().dump(), {"age": {"gt": 1}})
+        self.assertEqual(str(empty.apply(data.basic_enum_select)), str(data.basic_enum_select))
+
+        # simplified filter selects the same rows
+        engine = sa.create_engine("sqlite://")
+        tt.metadata.create_all(engine)
+        rng = random.Random(11)
+        with engine.begin() as connection:
+            connection.execute(
+                sa.insert(tt),
+                [
+                    {
+                        "id": i,
+                        "name": rng.choice("abc"),
+                        "age": rng.randint(0, 10),
+                        "is_active": i % 2 == 0,
+                        "created_at": datetime.datetime(2024, 1, 1),
+                    }
+                    for i in range(1, 101)
+                ],
+            )
+        operations = {"age": ["eq", "gt", "ge", "lt", "le", "in_"], "name": ["eq", "in_"], "id": ["ne", "gt"]}
+
+        def random_value(column, op):
+            if column == "name":
+                return rng.sample("abc", 2) if op == "in_" else rng.choice("abc")
+            return rng.sample(range(11), rng.randint(0, 4)) if op == "in_" else rng.randint(0, 10)
+
+        def random_filter(depth):
+            # columns nested in junction are joined by the junction, as well as their operations
+            nested = {}
+            for column in rng.sample(sorted(operations), rng.randint(1, 3)):
+                ops = rng.sample(operations[column], rng.randint(1, 2))
+                nested[column] = {op: random_value(column, op) for op in ops}
+            if depth > 0:
+                for junction in rng.sample(["and", "or"], rng.randint(0, 2)):
+                    nested[junction] = random_filter(depth - 1)
+            return nested
+
+        with engine.connect() as connection:
+            for _ in range(200):
+                f_ = {rng.choice(["and", "or"]): random_filter(3)}
+                expected = connection.execute(builder.build(data.basic_enum_select, f_)).all()
+                query = simplifying_builder.build(data.basic_enum_select, f_)
+                self.assertEqual(connection.execute(query).all() if not ds.is_always_false(query) else [], expected)
+
+    def test_compact_expression(self):
+        import src.datasiphon as ds
+        from src.datasiphon import sql_filter as sqlf
+
+        builder = ds.SqlQueryBuilder({"tt": data.test_table})
+        expr, keywords = builder.create_filter(
+            {"name": {"eq": "John"}, "age": {"in_": [1, 2]}, "limit": 5}, data.basic_enum_select.selected_columns
+        )
+        # no instance dictionaries
+        for obj in (expr, *expr.nested_expressions, keywords, *(e.operator for e in expr.nested_expressions)):
+            self.assertFalse(hasattr(obj, "__dict__"))
+
+        # wrapping into junction moves the node - nothing is copied
+        name_expr = expr.find_expression("and.name")
+        name_column, name_operator = name_expr.column, name_expr.operator
+        tenant = sqlf.FilterExpression(data.test_table.c.id, sqlf.SQLEq(1))
+        expr.add_expression("and.name", tenant, sqlf.Junction.OR)
+        self.assertTrue(name_expr.is_junction)
+        moved = name_expr.nested_expressions[0]
+        self.assertIs(moved.column, name_column)
+        self.assertIs(moved.operator, name_operator)
+        self.assertIs(name_expr.nested_expressions[1], tenant)
+        tt = data.test_table
+        self.assertEqual(
+            str(expr.produce_whereclause()),
+            str(sa.and_(sa.or_(tt.c.name == "John", tt.c.id == 1), tt.c.age.in_([1, 2]))),
+        )
+        # wrapping the root keeps nested expressions in place
+        nested = list(expr.nested_expressions)
+        expr.add_expression([], tenant, sqlf.Junction.OR)
+        self.assertEqual(expr.nested_expressions[0].nested_expressions, nested)
+
+    def test_frozen_expression(self):
+        import src.datasiphon as ds
+        from src.datasiphon import sql_filter as sqlf
+        from src.datasiphon import _exc as core_exc
+
+        tt = data.test_table
+        builder = ds.SqlQueryBuilder({"tt": tt})
+        columns = data.basic_enum_select.selected_columns
+        base, _ = builder.create_filter(
+            {"or": {"name": {"eq": "John"}, "age": {"gt": 5}}, "id": {"in_": [1, 2, 3]}}, columns
+        )
+        frozen = base.freeze()
+        self.assertIsInstance(frozen, sqlf.FrozenExpression)
+        self.assertIsInstance(frozen.nested_expressions, tuple)
+        self.assertEqual(str(frozen.produce_whereclause()), str(base.produce_whereclause()))
+        # immutable
+        with self.assertRaises(AttributeError):
+            frozen.junction = sqlf.Junction.OR
+        with self.assertRaises(core_exc.CannotAdjustExpression):
+            frozen.replace(base)
+        # equal simple expressions are interned, trees are compared structurally
+        self.assertIs(base.freeze().find_expression("and.or.name"), frozen.find_expression("and.or.name"))
+        self.assertEqual(base.freeze(), frozen)
+        self.assertEqual(hash(base.freeze()), hash(frozen))
+        repeated = sqlf.FilterExpression.joined_expressions(
+            sqlf.Junction.OR, *(sqlf.FilterExpression(tt.c.age, sqlf.SQLEq(1)) for _ in range(100))
+        ).freeze()
+        self.assertEqual(len({id(leaf) for leaf in repeated.leaves()}), 1)
+        # equal values of different types are not interned together
+        one = sqlf.FilterExpression(tt.c.age, sqlf.SQLEq(1)).freeze()
+        true = sqlf.FilterExpression(tt.c.age, sqlf.SQLEq(True)).freeze()
+        self.assertIs(true.operator.assigned_value, True)
+        self.assertNotEqual(true, one)
+        self.assertNotEqual(
+            sqlf.FilterExpression(tt.c.id, sqlf.SQLIn([True])).freeze(),
+            sqlf.FilterExpression(tt.c.id, sqlf.SQLIn([1])).freeze(),
+        )
+        self.assertEqual(str(true.produce_whereclause()), str(tt.c.age == True))
+        # mutation of the original expression does not leak into frozen one
+        base.find_expression("and.id").operator.assigned_value.append(4)
+        self.assertEqual(frozen.find_expression("and.id").operator.assigned_value, [1, 2, 3])
+
+        # adjustments return new root and share untouched subtrees
+        tenant = sqlf.FilterExpression(tt.c.id, sqlf.SQLEq(1))
+        added = frozen.add_expression("and.or.name", tenant, sqlf.Junction.OR)
+        self.assertIsNot(added, frozen)
+        self.assertIs(added.nested_expressions[1], frozen.nested_expressions[1])
+        self.assertIs(added.find_expression("and.or.age"), frozen.find_expression("and.or.age"))
+        self.assertEqual(
+            str(added.produce_whereclause()),
+            str(sa.and_(sa.or_(tt.c.name == "John", tt.c.id == 1, tt.c.age > 5), tt.c.id.in_([1, 2, 3]))),
+        )
+        replaced = frozen.replace_expression("and.id", tenant)
+        self.assertIs(replaced.nested_expressions[0], frozen.nested_expressions[0])
+        self.assertEqual(
+            str(replaced.produce_whereclause()), str(sa.and_(sa.or_(tt.c.name == "John", tt.c.age > 5), tt.c.id == 1))
+        )
+        removed = frozen.remove_expression("and.or.age")
+        self.assertIs(removed.nested_expressions[1], frozen.nested_expressions[1])
+        self.assertEqual(
+            str(removed.produce_whereclause()), str(sa.and_(sa.or_(tt.c.name == "John"), tt.c.id.in_([1, 2, 3])))
+        )
+        with self.assertRaises(core_exc.CannotAdjustExpression):
+            frozen.remove_expression("and")
+        with self.assertRaises(core_exc.CannotAdjustExpression):
+            frozen.add_expression("and.surname", tenant)
+        # original is unchanged and same as its mutable counterpart adjusted in place
+        self.assertEqual(base.freeze(), frozen.replace_expression("and.id", base.find_expression("and.id")))
+        self.assertEqual(str(frozen.produce_whereclause()), str(frozen.thaw().produce_whereclause()))
+        mutable = frozen.thaw()
+        mutable.add_expression("and.or.name", tenant, sqlf.Junction.OR)
+        self.assertEqual(mutable.freeze(), added)
+        # removing all nested expressions leaves empty junction, that is dropped by normalization
+        emptied = removed.remove_expression("and.or.name")
+        self.assertEqual(len(emptied.normalize().nested_expressions), 1)
+        # empty junction is left out of the where clause
+        self.assertEqual(str(emptied.produce_whereclause()), str(tt.c.id.in_([1, 2, 3])))
+        self.assertIs(frozen.normalize(), frozen)
+
+    def test_expression_paths(self):
+        import src.datasiphon as ds
+        from src.datasiphon import sql_filter as sqlf
+        from src.datasiphon import _exc as core_exc
+
+        tt = data.test_table
+        builder = ds.SqlQueryBuilder({"tt": tt})
+        columns = data.basic_enum_select.selected_columns
+        filter_ = {
+            "or": {"name": {"eq": "John"}, "age": {"gt": 5}, "and": {"name": {"eq": "Jane"}, "age": {"lt": 3}}},
+            "id": {"in_": [1, 2, 3]},
+            "name": {"ne": "Bob"},
+        }
+
+        def create():
+            return builder.create_filter(filter_, columns)[0]
+
+        # paths are compiled once
+        self.assertIs(sqlf.ExpressionPath.compile("and.or.name"), sqlf.ExpressionPath.compile(["and", "or", "name"]))
+        compiled = sqlf.ExpressionPath.compile("and.or.and.name:eq-Jane")
+        self.assertEqual(str(compiled), "and.or.and.name:eq-Jane")
+        # index finds the same expressions as search
+        expr = create()
+        index = expr.index()
+        for path in (
+            "",
+            "and",
+            "and.or",
+            "and.or.and",
+            "and.or.name",
+            "and.or.age:gt",
+            "and.or.and.name",
+            "and.or.and.name:eq-Jane",
+            "and.or.name:eq-Jane",
+            "and.name:ne",
+            "and.id:in_",
+            "and.name:ne-Alice",
+            "or",
+            "and.and",
+            "and.surname",
+            "and.id.in_",
+        ):
+            self.assertIs(index.find(path), expr.find_expression(path), path)
+        self.assertIs(expr.find_expression(compiled), expr.find_expression("and.or.and.name"))
+        self.assertIs(index.find([]), expr)
+
+        # batch of adjustments is equal to sequential adjustments
+        tenant = sqlf.FilterExpression(tt.c.id, sqlf.SQLEq(1))
+        transformer = (
+            ds.ExpressionTransformer()
+            .add("and.or.name", tenant, sqlf.Junction.OR)
+            .replace("and.name:ne", sqlf.FilterExpression(tt.c.name, sqlf.SQLNe("Alice")))
+            .remove("and.or.age")
+            .remove("and.or.and")
+            .add("and", tenant)
+        )
+        expected = create()
+        expected.add_expression("and.or.name", tenant, sqlf.Junction.OR)
+        expected.replace_expression("and.name:ne", sqlf.FilterExpression(tt.c.name, sqlf.SQLNe("Alice")))
+        expected.remove_expression("and.or.age")
+        expected.remove_expression("and.or.and")
+        expected.add_expression("and", tenant)
+        transformed = create()
+        self.assertIs(transformer.apply(transformed), transformed)
+        self.assertEqual(str(transformed.produce_whereclause()), str(expected.produce_whereclause()))
+        # frozen expression is transformed in one pass as well, untouched subtrees are shared
+        frozen = create().freeze()
+        transformed_frozen = transformer.apply(frozen)
+        self.assertEqual(transformed_frozen, transformed.freeze())
+        self.assertIs(transformed_frozen.nested_expressions[1], frozen.nested_expressions[1])
+        self.assertEqual(frozen, create().freeze())
+        # invalid path - nothing is changed
+        for invalid in (
+            ds.ExpressionTransformer().remove("and.id").remove("and.surname"),
+            ds.ExpressionTransformer().remove("and"),
+        ):
+            expr = create()
+            with self.assertRaises(core_exc.CannotAdjustExpression):
+                invalid.apply(expr)
+            self.assertEqual(str(expr.produce_whereclause()), str(create().produce_whereclause()))
+            with self.assertRaises(core_exc.CannotAdjustExpression):
+                invalid.apply(frozen)
+        # removal uses actual parent of the found expression
+        expr = create()
+        expr.remove_expression("and.or.and.age")
+        self.assertIsNone(expr.find_expression("and.or.and.age"))
+        self.assertIsNotNone(expr.find_expression("and.or.age"))
+
+    def test_filter_fingerprint(self):
+        import src.datasiphon as ds
+        import decimal
+
+        tt = data.test_table
+        query = data.basic_enum_select
+        builder = ds.SqlQueryBuilder({"tt": tt})
+        single_pass_builder = ds.SqlQueryBuilder({"tt": tt}, single_pass=True)
+
+        def fingerprint(f_, builder_=builder):
+            return builder_.build_with_fingerprint(query, f_)[1]
+
+        base = fingerprint(
+            {
+                "name": {"eq": "John"},
+                "or": {"age": {"in_": [1, 2, 3]}, "id": {"gt": 5}},
+                "limit": 10,
+                "order_by": ["+name", "-age"],
+            }
+        )
+        self.assertIsInstance(base, ds.FilterFingerprint)
+        # order of keys, junction children and `in_` values does not matter, numbers are compared by value
+        for equivalent in (
+            {
+                "order_by": ["+name", "-age"],
+                "limit": 10,
+                "or": {"id": {"gt": 5}, "age": {"in_": [3, 1, 2]}},
+                "name": {"eq": "John"},
+            },
+            {
+                "name": {"eq": "John"},
+                "or": {"id": {"gt": decimal.Decimal("5.0")}, "age": {"in_": [2, 3, 1, 1]}},
+                "limit": 10,
+                "order_by": ["+name", "-age"],
+            },
+        ):
+            self.assertEqual(fingerprint(equivalent), base)
+            self.assertEqual(fingerprint(equivalent, single_pass_builder), base)
+        # same fingerprint computed from built expression, `QsRoot` or expression
+        expr, keywords, built = builder.create_fingerprinted_filter(
+            {
+                "or": {"id": {"gt": 5}, "age": {"in_": [3, 1, 2]}},
+                "name": {"eq": "John"},
+                "limit": 10,
+                "order_by": ["+name", "-age"],
+            },
+            query.selected_columns,
+        )
+        self.assertEqual(built, base)
+        self.assertEqual(expr.fingerprint(keywords), base)
+        self.assertEqual(expr.freeze().fingerprint(keywords), base)
+        qs_filter = builder.load_filtering({"name": {"eq": "John"}, "age": {"gt": 5}, "order_by": "+name"})
+        self.assertEqual(
+            fingerprint(qs_filter), fingerprint({"age": {"gt": 5}, "order_by": "asc(name)", "name": {"eq": "John"}})
+        )
+
+        # values change the value fingerprint only
+        different_values = fingerprint(
+            {
+                "name": {"eq": "Jane"},
+                "or": {"age": {"in_": [4]}, "id": {"gt": 7}},
+                "limit": 20,
+                "order_by": ["+name", "-age"],
+            }
+        )
+        self.assertNotEqual(different_values.value, base.value)
+        self.assertEqual(different_values.shape, base.shape)
+        # structure, operators, ordering and None values change both
+        for different in (
+            {
+                "name": {"eq": "John"},
+                "and": {"age": {"in_": [1, 2, 3]}, "id": {"gt": 5}},
+                "limit": 10,
+                "order_by": ["+name", "-age"],
+            },
+            {
+                "name": {"eq": "John"},
+                "or": {"age": {"nin": [1, 2, 3]}, "id": {"gt": 5}},
+                "limit": 10,
+                "order_by": ["+name", "-age"],
+            },
+            {
+                "name": {"eq": "John"},
+                "or": {"age": {"in_": [1, 2, 3]}, "id": {"gt": 5}},
+                "limit": 10,
+                "order_by": ["-age", "+name"],
+            },
+            {
+                "name": {"eq": None},
+                "or": {"age": {"in_": [1, 2, 3]}, "id": {"gt": 5}},
+                "limit": 10,
+                "order_by": ["+name", "-age"],
+            },
+            {"name": {"eq": "John"}, "or": {"age": {"in_": [1, 2, 3]}, "id": {"gt": 5}}, "order_by": ["+name", "-age"]},
+        ):
+            self.assertNotEqual(fingerprint(different).shape, base.shape)
+            self.assertNotEqual(fingerprint(different).value, base.value)
+
+    def test_serialize_filter(self):
+        import src.datasiphon as ds
+        from src.datasiphon import sql_filter as sqlf
+        import datetime
+        import random
+        import qstion
+
+        tt = data.test_table
+        query = data.basic_enum_select
+        builder = ds.SqlQueryBuilder({"tt": tt})
+        # repeated operations of the same column are kept
+        expr = sqlf.FilterExpression.joined_expressions(
+            sqlf.Junction.OR,
+            *(sqlf.FilterExpression(tt.c.name, sqlf.SQLEq(name)) for name in ("a", "b", "c")),
+            sqlf.FilterExpression(tt.c.age, sqlf.SQLIn([1, 2])),
+        )
+        keywords = sqlf.SqlKeywordFilter()
+        keywords.add_limit(10)
+        keywords.add_offset(20)
+        reconstructed = sqlf.reconstruct_filtering(expr, keywords)
+        self.assertEqual(
+            reconstructed,
+            {
+                "or": {
+                    "name": {"eq": "a"},
+                    "age": {"in_": [1, 2]},
+                    "and": [{"name": {"eq": "b"}}, {"name": {"eq": "c"}}],
+                },
+                "limit": 10,
+                "offset": 20,
+            },
+        )
+        self.assertEqual(reconstructed, sqlf.reconstruct_filtering(expr, keywords, as_obj=True).to_dict())
+        self.assertEqual(expr.dump()["or"]["and"], {0: {"name": {"eq": "b"}}, 1: {"name": {"eq": "c"}}})
+        # dump is independent of the expression
+        reconstructed["or"]["age"]["in_"].append(3)
+        self.assertEqual(expr.find_expression("or.age").operator.assigned_value, [1, 2])
+        # query string
+        query_string = sqlf.reconstruct_query_string(expr, keywords)
+        self.assertEqual(query_string, qstion.stringify(sqlf.reconstruct_filtering(expr, keywords)))
+        self.assertTrue(query_string.endswith("&limit=10&offset=20"))
+        keywords.add_order_by(tt.c.name.desc())
+        self.assertEqual(sqlf.reconstruct_query_string(None, keywords), "limit=10&offset=20&order_by=-name")
+        self.assertEqual(
+            sqlf.reconstruct_query_string(
+                sqlf.FilterExpression(tt.c.name, sqlf.SQLEq("a b&c")), sqlf.SqlKeywordFilter()
+            ),
+            "name%5Beq%5D=a%20b%26c",
+        )
+
+        # reconstructed filter selects the same rows
+        engine = sa.create_engine("sqlite://")
+        tt.metadata.create_all(engine)
+        rng = random.Random(7)
+        with engine.begin() as connection:
+            connection.execute(
+                sa.insert(tt),
+                [
+                    {
+                        "id": i,
+                        "name": rng.choice("abc"),
+                        "age": rng.randint(0, 10),
+                        "is_active": i % 2 == 0,
+                        "created_at": datetime.datetime(2024, 1, 1),
+                    }
+                    for i in range(1, 101)
+                ],
+            )
+        leaves = [
+            lambda: sqlf.FilterExpression(
+                tt.c.age, rng.choice([sqlf.SQLEq, sqlf.SQLGt, sqlf.SQLLt])(rng.randint(0, 10))
+            ),
+            lambda: sqlf.FilterExpression(tt.c.name, rng.choice([sqlf.SQLEq, sqlf.SQLNe])(rng.choice("abc"))),
+            lambda: sqlf.FilterExpression(tt.c.id, sqlf.SQLIn(rng.sample(range(100), 30))),
+        ]
+
+        def random_expression(depth):
+            if depth == 0 or rng.random() < 0.3:
+                return rng.choice(leaves)()
+            nested = [random_expression(depth - 1) for _ in range(rng.randint(2, 4))]
+            return sqlf.FilterExpression.joined_expressions(rng.choice(list(sqlf.Junction)), *nested)
+
+        with engine.connect() as connection:
+            for _ in range(200):
+                expr = random_expression(3)
+                expected = connection.execute(expr.apply(query)).all()
+                for filter_ in (sqlf.reconstruct_filtering(expr, sqlf.SqlKeywordFilter()), expr.dump()):
+                    self.assertEqual(connection.execute(builder.build(query, filter_)).all(), expected)
+
+    def test_deterministic_compilation(self):
+        import src.datasiphon as ds
+        import datetime
+        import itertools
+        import random
+        from sqlalchemy.dialects import postgresql
+
+        tt = data.test_table
+        query = sa.select(tt.c.id, tt.c.name, tt.c.age)
+        builders = {
+            "uncached": ds.SqlQueryBuilder({"tt": tt}, deterministic=True),
+            "cached": ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache(), deterministic=True),
+        }
+        regular = ds.SqlQueryBuilder({"tt": tt})
+        rng = random.Random(5)
+
+        def random_filter():
+            # same shape, different order of keys and values
+            items = [
+                ("name", {"eq": rng.choice("abc")}),
+                ("age", {"in_": rng.sample(range(11), rng.randint(1, 6)), "lt": rng.randint(0, 10)}),
+                ("or", dict(rng.sample([("id", {"gt": rng.randint(0, 50)}), ("age", {"eq": rng.randint(0, 10)})], 2))),
+                ("limit", rng.randint(1, 10)),
+            ]
+            rng.shuffle(items)
+            return dict(items)
+
+        def statement(query_):
+            return str(query_.compile(dialect=postgresql.dialect()))
+
+        filters = [random_filter() for _ in range(50)]
+        self.assertGreater(len({statement(regular.build(query, f_)) for f_ in filters}), 1)
+        for builder in builders.values():
+            statements = {statement(builder.build(query, f_)) for f_ in filters}
+            self.assertEqual(len(statements), 1)
+        # plans bind keywords with own parameters, filtering part is the same
+        self.assertEqual(
+            statement(builders["uncached"].build(query, filters[0]).limit(None)),
+            statement(builders["cached"].build(query, filters[1]).limit(None)),
+        )
+        self.assertIn("IN (__[POSTCOMPILE_siphon_", statement(builders["uncached"].build(query, filters[0])))
+        # operations of the same column in different order
+        statements = {
+            statement(builders["uncached"].build(query, {"age": dict(ops)}))
+            for ops in itertools.permutations([("gt", 1), ("lt", 9), ("ne", 5)])
+        }
+        self.assertEqual(len(statements), 1)
+        # lists are bound even with strategy rendering them into statement, `ANY` parameter is kept
+        chunked = ds.SqlQueryBuilder(
+            {"tt": tt}, deterministic=True, in_list=ds.InListOptions(ds.InListStrategy.CHUNKED, chunk_size=2)
+        )
+        self.assertEqual(
+            statement(chunked.build(query, {"age": {"in_": [1, 2, 3]}})),
+            statement(chunked.build(query, {"age": {"in_": [4, 5, 6, 7, 8]}})),
+        )
+        any_builder = ds.SqlQueryBuilder(
+            {"tt": tt}, deterministic=True, in_list=ds.InListOptions(ds.InListStrategy.ANY)
+        )
+        any_statement = any_builder.build(query, {"age": {"in_": [1, 2, 3]}}).compile(dialect=postgresql.dialect())
+        self.assertIn("= ANY (%(siphon_0)s::INTEGER[])", str(any_statement))
+        self.assertEqual(any_statement.params["siphon_0"], [1, 2, 3])
+
+        # same rows are selected
+        engine = sa.create_engine("sqlite://")
+        tt.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                sa.insert(tt),
+                [
+                    {
+                        "id": i,
+                        "name": rng.choice("abc"),
+                        "age": rng.randint(0, 10),
+                        "is_active": True,
+                        "created_at": datetime.datetime(2024, 1, 1),
+                    }
+                    for i in range(1, 101)
+                ],
+            )
+        with engine.connect() as connection:
+            for f_ in filters:
+                f_.pop("limit")
+                expected = connection.execute(regular.build(query, f_)).all()
+                for builder in builders.values():
+                    self.assertEqual(connection.execute(builder.build(query, f_)).all(), expected)
+
+        # values are processed by column type as without deterministic mode
+        class Upper(sa.TypeDecorator):
+            impl = sa.String
+            cache_ok = True
+
+            def process_bind_param(self, value, dialect):
+                return value.upper() if value is not None else value
+
+        codes = sa.Table(
+            "codes", sa.MetaData(), sa.Column("id", sa.Integer, primary_key=True), sa.Column("code", Upper)
+        )
+        codes.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(sa.insert(codes), [{"id": 1, "code": "ab"}, {"id": 2, "code": "cd"}])
+        query = sa.select(codes)
+        regular = ds.SqlQueryBuilder({"codes": codes})
+        with engine.connect() as connection:
+            for f_ in ({"code": {"eq": "ab"}}, {"code": {"in_": ["cd", "ef"]}}, {"code": {"gt": "ab"}}):
+                expected = connection.execute(regular.build(query, f_)).all()
+                self.assertTrue(expected)
+                for builder in (
+                    ds.SqlQueryBuilder({"codes": codes}, deterministic=True),
+                    ds.SqlQueryBuilder({"codes": codes}, plan_cache=ds.PlanCache(), deterministic=True),
+                ):
+                    self.assertEqual(connection.execute(builder.build(query, f_)).all(), expected)
+
+    def test_build_sql(self):
+        import src.datasiphon as ds
+        import datetime
+        import random
+        from sqlalchemy.dialects import postgresql
+
+        tt = data.test_table
+        query = sa.select(tt.c.id, tt.c.name, tt.c.age, tt.c.created_at)
+        engine = sa.create_engine("sqlite://")
+        tt.metadata.create_all(engine)
+        rng = random.Random(11)
+        with engine.begin() as connection:
+            connection.execute(
+                sa.insert(tt),
+                [
+                    {
+                        "id": i,
+                        "name": rng.choice("abc"),
+                        "age": rng.randint(0, 10),
+                        "is_active": i % 2 == 0,
+                        "created_at": datetime.datetime(2024, 1, 1) + datetime.timedelta(days=i),
+                    }
+                    for i in range(1, 101)
+                ],
+            )
+
+        def random_filter():
+            return {
+                "name": {"eq": rng.choice("abc")},
+                "age": {"in_": rng.sample(range(11), rng.randint(1, 6))},
+                "or": {
+                    "created_at": {"gt": datetime.datetime(2024, 1, 1) + datetime.timedelta(days=rng.randint(0, 100))},
+                    "id": {"lt": rng.randint(0, 100)},
+                },
+                "order_by": "-id",
+                "limit": rng.randint(1, 10),
+                "offset": rng.randint(0, 5),
+            }
+
+        cache = ds.PlanCache()
+        builders = [ds.SqlQueryBuilder({"tt": tt}), ds.SqlQueryBuilder({"tt": tt}, plan_cache=cache)]
+        regular = ds.SqlQueryBuilder({"tt": tt})
+        raw = engine.raw_connection()
+        try:
+            with engine.connect() as connection:
+                for _ in range(30):
+                    filter_ = random_filter()
+                    expected = connection.execute(regular.build(query, filter_)).all()
+                    for builder in builders:
+                        sql, params = builder.build_sql(query, filter_, dialect=engine.dialect)
+                        self.assertIsInstance(params, tuple)
+                        cursor = raw.cursor()
+                        cursor.execute(sql, params)
+                        # result values are not processed by DBAPI - compare selected rows
+                        self.assertEqual([row[0] for row in cursor.fetchall()], [row[0] for row in expected])
+        finally:
+            raw.close()
+        # single shape - single plan compiled once for the dialect
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.info().hits, 29)
+        ((_, plan),) = cache.items()
+        self.assertEqual(list(plan._compiled), [engine.dialect])
+
+        # named paramstyle, expanding list rendered for its values
+        dialect = postgresql.psycopg2.dialect()
+        for builder in builders:
+            compiled = builder.build_sql(query, {"age": {"in_": [3, 1, 2]}, "name": {"ne": "x"}}, dialect=dialect)
+            self.assertIsInstance(compiled, ds.CompiledQuery)
+            self.assertIn("IN (%(", compiled.sql)
+            self.assertEqual(sorted(value for value in compiled.params.values() if value != "x"), [1, 2, 3])
+        # bind processors of parameter types are applied - parameters with escaped names included
+        from sqlalchemy.dialects import sqlite
+
+        statement = sa.select(tt.c.id).where(
+            tt.c.created_at > sa.bindparam("created at", datetime.datetime(2024, 1, 2), type_=sa.DateTime),
+            tt.c.created_at.in_([datetime.datetime(2024, 1, 3)]),
+        )
+        compiled = ds.sql_filter.compiled_query(statement.compile(dialect=sqlite.dialect()))
+        self.assertEqual(compiled.params, ("2024-01-02 00:00:00.000000", "2024-01-03 00:00:00.000000"))
+        compiled = ds.sql_filter.compiled_query(statement.compile(dialect=dialect))
+        self.assertEqual(
+            compiled.params,
+            {"created_at": datetime.datetime(2024, 1, 2), "created_at_1_1": datetime.datetime(2024, 1, 3)},
+        )
+        # restrictions are checked on cached plan as well
+        restriction = ds.RestrictionPolicy.from_dict({"name": {"ne": "x"}})
+        builders[1].build_sql(query, {"age": {"in_": [1]}, "name": {"ne": "y"}}, restriction, dialect=dialect)
+        with self.assertRaises(ds._exc.FiltrationNotAllowed):
+            builders[1].build_sql(query, {"age": {"in_": [1]}, "name": {"ne": "x"}}, restriction, dialect=dialect)
+
+    def test_lazy_whereclause(self):
+        import src.datasiphon as ds
+        from src.datasiphon import sql_filter as sqlf
+        from unittest import mock
+
+        tt = data.test_table
+        query = sa.select(tt)
+        builder = ds.SqlQueryBuilder({"tt": tt})
+        filter_ = {"name": {"eq": "a"}, "or": {"age": {"gt": 5}, "id": {"lt": 10}}, "is_active": {"eq": True}}
+        evaluated = []
+
+        def counting(method):
+            def evaluate(operator, *args):
+                evaluated.append(operator)
+                return method(operator, *args)
+
+            return evaluate
+
+        patches = [
+            mock.patch.object(operator_type, "evaluate", counting(operator_type.evaluate))
+            for operator_type in (sqlf.SQLEq, sqlf.SQLGt, sqlf.SQLLt)
+        ]
+        for patch in patches:
+            patch.start()
+        try:
+            expr, _ = builder.create_filter(filter_, query.selected_columns)
+            # inspection and adjustment do not build any clause
+            self.assertIsNotNone(expr.find_expression("and.or.age"))
+            expr.add_expression("and.or", ds.sql_filter.FilterExpression(tt.c.age, sqlf.SQLEq(1)), sqlf.Junction.OR)
+            expr.dump()
+            self.assertEqual(evaluated, [])
+            first = expr.produce_whereclause()
+            self.assertEqual(len(evaluated), 5)
+            # memoized until the expression changes
+            self.assertIs(expr.produce_whereclause(), first)
+            self.assertEqual(str(expr.apply(query)), str(query.where(first)))
+            self.assertEqual(len(evaluated), 5)
+            name_clause = expr.find_expression("and.name").produce_whereclause()
+            # only changed expression (and junctions above it) is rebuilt
+            expr.replace_expression("and.or.age:gt", ds.sql_filter.FilterExpression(tt.c.age, sqlf.SQLGt(7)))
+            second = expr.produce_whereclause()
+            self.assertEqual(len(evaluated), 6)
+            self.assertIsNot(second, first)
+            self.assertIs(second.clauses[0], name_clause)
+            self.assertIn("tt.age > :age_1", str(second))
+            # replaced operation is detected as well
+            leaf = expr.find_expression("and.name")
+            leaf.operator = sqlf.SQLEq("b")
+            third = expr.produce_whereclause()
+            self.assertEqual(len(evaluated), 7)
+            self.assertIs(third.clauses[1].element, second.clauses[1].element)
+            self.assertEqual(third.clauses[0].right.value, "b")
+            expr.remove_expression("and.is_active")
+            self.assertEqual(len(expr.produce_whereclause().clauses), 2)
+            self.assertEqual(len(evaluated), 7)
+            # copies do not carry memoized clauses
+            self.assertIsNone(deepcopy(expr)._clause)
+            self.assertEqual(str(deepcopy(expr).produce_whereclause()), str(expr.produce_whereclause()))
+            # frozen expressions memoize their clauses as well
+            frozen = expr.freeze()
+            self.assertIs(frozen.produce_whereclause(), frozen.produce_whereclause())
+        finally:
+            for patch in patches:
+                patch.stop()
+
+    def test_concurrent_builds(self):
+        import src.datasiphon as ds
+        import random
+        import sys
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        tt = data.test_table
+        query = sa.select(tt.c.id, tt.c.name, tt.c.age, tt.c.is_active)
+        rng = random.Random(3)
+        shapes = [
+            lambda: {"name": {"eq": rng.choice("abc")}, "limit": rng.randint(1, 10)},
+            lambda: {
+                "age": {"in_": rng.sample(range(20), 3)},
+                "or": {"id": {"gt": rng.randint(0, 9)}, "name": {"ne": "x"}},
+            },
+            lambda: {"and": [{"age": {"lt": rng.randint(0, 9)}}, {"is_active": {"eq": True}}], "order_by": "-age"},
+            lambda: {
+                "or": {"name": {"in_": ["a", "b"]}, "age": {"ge": rng.randint(0, 9)}},
+                "offset": rng.randint(0, 9),
+            },
+        ]
+        filters = [rng.choice(shapes)() for _ in range(80)]
+        builders = {
+            "plain": ds.SqlQueryBuilder({"tt": tt}),
+            "single_pass": ds.SqlQueryBuilder({"tt": tt}, single_pass=True),
+            # small cache - plans are evicted and recreated concurrently
+            "cached": ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache(maxsize=2)),
+            "deterministic": ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache(), deterministic=True),
+        }
+
+        def render(query_):
+            compiled = query_.compile()
+            return str(compiled), compiled.params
+
+        expected = {name: [render(builder.build(query, f_)) for f_ in filters] for name, builder in builders.items()}
+        for builder in builders.values():
+            if builder.plan_cache is not None:
+                builder.plan_cache.clear()
+
+        def run(threads: int) -> float:
+            barrier = threading.Barrier(threads)
+
+            def worker(offset: int) -> list:
+                barrier.wait()
+                results = []
+                for i in range(len(filters)):
+                    index = (i + offset) % len(filters)
+                    for name, builder in builders.items():
+                        results.append((name, index, builder.build(query, filters[index])))
+                return results
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(threads) as executor:
+                results = list(executor.map(worker, range(0, threads * 7, 7)))
+            elapsed = time.perf_counter() - started
+            for thread_results in results:
+                for name, index, built in thread_results:
+                    self.assertEqual(render(built), expected[name][index])
+            return threads * len(filters) * len(builders) / elapsed
+
+        import os
+
+        switch_interval = sys.getswitchinterval()
+        # frequent switching of threads - more interleaving on builds with GIL
+        sys.setswitchinterval(1e-6)
+        try:
+            throughput = {threads: run(threads) for threads in (1, 2, 4)}
+        finally:
+            sys.setswitchinterval(switch_interval)
+        for builder in builders.values():
+            if builder.plan_cache is not None:
+                info = builder.plan_cache.info()
+                # every lookup is counted - no update of counters is lost
+                self.assertEqual(info.hits + info.misses, len(filters) * (1 + 2 + 4))
+                self.assertLessEqual(info.currsize, info.maxsize)
+        self.assertGreater(builders["cached"].plan_cache.info().evictions, 0)
+        # wall-clock scaling depends on the machine - asserted only on request
+        if os.environ.get("DATASIPHON_ASSERT_SCALING"):
+            scaling = f"builds per second by threads: {throughput}"
+            if not getattr(sys, "_is_gil_enabled", lambda: True)():
+                # builds run in parallel without GIL - throughput scales with threads
+                self.assertGreater(throughput[4], throughput[1] * 1.5, scaling)
+            else:
+                self.assertGreater(throughput[4], throughput[1] * 0.3, scaling)
+
+    def test_warmup(self):
+        import src.datasiphon as ds
+        from src.datasiphon.core import _filter_core as core
+        from sqlalchemy.dialects import postgresql, sqlite
+
+        tt = data.test_table
+        query = sa.select(tt.c.id, tt.c.name, tt.c.age)
+        dialects = [postgresql.psycopg2.dialect(), sqlite.dialect()]
+        shapes = [
+            {"name": {"eq": "a"}, "order_by": "-age", "limit": 10},
+            {"age": {"in_": [1, 2]}, "or": {"id": {"gt": 1}, "name": {"ne": "x"}}},
+            # same shape as the first one
+            {"name": {"eq": "b"}, "order_by": "-age", "limit": 5},
+        ]
+        builder = ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache())
+        self.assertEqual(builder.warmup(query, shapes, dialects=dialects), 2)
+        self.assertIn(id(query.selected_columns), builder._column_indexes)
+        self.assertGreater(core.parse_order_by.cache_info().currsize, 0)
+        info = builder.plan_cache.info()
+        self.assertEqual((info.currsize, info.misses, info.hits), (2, 2, 1))
+        for _, plan in builder.plan_cache.items():
+            self.assertEqual(set(plan._compiled), set(dialects))
+        # traffic of warmed shapes hits prepared plans compiled for the dialect
+        compiled = builder.build_sql(query, {"name": {"eq": "c"}, "order_by": "-age", "limit": 1}, dialect=dialects[0])
+        self.assertEqual(builder.plan_cache.info().misses, 2)
+        self.assertEqual(compiled.params, {"siphon_0": "c", "siphon_limit": 1})
+        # invalid representative filter is reported
+        with self.assertRaises(ds._exc.ColumnError):
+            builder.warmup(query, [{"unknown": {"eq": 1}}])
+        # without plan cache filters are only built and compiled
+        self.assertEqual(ds.SqlQueryBuilder({"tt": tt}).warmup(query, shapes, dialects=dialects), 0)
+
+    def test_builder_snapshot(self):
+        import src.datasiphon as ds
+        import os
+        import subprocess
+        import sys
+        import tempfile
+        from sqlalchemy.dialects import postgresql
+
+        tt = data.test_table
+        queries = {
+            "people": sa.select(tt.c.id, tt.c.name, tt.c.age),
+            "names": sa.select(tt.c.name, sa.func.lower(tt.c.name).label("lower_name")),
+        }
+        restriction = ds.RestrictionPolicy.from_dict({"name": {"eq": "forbidden"}})
+        shapes = {
+            "people": [
+                {"name": {"eq": "a"}, "age": {"in_": [1, 2]}, "order_by": "-age", "limit": 10},
+                {"or": {"id": {"gt": 1}, "age": {"lt": 5}}},
+            ],
+            "names": [{"lower_name": {"ne": "x"}, "offset": 2}],
+        }
+        dialect = postgresql.psycopg2.dialect()
+        builder = ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache())
+        for name, filters in shapes.items():
+            builder.warmup(queries[name], filters, restriction, dialects=[dialect])
+        snapshot = builder.dump_snapshot(queries)
+
+        loaded = ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache())
+        self.assertEqual(loaded.load_snapshot(snapshot, queries, dialects=[dialect]), 3)
+        for name, filters in shapes.items():
+            for f_ in filters:
+                self.assertEqual(
+                    loaded.build_sql(queries[name], f_, restriction, dialect=dialect),
+                    builder.build_sql(queries[name], f_, restriction, dialect=dialect),
+                )
+        # loaded plans are used - no plan is created again
+        info = loaded.plan_cache.info()
+        self.assertEqual((info.misses, info.hits), (0, 3))
+        # plans keep validation of values
+        with self.assertRaises(ds._exc.FiltrationNotAllowed):
+            loaded.build(
+                queries["people"],
+                {"name": {"eq": "forbidden"}, "age": {"in_": [1]}, "order_by": "-age", "limit": 1},
+                restriction,
+            )
+        with self.assertRaises(ds._exc.InvalidValueTypeError):
+            loaded.build(
+                queries["people"],
+                {"name": {"eq": "a"}, "age": {"in_": [1]}, "order_by": "-age", "limit": "x"},
+                restriction,
+            )
+
+        # snapshot is rejected when tables, queries or configuration changed
+        metadata = sa.MetaData()
+        changed_table = sa.Table(
+            "tt",
+            metadata,
+            *(sa.Column(column.name, column.type, primary_key=column.primary_key) for column in tt.columns),
+            sa.Column("extra", sa.Integer),
+        )
+        changed_queries = {
+            "people": sa.select(changed_table.c.id, changed_table.c.name, changed_table.c.age),
+            "names": sa.select(changed_table.c.name, sa.func.lower(changed_table.c.name).label("lower_name")),
+        }
+        with self.assertRaises(ds._exc.StaleSnapshotError):
+            ds.SqlQueryBuilder({"tt": changed_table}, plan_cache=ds.PlanCache()).load_snapshot(
+                snapshot, changed_queries
+            )
+        with self.assertRaises(ds._exc.StaleSnapshotError):
+            ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache()).load_snapshot(
+                snapshot, {**queries, "people": sa.select(tt.c.id, tt.c.name)}
+            )
+        with self.assertRaises(ds._exc.StaleSnapshotError):
+            ds.SqlQueryBuilder({"tt": tt}, plan_cache=ds.PlanCache(), deterministic=True).load_snapshot(
+                snapshot, queries
+            )
+        with self.assertRaises(ValueError):
+            ds.SqlQueryBuilder({"tt": tt}).dump_snapshot(queries)
+
+        # snapshot is loaded by another process
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plans.snapshot")
+            with open(path, "wb") as file:
+                file.write(snapshot)
+            script = (
+                "import sqlalchemy as sa\n"
+                "import src.datasiphon as ds\n"
+                "from tests import data\n"
+                "tt = data.test_table\n"
+                "queries = {'people': sa.select(tt.c.id, tt.c.name, tt.c.age),"
+                " 'names': sa.select(tt.c.name, sa.func.lower(tt.c.name).label('lower_name'))}\n"
+                "builder = ds.SqlQueryBuilder({'tt': tt}, plan_cache=ds.PlanCache())\n"
+                f"print(builder.load_snapshot(open({path!r}, 'rb').read(), queries))\n"
+                "restriction = ds.RestrictionPolicy.from_dict({'name': {'eq': 'forbidden'}})\n"
+                "builder.build(queries['names'], {'lower_name': {'ne': 'y'}, 'offset': 3}, restriction)\n"
+                "print(builder.plan_cache.info().hits)\n"
+            )
+            result = subprocess.run(
+                [sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True
+            )
+        self.assertEqual(result.stdout.split(), ["3", "1"])
+
+    def test_lazy_backend_import(self):
+        import os
+        import subprocess
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        def import_times(script: str) -> dict[str, int]:
+            # cumulative import time (us) of every imported module
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", script], cwd=root, capture_output=True, text=True, check=True
+            )
+            times = {}
+            for line in result.stderr.splitlines():
+                if not line.startswith("import time:") or "cumulative" in line:
+                    continue
+                _, cumulative, module = line[len("import time:") :].split("|")
+                times[module.strip()] = int(cumulative)
+            return times
+
+        # core validation without SQLAlchemy
+        core_times = import_times(
+            "import src.datasiphon as ds\n"
+            "from src.datasiphon.core import _filter_core as core\n"
+            "filtering = core.QueryBuilder.load_filtering("
+            "{'name': {'eq': 'a'}, 'or': {'age': {'gt': 1}}, 'limit': 5})\n"
+            "core.QueryBuilder.verify_filtering(filtering)\n"
+            "ds.FilterBudget(max_leaves=4).check(core.QueryBuilder.measure_filtering(filtering))\n"
+            "ds.RestrictionPolicy.from_dict({'name': {'eq': 'b'}})\n"
+        )
+        self.assertFalse([module for module in core_times if module.split(".")[0] == "sqlalchemy"])
+        # backend is imported on first access
+        backend_times = import_times("import src.datasiphon as ds\nds.SqlQueryBuilder\n")
+        self.assertIn("sqlalchemy", backend_times)
+        self.assertIn("src.datasiphon.sql_filter", backend_times)
+        self.assertLess(
+            core_times["src.datasiphon"], backend_times["src.datasiphon"] + backend_times["src.datasiphon.sql_filter"]
+        )
+
+        import src.datasiphon as ds
+
+        self.assertIs(ds.SqlQueryBuilder, ds.sql_filter.SqlQueryBuilder)
+        self.assertIn("SqlQueryBuilder", dir(ds))
+        with self.assertRaises(AttributeError):
+            ds.unknown_attribute
+
+    def test_filter_validator(self):
+        import json
+        import os
+        import subprocess
+        import src.datasiphon as ds
+        from src.datasiphon.core._exc import (
+            ColumnError,
+            InvalidFilteringStructureError,
+            InvalidValueTypeError,
+            FiltrationNotAllowed,
+            BadFormatError,
+            BudgetExceededError,
+        )
+
+        query = sa.select(data.test_table)
+        builder = ds.SqlQueryBuilder({"tt": data.test_table}, budget=ds.FilterBudget(max_list_length=3))
+        policy = ds.RestrictionPolicy(
+            ds.ColumnFilterRestriction("name", ds.core._filter_core.Equals("x"), ds.core._filter_core.Equals("y")),
+            ds.ColumnFilterRestriction("age", ds.core._filter_core.NotIn.generate_restriction()),
+        )
+        schema = builder.export_schema(query, policy)
+        self.assertEqual(schema.columns["age"], ("age", "int", False, None))
+        self.assertIn("tt.created_at", schema.columns)
+        # schema survives JSON round trip
+        exported = json.loads(json.dumps(schema.to_dict()))
+        self.assertEqual(exported["restrictions"], {"name": {"eq": ["x", "y"]}, "age": {"nin": "*"}})
+        loaded = ds.FilterSchema.from_dict(exported)
+        self.assertEqual(loaded.policy, policy)
+        self.assertEqual(loaded.columns, schema.columns)
+        self.assertEqual(loaded.budget.max_list_length, 3)
+        validator = ds.FilterValidator(loaded)
+
+        valid = [
+            {"name": {"eq": "a"}, "age": {"gt": 1, "lt": 90}},
+            {"or": {"name": {"eq": "a"}, "and": {"age": {"in_": [1, 2]}, "is_active": {"eq": True}}}},
+            {"tt.name": {"or": {"eq": "a", "ne": "b"}}, "order_by": ["-age", "+name"], "limit": "5", "offset": 1},
+            {"or": [{"name": {"eq": "a"}}, {"age": {"eq": 2}}], "after": ""},
+            {"order_by": "-age", "after": ds.core._filter_core.encode_cursor([30, 2])},
+        ]
+        self.assertEqual(loaded.primary_key, ["id"])
+        for filtering in valid:
+            self.assertEqual(validator.validate(filtering), [])
+            builder.build(query, filtering, policy)
+
+        # all violations are reported in one pass
+        violations = validator.validate(
+            {
+                "name": {"eq": "x", "gt": "a"},
+                "unknown": {"eq": 1, "bad": 2},
+                "age": {"in_": 5, "nin": [1]},
+                "or": {"is_active": {"in_": [1, 2, 3, 4]}},
+                "limit": "ten",
+                "order_by": "+missing",
+                "after": "???",
+            }
+        )
+        self.assertEqual(
+            [(violation.path, violation.error) for violation in violations],
+            [
+                ("", BudgetExceededError),
+                ("name.eq", FiltrationNotAllowed),
+                ("unknown", ColumnError),
+                ("unknown.bad", InvalidFilteringStructureError),
+                ("age.in_", InvalidValueTypeError),
+                ("age.nin", FiltrationNotAllowed),
+                ("limit", InvalidValueTypeError),
+                ("order_by", ColumnError),
+                ("after", BadFormatError),
+            ],
+        )
+        self.assertEqual(
+            json.loads(json.dumps([violation.to_dict() for violation in violations]))[2]["error"], "ColumnError"
+        )
+
+        # single violations match errors of the builder
+        invalid = [
+            {"name": {"eq": "y"}},
+            {"missing": {"eq": 1}},
+            {"name": {"and": {"eq": {"gt": 1}}}},
+            {"eq": 1},
+            {"name": {"or": {"name": {"eq": 1}}}},
+            {"age": {"nin": [2]}},
+            {"age": {"in_": "a"}},
+            {"limit": {"a": 1}},
+            {"offset": "x"},
+            {"order_by": "name,age"},
+            {"order_by": 5},
+            {"order_by": None},
+            {"order_by": ["-age", 5]},
+            {"after": 5},
+            {"order_by": "-age", "after": ds.core._filter_core.encode_cursor([30])},
+            {"order_by": ["-age", "+id"], "after": ds.core._filter_core.encode_cursor([30, 2, 1])},
+            {"name": {"in_": [1, 2, 3, 4]}},
+        ]
+        for filtering in invalid:
+            violations = validator.validate(filtering)
+            self.assertEqual(len(violations), 1, filtering)
+            with self.assertRaises(violations[0].error):
+                builder.build(query, filtering, policy)
+            with self.assertRaises(violations[0].error):
+                validator.check(filtering)
+        # keyset pagination requires primary key
+        keyset_query = sa.select(data.test_table.c.name)
+        keyset_validator = ds.FilterValidator(builder.export_schema(keyset_query))
+        filtering = {"order_by": "-name", "after": ""}
+        self.assertEqual([violation.error for violation in keyset_validator.validate(filtering)], [ColumnError])
+        with self.assertRaises(ColumnError):
+            builder.build(keyset_query, filtering)
+        # column named as keyset keyword takes precedence over the keyword
+        shadowed = sa.select(data.test_table.c.id, data.test_table.c.name.label("after"))
+        shadowed_validator = ds.FilterValidator(builder.export_schema(shadowed))
+        self.assertEqual(shadowed_validator.validate({"after": {"eq": "a"}}), [])
+        builder.build(shadowed, {"after": {"eq": "a"}})
+        # size limits stop validation
+        deep = {"name": {"eq": "a"}}
+        for _ in range(70):
+            deep = {"and": deep}
+        self.assertEqual([violation.error for violation in validator.validate(deep)], [InvalidFilteringStructureError])
+
+        # validation from exported schema does not import SQLAlchemy
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = (
+            "import sys, json\n"
+            "import src.datasiphon as ds\n"
+            "schema = ds.FilterSchema.from_dict(json.loads(sys.stdin.read()))\n"
+            "violations = ds.FilterValidator(schema).validate({'name': {'eq': 'y'}, 'age': {'gt': 1}})\n"
+            "print(json.dumps([[v.path, v.error.__name__] for v in violations]))\n"
+            "print(any(module.split('.')[0] == 'sqlalchemy' for module in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=root,
+            input=json.dumps(exported),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.split(), ['[["name.eq",', '"FiltrationNotAllowed"]]', "False"])
+
+    def test_value_coercion(self):
+        import datetime
+        import decimal
+        import uuid
+        import src.datasiphon as ds
+        from src.datasiphon.core._exc import InvalidValueTypeError, FiltrationNotAllowed
+
+        table = data.nullables_generic_types_table
+        query = sa.select(table)
+        identifier = uuid.uuid4()
+        filtering = {
+            "int_type": {"ge": " 5", "in_": ["1", "2", 3]},
+            "float_type": {"lt": "1.5"},
+            "date_type": {"eq": "2024-02-29"},
+            "datetime_type": {"gt": "2024-01-01T10:00:00"},
+            "time_type": {"le": "12:30"},
+            "uuid_type": {"nin": [str(identifier), None]},
+            "enum_type": {"eq": "B"},
+            "bool_type": {"ne": "false"},
+            "string_type": {"eq": "1"},
+        }
+        expected = {
+            "int_type": [5, [1, 2, 3]],
+            "float_type": [1.5],
+            "date_type": [datetime.date(2024, 2, 29)],
+            "datetime_type": [datetime.datetime(2024, 1, 1, 10)],
+            "time_type": [datetime.time(12, 30)],
+            "uuid_type": [[identifier, None]],
+            "enum_type": ["B"],
+            "string_type": ["1"],
+        }
+        for builder in (
+            ds.SqlQueryBuilder({"ngt": table}, coerce_values=True),
+            ds.SqlQueryBuilder({"ngt": table}, coerce_values=True, single_pass=True),
+            ds.SqlQueryBuilder({"ngt": table}, coerce_values=True, plan_cache=ds.PlanCache()),
+        ):
+            expression, _ = builder.create_filter(filtering, query.selected_columns)
+            values = {}
+            for leaf in expression.leaves():
+                values.setdefault(leaf.column.key, []).append(leaf.operator.assigned_value)
+            self.assertEqual(values.pop("bool_type"), [False])
+            self.assertEqual(values, expected)
+            self.assertEqual(
+                str(builder.build(query, filtering).compile()),
+                str(builder.build(query, {**filtering, "float_type": {"lt": 1.5}}).compile()),
+            )
+            # invalid values are rejected before anything is built
+            for invalid in (
+                {"int_type": {"eq": "five"}},
+                {"int_type": {"in_": ["1", "x"]}},
+                {"date_type": {"gt": "2024-02-30"}},
+                {"uuid_type": {"eq": "not-uuid"}},
+                {"enum_type": {"eq": "D"}},
+                {"bool_type": {"eq": "maybe"}},
+                {"float_type": {"eq": True}},
+            ):
+                with self.assertRaises(InvalidValueTypeError):
+                    builder.build(query, invalid)
+        # plan binds coerced values of every build
+        builder = ds.SqlQueryBuilder({"ngt": table}, coerce_values=True, plan_cache=ds.PlanCache())
+        builder.build(query, {"int_type": {"in_": ["1"]}, "date_type": {"lt": "2024-01-01"}})
+        params = (
+            builder.build(query, {"int_type": {"in_": ["7", "8"]}, "date_type": {"lt": "2025-01-01"}}).compile().params
+        )
+        self.assertEqual(sorted(params.values(), key=str), [datetime.date(2025, 1, 1), [7, 8]])
+        self.assertEqual(builder.plan_cache.info().hits, 1)
+        with self.assertRaises(InvalidValueTypeError):
+            builder.build(query, {"int_type": {"in_": ["7", "x"]}, "date_type": {"lt": "2025-01-01"}})
+        # restrictions are checked against coerced values
+        policy = ds.RestrictionPolicy.from_dict({"int_type": {"eq": 5}})
+        with self.assertRaises(FiltrationNotAllowed):
+            builder.build(query, {"int_type": {"eq": "5"}}, policy)
+        with self.assertRaises(FiltrationNotAllowed):
+            builder.build(query, {"int_type": {"eq": "05"}}, policy)
+        # numeric values are coerced into exact decimals, floats are rejected as inexact
+        numeric = data.nullables_standard_uppercase_table
+        numeric_query = sa.select(numeric.c.id, numeric.c.decimal_type, numeric.c.numeric_type)
+        builder = ds.SqlQueryBuilder({"sut": numeric}, coerce_values=True)
+        expression, _ = builder.create_filter(
+            {"decimal_type": {"gt": " 0.10"}, "numeric_type": {"in_": ["1.50", 2]}}, numeric_query.selected_columns
+        )
+        self.assertEqual(
+            [leaf.operator.assigned_value for leaf in expression.leaves()],
+            [decimal.Decimal("0.10"), [decimal.Decimal("1.50"), 2]],
+        )
+        self.assertIsInstance(next(expression.leaves()).operator.assigned_value, decimal.Decimal)
+        for invalid in ({"decimal_type": {"eq": "1,5"}}, {"numeric_type": {"in_": ["1", 0.5]}}):
+            with self.assertRaises(InvalidValueTypeError):
+                builder.build(numeric_query, invalid)
+        # values are bound as they are without coercion
+        builder = ds.SqlQueryBuilder({"ngt": table})
+        expression, _ = builder.create_filter({"int_type": {"eq": "5"}}, query.selected_columns)
+        self.assertEqual(expression.operator.assigned_value, "5")
+        # edge validation coerces values the same way
+        validator = ds.FilterValidator(
+            ds.FilterSchema.from_dict(ds.SqlQueryBuilder({}, coerce_values=True).export_schema(query).to_dict())
+        )
+        self.assertEqual(validator.validate(filtering), [])
+        self.assertEqual(
+            [
+                violation.path
+                for violation in validator.validate({"int_type": {"eq": "five"}, "enum_type": {"in_": ["A", "D"]}})
+            ],
+            ["int_type.eq", "enum_type.in_"],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()